@@ -1,13 +1,13 @@
-from fastapi import HTTPException, APIRouter, File, UploadFile
+from fastapi import HTTPException, APIRouter, File, UploadFile, Request
 from models.models import CheckRequest, CheckResponse, TaskStatusResponse, TaskStatusRequest
 from utils.logger import logger
-from services.wangyiyunsdk import (
-    check_images_service,
-    check_audios_service,
-    check_videos_service
-)
+from services.wangyiyunsdk import acheck_media_service, parse_callback
+from task.registry import get_task_result_registry
+from task.writer import get_task_result_writer
+from utils.exceptions import ValidationError
 from models.database import Task  # 新增导入 Task 模型
 from typing import List  # 新增导入 List 类型
+from urllib.parse import parse_qsl
 import tempfile
 import os
 import shutil
@@ -30,12 +30,35 @@ async def get_task_status(request: TaskStatusRequest):
         logger.error(f"Error during task status query: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@check_router.post("/callback/wangyiyun", summary="网易易盾审核结果回调")
+async def wangyiyun_callback(request: Request):
+    """
+    接收易盾主动回调：校验签名后回写Task表，并唤醒等待该任务结果的审核
+    """
+    body = (await request.body()).decode("utf-8")
+    params = dict(parse_qsl(body, keep_blank_values=True))
+    try:
+        finished = parse_callback(params)
+        await get_task_result_writer().save(finished)
+    except ValidationError as e:
+        logger.warning(f"Rejected wangyiyun callback: {e.message}")
+        raise HTTPException(status_code=403, detail=e.message)
+    except Exception as e:
+        logger.error(f"Error handling wangyiyun callback: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+    
+    registry = get_task_result_registry()
+    for task_id, verdict in finished.items():
+        registry.resolve(task_id, verdict)
+    return {"code": 200, "msg": "ok", "count": len(finished)}
+
+
 @check_router.post("/image/check", response_model=list[CheckResponse])
 async def check_images(request: CheckRequest):
     logger.info("Starting image check")
     try:
         # 调用服务层函数，构造返回值
-        results = check_images_service(request.filePathList)
+        results = await acheck_media_service("images", request.filePathList)
         return results
     except Exception as e:
         logger.error(f"Error during image check: {e}")
@@ -46,7 +69,7 @@ async def check_audios(request: CheckRequest):
     logger.info("Starting audio check")
     try:
         # 调用服务层函数，构造返回值
-        results = check_audios_service(request.filePathList)
+        results = await acheck_media_service("audios", request.filePathList)
         return results
     except Exception as e:
         logger.error(f"Error during audio check: {e}")
@@ -57,7 +80,7 @@ async def check_videos(request: CheckRequest):
     logger.info("Starting video check")
     try:
         # 调用服务层函数，构造返回值
-        results = check_videos_service(request.filePathList)
+        results = await acheck_media_service("videos", request.filePathList)
         return results
     except Exception as e:
         logger.error(f"Error during video check: {e}")
@@ -83,7 +106,7 @@ async def check_uploaded_images(images: List[UploadFile] = File(...)):
             file_paths.append(temp_file.name)
         
         # 调用检测服务
-        results = check_images_service(file_paths)
+        results = await acheck_media_service("images", file_paths)
         
         return {
             "success": True,
@@ -131,7 +154,7 @@ async def check_uploaded_audios(audios: List[UploadFile] = File(...)):
             file_paths.append(temp_file.name)
         
         # 调用检测服务
-        results = check_audios_service(file_paths)
+        results = await acheck_media_service("audios", file_paths)
         
         return {
             "success": True,
@@ -179,7 +202,7 @@ async def check_uploaded_videos(videos: List[UploadFile] = File(...)):
             file_paths.append(temp_file.name)
         
         # 调用检测服务
-        results = check_videos_service(file_paths)
+        results = await acheck_media_service("videos", file_paths)
         
         return {
             "success": True,
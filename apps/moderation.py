@@ -5,7 +5,8 @@
 支持并发审核content、images、audios、videos四个维度
 """
 
-from fastapi import APIRouter, Depends, HTTPException, Request, BackgroundTasks, Query
+from fastapi import APIRouter, Depends, HTTPException, Request, Query, Header
+from fastapi.responses import StreamingResponse
 from typing import List, Optional, Dict, Any
 import json
 import asyncio
@@ -15,76 +16,153 @@ from peewee import DoesNotExist
 import uuid
 from datetime import datetime, date
 import io
+import time
 
-from services.moderation_service import ModerationService
+from services.moderation_service import ModerationService, content_snapshot, content_from_snapshot, content_update
 from models.models import ModerationRequest, BatchModerationRequest, ModerationResult
 from models.database import Contents, AuditStats, db
-from models.enums import ContentCategory, RiskLevel, AuditStatus, EngineType, ProcessingStatus
-from utils.exceptions import ModerationError
+from models.enums import ContentCategory, RiskLevel, AuditStatus, EngineType, ProcessingStatus, RequestPriority
+from utils.exceptions import ModerationError, RateLimitError
+from utils.deadline import Deadline
+from utils.rate_limiter import resolve_client_ip
 from utils.logger import get_logger
+from task.job_queue import get_job_queue
+from utils.events import publish_event, get_event_bus, FINAL_EVENT, TERMINAL_EVENTS
+from services.wangyiyunsdk import aquery_task
+from services.media_moderation_service import get_media_moderation_service, media_urls
+from services.agents import create_moderation_agent
+
+service_logger = get_logger(__name__)
+
+router = APIRouter(tags=["内容审核"])
+
+
+def get_client_id(request: Request) -> str:
+    """获取限流用的客户端标识，请求来自受信代理时才使用其转发的原始地址"""
+    return resolve_client_ip(
+        request.client.host if request.client else None,
+        request.headers.get("x-forwarded-for"),
+        request.app.state.admission.trusted_proxies
+    )
+
 
-# 全局任务状态存储
-task_status_store = {}
+async def enqueue_jobs(request: Request, jobs: List[Dict[str, Any]]) -> List[str]:
+    """作业写入持久化队列并唤醒本进程的工作循环，入队期间占用准入名额"""
+    async with request.app.state.admission.admission(get_client_id(request), units=len(jobs)):
+        job_ids = await asyncio.to_thread(get_job_queue().enqueue_many, jobs)
+    for job, job_id in zip(jobs, job_ids):
+        if job.get("content_id") is not None:
+            publish_event("job_queued", content_id=job["content_id"], job_id=job_id, kind=job["kind"])
+    worker = getattr(request.app.state, "job_worker", None)
+    if worker is not None:
+        worker.notify()
+    return job_ids
 
-async def process_audit_task(task_id: str, content_id: int, service, logger):
-    """异步处理审核任务"""
+
+def mark_reviewing(content_ids: List[int]) -> tuple:
+    """入队前把内容标记为审核中，返回原状态（供入队失败时恢复）和待审核字段快照（随作业交给跨主机的工作进程）；
+    先标记再入队，其他进程的工作循环先完成审核时不会被晚到的标记覆盖结论"""
+    with db.atomic("IMMEDIATE"):
+        rows = list(Contents.select().where(Contents.id.in_(content_ids)))
+        previous = {row.id: (row.audit_status, row.processing_status) for row in rows}
+        snapshots = {row.id: content_snapshot(row) for row in rows}
+        Contents.update(
+            processing_status="processing", audit_status=AuditStatus.REVIEWING.value
+        ).where(Contents.id.in_(content_ids)).execute()
+    return previous, snapshots
+
+
+def restore_status(previous: Dict[int, tuple]):
+    """入队失败时恢复内容的原审核状态"""
+    with db.atomic():
+        for content_id, (audit_status, processing_status) in previous.items():
+            Contents.update(audit_status=audit_status, processing_status=processing_status).where(
+                (Contents.id == content_id) & (Contents.audit_status == AuditStatus.REVIEWING.value)
+            ).execute()
+
+
+async def enqueue_marked_jobs(request: Request, jobs: List[Dict[str, Any]]) -> List[str]:
+    """标记内容为审核中后入队，入队失败（如队列已满返回429）时恢复原状态"""
+    previous, snapshots = await asyncio.to_thread(mark_reviewing, [job["content_id"] for job in jobs])
+    for job in jobs:
+        job["payload"]["content"] = snapshots.get(job["content_id"])
+        # 作业最终失败时按原状态恢复，见 restore_failed_jobs
+        job["payload"]["previous_status"] = previous.get(job["content_id"])
     try:
-        # 更新任务状态为处理中
-        task_status_store[task_id] = {
-            "status": "processing",
-            "content_id": content_id,
-            "message": "正在审核中...",
-            "created_at": datetime.now().isoformat()
-        }
-        
-        # 执行审核
-        result = await service.moderate(content_id=content_id)
-        
-        # 更新任务状态为完成
-        task_status_store[task_id] = {
-            "status": "completed",
-            "content_id": content_id,
-            "result": result,
-            "message": "审核完成",
-            "created_at": task_status_store[task_id]["created_at"],
-            "completed_at": datetime.now().isoformat()
-        }
-        
-        logger.info(f"审核任务完成: {task_id}, content_id: {content_id}")
-        
+        return await enqueue_jobs(request, jobs)
+    except BaseException:
+        await asyncio.to_thread(restore_status, previous)
+        raise
+
+
+def restore_failed_jobs(jobs: List[Dict[str, Any]]):
+    """作业队列的on_failed钩子：作业重试耗尽或租约过期判定最终失败时，把仍为审核中的内容恢复为入队前的审核状态，
+    处理状态记为失败，审核进度订阅据此结束"""
+    now = datetime.now()
+    with db.atomic():
+        for job in jobs:
+            if job.get("content_id") is None:
+                continue
+            audit_status, _ = job["payload"].get("previous_status") or (AuditStatus.PENDING.value, None)
+            Contents.update(
+                audit_status=audit_status, processing_status=ProcessingStatus.FAILED.value, updated_at=now
+            ).where(
+                (Contents.id == job["content_id"]) & (Contents.audit_status == AuditStatus.REVIEWING.value)
+            ).execute()
+            service_logger.warning(f"作业 {job['id']} 最终失败，内容 {job['content_id']} 恢复为 {audit_status}")
+
+
+async def process_audit_job(job: Dict[str, Any], service: ModerationService, remote: bool = False) -> Dict[str, Any]:
+    """执行审核服务作业，最终失败时由队列的on_failed钩子恢复内容状态；
+    remote为真时按作业携带的快照审核，不读写本地数据库，由API收到结果后写回"""
+    content_id = job["content_id"]
+    try:
+        if remote:
+            snapshot = job["payload"].get("content")
+            if snapshot is None:
+                raise ModerationError(f"内容不存在: {content_id}", error_code="CONTENT_NOT_FOUND")
+            return await service.moderate(content_id=content_id, timeout=job["payload"].get("timeout"), content=snapshot)
+        return await service.moderate(content_id=content_id, timeout=job["payload"].get("timeout"))
     except Exception as e:
-        # 更新任务状态为失败
-        task_status_store[task_id] = {
-            "status": "failed",
-            "content_id": content_id,
-            "error": str(e),
-            "message": f"审核失败: {str(e)}",
-            "created_at": task_status_store.get(task_id, {}).get("created_at", datetime.now().isoformat()),
-            "failed_at": datetime.now().isoformat()
-        }
-        
-        # 更新数据库状态为待审核
-        try:
-            with db.atomic():
-                content_obj = Contents.get_or_none(Contents.id == content_id)
-                if content_obj:
-                    content_obj.audit_status = AuditStatus.PENDING.value
-                    content_obj.save()
-        except Exception as db_error:
-            logger.error(f"更新数据库状态失败: {db_error}")
-        
-        logger.error(f"审核任务失败: {task_id}, content_id: {content_id}, error: {str(e)}")
+        service_logger.error(f"审核作业失败: {job['id']}, content_id: {content_id}, error: {str(e)}")
+        raise
 
-# 任务状态查询接口将在router定义后添加
-from services.wangyiyunsdk import (
-    check_text_service, check_images_service, check_audios_service, 
-    check_videos_service, query_task
-)
-from services.agents import create_moderation_agent
 
-service_logger = get_logger(__name__)
+async def process_content_job(job: Dict[str, Any], remote: bool = False) -> Dict[str, Any]:
+    """执行按内容ID的多模态审核作业，厂商出错时抛出异常由队列重试"""
+    snapshot = job["payload"].get("content") if remote else None
+    if remote and snapshot is None:
+        # 入队时内容已不存在
+        result = {"content_id": job["content_id"], "error": "内容不存在", "final_decision": "ERROR", "is_compliant": False}
+    else:
+        result = await process_single_content(job["content_id"], job["payload"].get("timeout"), snapshot=snapshot)
+    if result.get("final_decision") == "ERROR" and result.get("error") != "内容不存在":
+        raise ModerationError(result.get("error") or "审核失败")
+    # 报告HTML已保存到Contents表（或在content_update中交回API），作业结果中不再重复保存
+    return {key: value for key, value in result.items() if key != "report_html"}
+
+
+def build_job_handlers(service: ModerationService, remote: bool = False) -> Dict[str, Any]:
+    """作业类型 → 处理函数，API进程内的工作循环和独立工作进程共用；
+    经作业代理接入的工作进程（remote）没有API的数据库，按作业携带的快照审核"""
+    return {
+        "moderate": lambda job: process_audit_job(job, service, remote),
+        "content": lambda job: process_content_job(job, remote)
+    }
 
-router = APIRouter(tags=["内容审核"])
+
+def apply_job_result(job: Optional[Dict[str, Any]], result: Dict[str, Any]):
+    """作业代理的结果回写：跨主机工作进程完成作业后把content_update写回Contents表"""
+    if job is None or job.get("content_id") is None:
+        return
+    content_id = job["content_id"]
+    update = result.get("content_update")
+    if not update:
+        return
+    with db.atomic():
+        Contents.update(**update, updated_at=datetime.now()).where(Contents.id == content_id).execute()
+    if job["kind"] == "content":
+        update_audit_stats(success=result.get("is_compliant", False), processing_time=result.get("processing_time", 0.0))
 
 
 def update_audit_stats(success: bool, processing_time: float = 0.0):
@@ -150,147 +228,10 @@ class TextModerationRequestAPI(BaseModel):
     timeout: Optional[float] = Field(30.0, description="超时时间（秒）")
 
 
-def moderate_content_by_type(content_type: str, content_data: Any) -> Dict[str, Any]:
-    """根据内容类型进行审核，等待审核结果完成后返回"""
-    import time
-    from models.enums import TaskType
-    
-    try:
-        # 提交审核任务
-        if content_type == "text":
-            result = check_text_service(content_data, "")
-        elif content_type == "images":
-            if isinstance(content_data, str):
-                content_data = json.loads(content_data) if content_data else []
-            result = check_images_service(content_data, "")
-        elif content_type == "audios":
-            if isinstance(content_data, str):
-                content_data = json.loads(content_data) if content_data else []
-            result = check_audios_service(content_data, "")
-        elif content_type == "videos":
-            if isinstance(content_data, str):
-                content_data = json.loads(content_data) if content_data else []
-            result = check_videos_service(content_data, "")
-        else:
-            return {"error": f"不支持的内容类型: {content_type}"}
-        
-        # 如果提交失败，直接返回错误
-        if not isinstance(result, (dict, list)):
-            return {"error": "提交审核任务失败"}
-        
-        # 处理不同类型的返回结果
-        if content_type == "text":
-            if not isinstance(result, dict):
-                return {"error": "文本审核返回格式错误"}
-            if "task_id" not in result or not result["task_id"]:
-                return {"error": result.get("msg", "提交文本审核失败")}
-            task_id = result["task_id"]
-            task_type = TaskType.TEXT.value
-        else:
-            # 对于images/audios/videos，返回的是列表
-            if not isinstance(result, list) or not result:
-                return {"error": "提交审核任务失败"}
-            # 取第一个任务的task_id
-            first_task = result[0]
-            if not isinstance(first_task, dict) or "task_id" not in first_task:
-                return {"error": "获取任务ID失败"}
-            task_id = first_task["task_id"]
-            if content_type == "images":
-                task_type = TaskType.IMAGE.value
-            elif content_type == "audios":
-                task_type = TaskType.AUDIO.value
-            elif content_type == "videos":
-                task_type = TaskType.VIDEO.value
-            
-            # 处理多个文件的情况
-            final_results = []
-            for item in result:
-                if "task_id" not in item or not item["task_id"]:
-                    final_results.append({
-                        "file_path": item.get("file_path", "unknown"),
-                        "error": item.get("msg", "提交审核失败"),
-                        "is_compliant": False
-                    })
-                    continue
-                
-                item_task_id = item["task_id"]
-                item_task_type = task_type  # 使用之前确定的task_type
-                
-                # 轮询查询审核结果
-                max_attempts = 30  # 最多查询30次
-                attempt = 0
-                query_result = None
-                
-                while attempt < max_attempts:
-                    try:
-                        query_result = query_task(item_task_id, item_task_type)
-                        if query_result is not None:  # 审核完成
-                            break
-                        time.sleep(2)  # 等待2秒后重试
-                        attempt += 1
-                    except Exception as e:
-                        service_logger.error(f"查询任务{task_id}失败: {e}")
-                        break
-                
-                if query_result is not None:
-                    final_results.append({
-                        "file_path": item.get("file_path", "unknown"),
-                        "task_id": task_id,
-                        "is_compliant": query_result.is_compliant,
-                        "result_text": query_result.result_text,
-                        "status": "completed"
-                    })
-                else:
-                    final_results.append({
-                        "file_path": item.get("file_path", "unknown"),
-                        "task_id": task_id,
-                        "error": "审核超时或失败",
-                        "is_compliant": False,
-                        "status": "timeout"
-                    })
-            
-            return {"results": final_results}
-        
-        # 对于文本类型，轮询查询审核结果
-        max_attempts = 30  # 最多查询30次
-        attempt = 0
-        query_result = None
-        
-        while attempt < max_attempts:
-            try:
-                query_result = query_task(task_id, task_type)
-                if query_result is not None:  # 审核完成
-                    break
-                time.sleep(2)  # 等待2秒后重试
-                attempt += 1
-            except Exception as e:
-                service_logger.error(f"查询任务{task_id}失败: {e}")
-                break
-        
-        if query_result is not None:
-            return {
-                "task_id": task_id,
-                "is_compliant": query_result.is_compliant,
-                "result_text": query_result.result_text,
-                "status": "completed"
-            }
-        else:
-            return {
-                "task_id": task_id,
-                "error": "审核超时或失败",
-                "is_compliant": False,
-                "status": "timeout"
-            }
-            
-    except Exception as e:
-        service_logger.error(f"审核{content_type}失败: {e}")
-        return {"error": str(e)}
-
-
 async def query_moderation_result(task_id: str, task_type: str) -> Dict[str, Any]:
     """查询审核结果"""
     try:
-        result = query_task(task_id, task_type)
+        result = await aquery_task(task_id, task_type)
         if result:
             return {
                 "is_compliant": result.is_compliant,
@@ -304,13 +245,14 @@ async def query_moderation_result(task_id: str, task_type: str) -> Dict[str, Any
         return {"error": str(e), "status": "error"}
 
 
-async def generate_audit_report(content_id: int, audit_results: Dict[str, Any]) -> str:
-    """使用大模型生成HTML格式的审核报告"""
+async def generate_audit_report(content_id: int, audit_results: Dict[str, Any],
+                                content_obj: Optional[Contents] = None) -> str:
+    """使用大模型生成HTML格式的审核报告，content_obj为空时按ID查询"""
     import json
     import re
     try:
         # 获取内容信息
-        content_obj = Contents.get_by_id(content_id)
+        content_obj = content_obj or Contents.get_by_id(content_id)
         
         # 准备审核结果摘要
         summary_data = {
@@ -507,10 +449,9 @@ async def generate_audit_report(content_id: int, audit_results: Dict[str, Any])
 
 
 @router.post("/", summary="内容审核 - 支持ID列表并发审核")
-async def moderate_content_by_ids(request: Request, body: dict, background_tasks: BackgroundTasks):
+async def moderate_content_by_ids(request: Request, body: dict):
     """内容审核 - 支持单条、批量和ID列表审核"""
     try:
-        service = request.app.state.service
         logger = request.app.state.logger
         logger.info(f"收到内容审核请求: {body}")
 
@@ -526,45 +467,50 @@ async def moderate_content_by_ids(request: Request, body: dict, background_tasks
 
         logger.info(f"准备审核内容, IDs: {id_list}")
         
-        # 异步任务入队，立即返回任务ID和初始状态
-        results = []
-        for content_id in id_list:
-            # 标记内容为 processing 状态
-            db.connect(reuse_if_open=True)
-            content_obj = Contents.get_or_none(Contents.id == int(content_id))
-            if content_obj:
-                content_obj.processing_status = "processing"
-                content_obj.audit_status = AuditStatus.REVIEWING.value
-                content_obj.save()
-            # 使用BackgroundTasks启动后台任务
-            background_tasks.add_task(process_single_content, int(content_id))
-            results.append({
-                "content_id": content_id,
-                "status": "processing"
-            })
+        # 超时预算：请求未指定时使用配置的默认超时
+        timeout = body.get("timeout") or request.app.state.config.get("performance", {}).get("default_timeout", 60)
+        
+        # 标记内容为 processing 状态后写入持久化队列，任一API进程都能查询状态，重启后由工作循环继续处理
+        job_ids = await enqueue_marked_jobs(request, [
+            {"kind": "content", "content_id": int(content_id), "payload": {"timeout": timeout}}
+            for content_id in id_list
+        ])
+        results = [
+            {"content_id": content_id, "task_id": job_id, "status": "processing"}
+            for content_id, job_id in zip(id_list, job_ids)
+        ]
         return {
             "success": True,
             "data": results,
             "message": "审核任务已提交，正在处理中，请稍后通过内容ID查询状态"
         }
             
+    except RateLimitError:
+        raise
     except Exception as e:
         service_logger.error(f"审核失败: {e}")
         raise HTTPException(status_code=500, detail=f"审核失败: {str(e)}")
 
 
-async def process_single_content(content_id: int) -> Dict[str, Any]:
-    """处理单个内容的审核"""
+async def process_single_content(content_id: int, timeout: Optional[float] = None,
+                                 snapshot: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """处理单个内容的审核，timeout为各维度提交和轮询共用的超时预算；
+    给出snapshot时按快照审核，不读写本地数据库，结论字段在返回值的content_update中"""
     import json
     import time
     start_time = time.time()
+    deadline = Deadline(timeout)
     try:
         # 连接数据库
         db.connect(reuse_if_open=True)
         
         # 查询内容
-        content_obj = Contents.get_or_none(Contents.id == content_id)
+        if snapshot is not None:
+            content_obj = content_from_snapshot(content_id, snapshot)
+        else:
+            content_obj = Contents.get_or_none(Contents.id == content_id)
         if not content_obj:
+            publish_event(FINAL_EVENT, content_id=content_id, decision="ERROR", error="内容不存在")
             return {
                 "content_id": content_id,
                 "error": "内容不存在",
@@ -572,85 +518,18 @@ async def process_single_content(content_id: int) -> Dict[str, Any]:
                 "is_compliant": False
             }
         
-        # 并发审核四个维度
-        audit_tasks = {}
-        
-        # 提交审核任务
-        if content_obj.content:
-            audit_tasks["content"] = moderate_content_by_type("text", content_obj.content)
-        
-        if content_obj.images:
-            # 解析JSON格式的图片列表
-            try:
-                images_list = json.loads(content_obj.images) if isinstance(content_obj.images, str) else content_obj.images
-                audit_tasks["images"] = moderate_content_by_type("images", images_list)
-            except (json.JSONDecodeError, TypeError):
-                service_logger.error(f"解析图片列表失败: {content_obj.images}")
-                audit_tasks["images"] = {"error": "图片数据格式错误"}
-        
-        if content_obj.audios:
-            audit_tasks["audios"] = moderate_content_by_type("audios", content_obj.audios)
-        
-        if content_obj.videos:
-            audit_tasks["videos"] = moderate_content_by_type("videos", content_obj.videos)
-        
-        # 处理审核结果
-        audit_results = {}
-        all_compliant = True
-        
-        for dimension, task_result in audit_tasks.items():
-            try:
-                if "error" in task_result:
-                    audit_results[dimension] = {
-                        "status": "error",
-                        "is_compliant": False,
-                        "result_text": task_result["error"]
-                    }
-                    all_compliant = False
-                elif dimension == "content":  # 文本类型
-                    audit_results[dimension] = {
-                        "status": task_result.get("status", "completed"),
-                        "is_compliant": task_result.get("is_compliant", False),
-                        "result_text": task_result.get("result_text", "未知结果")
-                    }
-                    if not task_result.get("is_compliant", False):
-                        all_compliant = False
-                else:  # 图片、音频、视频类型
-                    if "results" in task_result:
-                        # 处理多个文件的结果
-                        dimension_compliant = True
-                        result_texts = []
-                        for item in task_result["results"]:
-                            if not item.get("is_compliant", False):
-                                dimension_compliant = False
-                            # 确保所有字段都不为None，避免字符串拼接错误
-                            file_path = item.get('file_path') or 'unknown'
-                            result_text = item.get('result_text') or item.get('error') or '未知结果'
-                            if result_text is None:
-                                result_text = '未知结果'
-                            result_texts.append(f"{file_path}: {result_text}")
-                        
-                        audit_results[dimension] = {
-                            "status": "completed",
-                            "is_compliant": dimension_compliant,
-                            "result_text": "; ".join(result_texts)
-                        }
-                        if not dimension_compliant:
-                            all_compliant = False
-                    else:
-                        audit_results[dimension] = {
-                            "status": "error",
-                            "is_compliant": False,
-                            "result_text": "审核结果格式错误"
-                        }
-                        all_compliant = False
-            except Exception as e:
-                audit_results[dimension] = {
-                    "status": "error",
-                    "is_compliant": False,
-                    "result_text": f"处理审核结果失败: {str(e)}"
-                }
-                all_compliant = False
+        # 文本与每个媒体文件并发提交厂商审核，任一项不合规时取消其余在途检查
+        publish_event("audit_started", content_id=content_id)
+        media_service = get_media_moderation_service()
+        media = {
+            "images": media_urls(content_obj.images),
+            "audios": media_urls(content_obj.audios),
+            "videos": media_urls(content_obj.videos)
+        }
+        audit_results, fanout = await media_service.moderate_with_vendor(
+            content_obj.content, media, deadline, content_id=content_id
+        )
+        all_compliant = fanout.blocked_by is None
         
         # 判断整体合规性
         overall_compliant = all_compliant and all(
@@ -659,7 +538,7 @@ async def process_single_content(content_id: int) -> Dict[str, Any]:
         audit_results["overall_compliant"] = overall_compliant
         
         # 生成HTML报告
-        html_report = await generate_audit_report(content_id, audit_results)
+        html_report = await generate_audit_report(content_id, audit_results, content_obj)
         
         # 更新内容审核状态和保存结果到Contents表
         final_decision = "APPROVED" if overall_compliant else "REJECTED"
@@ -669,22 +548,34 @@ async def process_single_content(content_id: int) -> Dict[str, Any]:
         content_obj.processing_content = json.dumps(audit_results, ensure_ascii=False)
         content_obj.processing_html = html_report
         content_obj.final_decision = final_decision
-        content_obj.save()
-        
-        # 更新审核统计
         processing_time = time.time() - start_time
-        update_audit_stats(success=overall_compliant, processing_time=processing_time)
+        if snapshot is None:
+            content_obj.save()
+            # 更新审核统计
+            update_audit_stats(success=overall_compliant, processing_time=processing_time)
+        publish_event(
+            FINAL_EVENT, content_id=content_id, decision=final_decision, is_compliant=overall_compliant,
+            blocked_by=":".join(fanout.blocked_by) if fanout.blocked_by else None
+        )
+        
+        if deadline.cut_stages:
+            service_logger.warning(f"内容{content_id}审核超时预算耗尽，被截断的阶段: {deadline.cut_stages}")
         
         return {
             "content_id": content_id,
             "final_decision": "APPROVED" if overall_compliant else "REJECTED",
             "is_compliant": overall_compliant,
             "audit_results": audit_results,
-            "report_html": html_report
+            "report_html": html_report,
+            "truncated_stages": deadline.cut_stages,
+            **({"content_update": content_update(content_obj), "processing_time": processing_time}
+               if snapshot is not None else {})
         }
         
     except Exception as e:
         service_logger.error(f"处理内容{content_id}审核失败: {e}")
+        # 出错的审核由作业队列重试，最终失败时工作循环发布 job_failed
+        publish_event("audit_error", content_id=content_id, error=str(e))
         return {
             "content_id": content_id,
             "error": str(e),
@@ -780,12 +671,9 @@ async def download_content_audit_report(content_id: int, format: str = "html"):
 @router.post("/single", summary="单条内容审核")
 async def moderate_single(request: Request, moderation_request: ModerationRequestAPI):
     """审核单条内容 - 异步处理"""
-    import asyncio
-    import uuid
     from models.enums import AuditStatus
     
     try:
-        service = request.app.state.service
         logger = request.app.state.logger
         
         logger.info(f"收到单条审核请求: {moderation_request.content_id}")
@@ -796,21 +684,16 @@ async def moderate_single(request: Request, moderation_request: ModerationReques
         
         content_id = int(moderation_request.content_id)
         
-        # 更新状态为审核中
-        from models.database import Contents, db
-        with db.atomic():
-            content_obj = Contents.get_or_none(Contents.id == content_id)
-            if not content_obj:
-                raise ValueError(f"内容不存在: {content_id}")
-            
-            content_obj.audit_status = AuditStatus.REVIEWING.value
-            content_obj.save()
-        
-        # 生成任务ID
-        task_id = str(uuid.uuid4())
+        if not Contents.get_or_none(Contents.id == content_id):
+            raise ValueError(f"内容不存在: {content_id}")
         
-        # 异步执行审核任务
-        asyncio.create_task(process_audit_task(task_id, content_id, service, logger))
+        # 更新状态为审核中后写入持久化作业队列，队列已满或客户端超出速率时返回429
+        task_id = (await enqueue_marked_jobs(request, [{
+            "kind": "moderate",
+            "content_id": content_id,
+            "payload": {"timeout": moderation_request.timeout},
+            "priority": moderation_request.priority
+        }]))[0]
         
         return {
              "task_id": task_id,
@@ -818,6 +701,8 @@ async def moderate_single(request: Request, moderation_request: ModerationReques
              "status": "reviewing",
              "message": "审核任务已提交，正在处理中"
          }
+    except RateLimitError:
+        raise
     except Exception as e:
         service_logger.error(f"单条审核失败: {e}")
         raise HTTPException(status_code=500, detail=f"审核失败: {str(e)}")
@@ -832,14 +717,17 @@ async def moderate_batch(request: Request, batch_request: BatchModerationRequest
         
         logger.info(f"收到批量审核请求: {len(batch_request.contents)} 条内容")
         
-        # 执行批量审核
-        result = await service.moderate_batch(
-            contents=batch_request.contents,
-            content_ids=batch_request.content_ids,
-            parallel=batch_request.parallel,
-            content_type=batch_request.content_type,
-            timeout=batch_request.timeout
-        )
+        # 执行批量审核，处理期间占用准入名额
+        async with request.app.state.admission.admission(
+            get_client_id(request), units=len(batch_request.contents)
+        ):
+            result = await service.moderate_batch(
+                contents=batch_request.contents,
+                content_ids=batch_request.content_ids,
+                parallel=batch_request.parallel,
+                content_type=batch_request.content_type,
+                timeout=batch_request.timeout
+            )
         
         return {
             "success": True,
@@ -847,6 +735,8 @@ async def moderate_batch(request: Request, batch_request: BatchModerationRequest
             "message": "批量审核完成"
         }
         
+    except RateLimitError:
+        raise
     except Exception as e:
         service_logger.error(f"批量审核失败: {e}")
         raise HTTPException(status_code=500, detail=f"批量审核失败: {str(e)}")
@@ -871,11 +761,26 @@ async def get_content_categories():
 
 @router.get("/task/{task_id}", summary="查询审核任务状态")
 async def get_task_status(task_id: str):
-    """查询审核任务状态"""
-    if task_id not in task_status_store:
+    """查询审核任务状态，作业保存在持久化队列中，任一API进程均可查询"""
+    job = await asyncio.to_thread(get_job_queue().get, task_id)
+    if job is None:
         raise HTTPException(status_code=404, detail="任务不存在")
     
-    return task_status_store[task_id]
+    status = {
+        "status": job["status"],
+        "content_id": job["content_id"],
+        "attempts": job["attempts"],
+        "created_at": job["created_at"]
+    }
+    if job["status"] == ProcessingStatus.COMPLETED.value:
+        status.update(result=job["result"], message="审核完成", completed_at=job["finished_at"])
+    elif job["status"] == ProcessingStatus.FAILED.value:
+        status.update(error=job["error"], message=f"审核失败: {job['error']}", failed_at=job["finished_at"])
+    elif job["status"] == ProcessingStatus.PROCESSING.value:
+        status["message"] = "正在审核中..."
+    else:
+        status["message"] = f"排队中，上次失败: {job['error']}" if job["error"] else "排队中"
+    return status
 
 
 @router.get("/content/{content_id}/status", summary="查询内容审核状态")
@@ -907,6 +812,161 @@ async def get_content_status(content_id: int):
         raise HTTPException(status_code=500, detail=f"查询失败: {str(e)}")
 
 
+def content_status_snapshot(content_ids) -> Dict[int, Dict[str, Any]]:
+    """批量读取内容的审核状态"""
+    with db.connection_context():
+        rows = Contents.select(
+            Contents.id, Contents.audit_status, Contents.processing_status,
+            Contents.risk_level, Contents.updated_at
+        ).where(Contents.id.in_(list(content_ids)))
+        return {
+            row.id: {
+                "audit_status": row.audit_status,
+                "processing_status": row.processing_status,
+                "risk_level": row.risk_level,
+                "updated_at": str(row.updated_at) if row.updated_at else None
+            }
+            for row in rows
+        }
+
+
+def format_sse(event: Dict[str, Any]) -> str:
+    """按SSE格式编码一条事件，只有事件总线发布的事件带id，供断线重连时通过Last-Event-ID补发"""
+    lines = [f"id: {event['id']}"] if "id" in event else []
+    lines.append(f"event: {event['type']}")
+    lines.append(f"data: {json.dumps(event, ensure_ascii=False, default=str)}")
+    return "\n".join(lines) + "\n\n"
+
+
+def database_final_event(content_id: int, status: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """按数据库中的审核状态构造最终决策事件"""
+    if status is None:
+        return {"type": FINAL_EVENT, "content_id": content_id, "decision": "ERROR",
+                "error": "内容不存在", "source": "database"}
+    decisions = {AuditStatus.APPROVED.value: "APPROVED", AuditStatus.REJECTED.value: "REJECTED"}
+    return {"type": FINAL_EVENT, "content_id": content_id, "decision": decisions.get(status["audit_status"], "ERROR"),
+            "audit_status": status["audit_status"], "risk_level": status["risk_level"], "source": "database"}
+
+
+async def stream_audit_events(request: Request, content_ids: List[int], after: Optional[int],
+                              follow: bool, timeout: Optional[float]):
+    """推送一组内容的审核进度，所有内容都给出结论、客户端断开或超时后结束。
+    本进程内的审核通过事件总线实时推送；在其他工作进程中运行的审核没有事件，
+    定期按数据库核对，审核状态离开 reviewing 时补发一条 source 为 database 的最终决策"""
+    events_config = request.app.state.config.get("performance", {}).get("events", {}) or {}
+    keepalive = events_config.get("keepalive", 15)
+    reconcile_interval = events_config.get("reconcile_interval", 5)
+    timeout = timeout or events_config.get("stream_timeout", 600)
+
+    # 只有断线重连（带Last-Event-ID）时补发历史事件，新订阅以数据库快照为起点
+    bus = get_event_bus()
+    snapshot_id = bus.last_id
+    subscription = bus.subscribe(content_ids, after)
+    try:
+        snapshot = await asyncio.to_thread(content_status_snapshot, content_ids)
+        yield format_sse({"type": "snapshot", "contents": {
+            content_id: snapshot.get(content_id) for content_id in content_ids
+        }})
+
+        def finished_in_db(content_id: int, status: Optional[Dict[str, Any]]) -> bool:
+            if status is None:
+                return True
+            if status["audit_status"] == AuditStatus.REVIEWING.value:
+                return False
+            # follow模式下等待下一轮审核，状态更新过才算给出结论
+            return not follow or status["updated_at"] != (snapshot.get(content_id) or {}).get("updated_at")
+
+        # 重连时本进程有事件历史的内容以补发的事件为准，其余按数据库状态判断是否已结束
+        pending = set(content_ids)
+        for content_id in content_ids:
+            if after is not None and bus.history(content_id):
+                continue
+            if finished_in_db(content_id, snapshot.get(content_id)):
+                yield format_sse(database_final_event(content_id, snapshot.get(content_id)))
+                pending.discard(content_id)
+
+        now = time.monotonic()
+        stop_at = now + timeout
+        next_reconcile = now + reconcile_interval
+        last_sent = now
+        while pending:
+            now = time.monotonic()
+            if now >= stop_at:
+                yield format_sse({"type": "timeout", "pending": sorted(pending)})
+                break
+            event = await subscription.get(max(min(stop_at, next_reconcile, last_sent + keepalive) - now, 0))
+            if await request.is_disconnected():
+                break
+            if event is not None:
+                if follow and event["type"] in TERMINAL_EVENTS and event["id"] <= snapshot_id:
+                    # follow模式等待下一轮审核，补发的上一轮结论不结束订阅
+                    continue
+                yield format_sse(event)
+                last_sent = time.monotonic()
+                if event["type"] in TERMINAL_EVENTS:
+                    pending.discard(event["content_id"])
+                continue
+
+            now = time.monotonic()
+            if now >= next_reconcile:
+                statuses = await asyncio.to_thread(content_status_snapshot, pending)
+                for content_id in sorted(pending):
+                    if finished_in_db(content_id, statuses.get(content_id)):
+                        yield format_sse(database_final_event(content_id, statuses.get(content_id)))
+                        pending.discard(content_id)
+                        last_sent = now
+                next_reconcile = now + reconcile_interval
+            if pending and now - last_sent >= keepalive:
+                yield ": keep-alive\n\n"
+                last_sent = now
+    finally:
+        subscription.close()
+
+
+def audit_event_response(request: Request, content_ids: List[int], last_event_id: Optional[str],
+                         follow: bool, timeout: Optional[float]) -> StreamingResponse:
+    events_config = request.app.state.config.get("performance", {}).get("events", {}) or {}
+    max_contents = events_config.get("max_stream_contents", 200)
+    if not content_ids:
+        raise HTTPException(status_code=400, detail="需要至少一个内容ID")
+    if len(content_ids) > max_contents:
+        raise HTTPException(status_code=400, detail=f"单个连接最多订阅{max_contents}个内容")
+    after = int(last_event_id) if last_event_id and last_event_id.isdigit() else None
+    return StreamingResponse(
+        stream_audit_events(request, content_ids, after, follow, timeout),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@router.get("/events", summary="订阅审核进度（SSE）")
+async def stream_events(
+    request: Request,
+    content_ids: str = Query(..., description="内容ID，逗号分隔"),
+    follow: bool = Query(False, description="已结束的内容也保持订阅，等待下一轮审核"),
+    timeout: Optional[float] = Query(None, description="连接最长时长（秒），默认取配置"),
+    last_event_id: Optional[str] = Header(None)
+):
+    """以SSE推送一批内容的维度提交、等待厂商结果、维度结论和最终决策事件，替代轮询状态接口"""
+    try:
+        ids = list(dict.fromkeys(int(item) for item in content_ids.split(",") if item.strip()))
+    except ValueError:
+        raise HTTPException(status_code=400, detail="内容ID格式错误")
+    return audit_event_response(request, ids, last_event_id, follow, timeout)
+
+
+@router.get("/content/{content_id}/events", summary="订阅单条内容审核进度（SSE）")
+async def stream_content_events(
+    request: Request,
+    content_id: int,
+    follow: bool = Query(False, description="已结束的内容也保持订阅，等待下一轮审核"),
+    timeout: Optional[float] = Query(None, description="连接最长时长（秒），默认取配置"),
+    last_event_id: Optional[str] = Header(None)
+):
+    """以SSE推送单条内容的审核进度"""
+    return audit_event_response(request, [content_id], last_event_id, follow, timeout)
+
+
 @router.get("/risk-levels", summary="获取风险等级")
 async def get_risk_levels():
     """获取风险等级列表"""
@@ -998,12 +1058,13 @@ async def moderate_text(request: Request, text_request: TextModerationRequestAPI
             content=text_request.content,
             content_id=None,
             content_type="text",
-            priority=0,
+            priority=RequestPriority.INTERACTIVE,
             timeout=text_request.timeout
         )
         
-        # 直接调用审核服务进行文字审核
-        result = await service.moderate_text_direct(moderation_request)
+        # 直接调用审核服务进行文字审核，处理期间占用准入名额
+        async with request.app.state.admission.admission(get_client_id(request)):
+            result = await service.moderate_text_direct(moderation_request)
         
         processing_time = time.time() - start_time
         
@@ -1033,11 +1094,14 @@ async def moderate_text(request: Request, text_request: TextModerationRequestAPI
                     "risk_score": result.rule_result.risk_score if result.rule_result else 0.0,
                     "sensitive_matches": len(result.rule_result.sensitive_matches) if result.rule_result else 0,
                     "violated_categories": result.rule_result.violated_categories if result.rule_result else []
-                } if result.rule_result else None
+                } if result.rule_result else None,
+                "truncated_stages": result.truncated_stages
             },
             "message": "文字审核完成"
         }
         
+    except RateLimitError:
+        raise
     except Exception as e:
         processing_time = time.time() - start_time if 'start_time' in locals() else 0.0
         update_audit_stats(success=False, processing_time=processing_time)
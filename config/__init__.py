@@ -20,7 +20,9 @@ class Settings:
             'IMAGE_BUSINESS_ID': 'platform.wangyiyun.image_business_id',
             'AUDIO_BUSINESS_ID': 'platform.wangyiyun.audio_business_id',
             'VIDEO_BUSINESS_ID': 'platform.wangyiyun.video_business_id',
-            'TEXT_BUSINESS_ID': 'platform.wangyiyun.text_business_id'
+            'TEXT_BUSINESS_ID': 'platform.wangyiyun.text_business_id',
+            'WANGYIYUN_API_BASE': 'platform.wangyiyun.api_base',
+            'WANGYIYUN_CALLBACK_URL': 'platform.wangyiyun.callback_url'
         }
         
         if name in key_mapping:
@@ -1,15 +1,18 @@
 """
-检测引擎模块 - 包含AI代理引擎、规则引擎和融合引擎
+检测引擎模块 - 包含AI代理引擎、规则引擎、融合引擎和预筛分类器
 """
 
 from .base_engine import BaseEngine
 from .rule_engine import RuleEngine, create_rule_engine
 from .fusion_engine import FusionEngine, create_fusion_engine
+from .prescreen_engine import PrescreenClassifier, create_prescreen_classifier
 
 __all__ = [
     "BaseEngine",
     "RuleEngine",
     "create_rule_engine",
     "FusionEngine",
-    "create_fusion_engine"
+    "create_fusion_engine",
+    "PrescreenClassifier",
+    "create_prescreen_classifier"
 ] 
\ No newline at end of file
@@ -0,0 +1,182 @@
+"""
+预筛分类器 - 字符n-gram哈希 + 逻辑回归
+离线从历史审核结论训练，请求时对明显安全的文本跳过大模型调用
+"""
+
+import os
+import json
+import math
+from datetime import datetime
+from typing import Dict, Any, Optional, Sequence, Tuple
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from utils.text_features import hashed_feature_vector
+from utils.logger import get_logger
+
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_MODEL_PATH = os.path.join(project_root, "data", "prescreen.npz")
+
+
+class PrescreenClassifier:
+    """字符n-gram逻辑回归预筛分类器，输出文本违规概率"""
+
+    def __init__(
+        self,
+        n_features: int = 2 ** 18,
+        ngram_range: Tuple[int, int] = (1, 3),
+        skip_threshold: float = 0.05
+    ):
+        if np is None:
+            raise ImportError("预筛分类器需要安装 numpy")
+        self.n_features = n_features
+        self.ngram_range = tuple(ngram_range)
+        self.skip_threshold = skip_threshold
+        self.weights = np.zeros(n_features, dtype=np.float32)
+        self.bias = 0.0
+        self.report: Dict[str, Any] = {}
+        self.logger = get_logger("engine.prescreen")
+
+    def _featurize(self, text: str):
+        return hashed_feature_vector(text, self.n_features, self.ngram_range)
+
+    def predict_proba(self, text: str) -> float:
+        """返回文本违规的概率"""
+        indices, values = self._featurize(text)
+        z = self.bias + float(np.dot(self.weights[indices], values))
+        return 1.0 / (1.0 + math.exp(-max(min(z, 30.0), -30.0)))
+
+    def predict_proba_batch(self, texts: Sequence[str]) -> "np.ndarray":
+        """批量计算违规概率"""
+        return np.array([self.predict_proba(text) for text in texts], dtype=np.float64)
+
+    def is_confidently_safe(self, text: str) -> Tuple[bool, float]:
+        """判断文本是否可以跳过大模型，返回(是否跳过, 违规概率)"""
+        probability = self.predict_proba(text)
+        return probability <= self.skip_threshold, probability
+
+    def fit(
+        self,
+        texts: Sequence[str],
+        labels: Sequence[int],
+        epochs: int = 5,
+        learning_rate: float = 0.5,
+        l2: float = 1e-6,
+        seed: int = 42
+    ) -> "PrescreenClassifier":
+        """使用SGD训练逻辑回归，labels中1表示违规，0表示安全"""
+        features = [self._featurize(text) for text in texts]
+        targets = np.asarray(labels, dtype=np.float32)
+        rng = np.random.default_rng(seed)
+
+        for epoch in range(epochs):
+            lr = learning_rate / (1.0 + epoch)
+            total_loss = 0.0
+            for i in rng.permutation(len(features)):
+                indices, values = features[i]
+                z = self.bias + float(np.dot(self.weights[indices], values))
+                p = 1.0 / (1.0 + math.exp(-max(min(z, 30.0), -30.0)))
+                gradient = p - float(targets[i])
+                # 单篇文本内的索引已去重，可直接按索引更新
+                self.weights[indices] -= lr * (gradient * values + l2 * self.weights[indices])
+                self.bias -= lr * gradient
+                total_loss -= math.log(max(p if targets[i] else 1.0 - p, 1e-12))
+            self.logger.info(f"预筛分类器训练 epoch={epoch + 1}, loss={total_loss / max(len(features), 1):.4f}")
+        return self
+
+    @staticmethod
+    def choose_threshold(probabilities: "np.ndarray", labels: "np.ndarray", target_precision: float) -> float:
+        """选择满足目标精确率（跳过集合中安全样本占比）的最大跳过阈值"""
+        order = np.argsort(probabilities, kind="stable")
+        sorted_probs = probabilities[order]
+        safe = (np.asarray(labels)[order] == 0).astype(np.float64)
+        precision = np.cumsum(safe) / np.arange(1, len(safe) + 1)
+        # 阈值相同的样本要么一起跳过要么都不跳过，只在取值变化处切分
+        boundary = np.append(sorted_probs[1:] > sorted_probs[:-1], True)
+        candidates = np.nonzero((precision >= target_precision) & boundary)[0]
+        if len(candidates) == 0:
+            return 0.0
+        return float(sorted_probs[candidates[-1]])
+
+    @staticmethod
+    def evaluate(probabilities: "np.ndarray", labels: "np.ndarray", threshold: float) -> Dict[str, Any]:
+        """统计跳过阈值下的精确率、跳过率和漏检数"""
+        labels = np.asarray(labels)
+        skipped = probabilities <= threshold
+        skipped_count = int(skipped.sum())
+        safe_skipped = int((skipped & (labels == 0)).sum())
+        unsafe_total = int((labels == 1).sum())
+        unsafe_skipped = skipped_count - safe_skipped
+        return {
+            "threshold": threshold,
+            "samples": int(len(labels)),
+            "skipped": skipped_count,
+            "skip_rate": skipped_count / len(labels) if len(labels) else 0.0,
+            "precision_at_threshold": safe_skipped / skipped_count if skipped_count else 1.0,
+            "unsafe_skipped": unsafe_skipped,
+            "unsafe_recall": 1.0 - unsafe_skipped / unsafe_total if unsafe_total else 1.0
+        }
+
+    def save(self, path: str):
+        """保存为压缩权重文件（float16权重 + 元信息）"""
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        meta = {
+            "n_features": self.n_features,
+            "ngram_range": list(self.ngram_range),
+            "skip_threshold": self.skip_threshold,
+            "report": self.report,
+            "trained_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        }
+        np.savez_compressed(
+            path,
+            weights=self.weights.astype(np.float16),
+            bias=np.float32(self.bias),
+            meta=np.array(json.dumps(meta, ensure_ascii=False))
+        )
+
+    @classmethod
+    def load(cls, path: str) -> "PrescreenClassifier":
+        """从权重文件加载分类器"""
+        with np.load(path, allow_pickle=False) as data:
+            meta = json.loads(str(data["meta"]))
+            classifier = cls(
+                n_features=meta["n_features"],
+                ngram_range=tuple(meta["ngram_range"]),
+                skip_threshold=meta["skip_threshold"]
+            )
+            classifier.weights = data["weights"].astype(np.float32)
+            classifier.bias = float(data["bias"])
+        classifier.report = meta.get("report", {})
+        return classifier
+
+
+def create_prescreen_classifier(config: Dict[str, Any]) -> Optional[PrescreenClassifier]:
+    """根据配置加载预筛分类器，未启用或不可用时返回None"""
+    logger = get_logger("engine.prescreen")
+    prescreen_config = config.get("engines", {}).get("prescreen", {})
+    if not prescreen_config.get("enabled", False):
+        return None
+    if np is None:
+        logger.warning("未安装numpy，预筛分类器已禁用")
+        return None
+
+    model_path = prescreen_config.get("model_path") or DEFAULT_MODEL_PATH
+    if not os.path.isabs(model_path):
+        model_path = os.path.join(project_root, model_path)
+    if not os.path.exists(model_path):
+        logger.warning(f"预筛模型文件不存在: {model_path}，请先运行 train_prescreen.py")
+        return None
+
+    try:
+        classifier = PrescreenClassifier.load(model_path)
+    except Exception as e:
+        logger.error(f"预筛模型加载失败: {e}")
+        return None
+
+    if prescreen_config.get("skip_threshold") is not None:
+        classifier.skip_threshold = float(prescreen_config["skip_threshold"])
+    logger.info(f"预筛分类器加载成功: {model_path}, 跳过阈值={classifier.skip_threshold}")
+    return classifier
@@ -4,19 +4,27 @@ from contextlib import asynccontextmanager
 from services.moderation_service import ModerationService
 from utils.config import load_config
 from utils.logger import logger
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request
 from fastapi.staticfiles import StaticFiles
 from starlette.middleware.cors import CORSMiddleware
-from starlette.responses import HTMLResponse
+from starlette.responses import HTMLResponse, JSONResponse
 from apps.checks import check_router
-from apps.moderation import router as moderation_router
+from apps.moderation import router as moderation_router, build_job_handlers, apply_job_result, restore_failed_jobs
 from apps.scraper import router as scraper_router
 from apps.content import router as content_router
 from apps.vocabulary import router as vocabulary_router
-from task import start_task_loop
-import threading
-
+from task.poller import start_task_pollers, stop_task_pollers, get_task_poller_stats
+from task.job_queue import get_job_queue
+from task.broker import create_broker_router
+from task.worker import create_job_worker
+from services.wangyiyunsdk import aclose_transport
+from services.wangyiyunsdk.transport import get_transport
+from services.aliyunsdk import close_aliyun_client
+
+from utils.events import get_event_bus
 from utils.metrics import get_metrics_collector
+from utils.rate_limiter import create_admission_controller
+from utils.exceptions import RateLimitError
 
 # 全局变量
 config = None
@@ -30,9 +38,6 @@ async def lifespan(app: FastAPI):
 
     # 启动时初始化
     try:
-        # 启动异步任务
-        # threading.Thread(target=start_task_loop, daemon=True).start()
-        ...
         # logger = get_logger("api")
         logger.info("API服务启动中...")
 
@@ -45,8 +50,21 @@ async def lifespan(app: FastAPI):
         # 设置到app状态中
         app.state.config = config
         app.state.service = service
+        app.state.admission = create_admission_controller(config)
         app.state.logger = logger
 
+        # 启动厂商结果集中轮询器，消化Task表中未完成的任务
+        start_task_pollers(config)
+
+        # 作业最终失败（含租约过期）时恢复内容状态，本进程的工作循环和作业代理的 /fail 都经此钩子
+        get_job_queue().on_failed = restore_failed_jobs
+
+        # 进程内审核作业工作循环，多进程部署时各进程按租约共同消化持久化队列
+        app.state.job_worker = None
+        if config.get("performance", {}).get("job_queue", {}).get("embedded_worker", True):
+            app.state.job_worker = create_job_worker(config, build_job_handlers(service))
+            app.state.job_worker.start()
+
         logger.info("API服务启动完成")
         yield
 
@@ -55,6 +73,11 @@ async def lifespan(app: FastAPI):
         raise
     finally:
         # 关闭时清理
+        if getattr(app.state, "job_worker", None) is not None:
+            await app.state.job_worker.stop()
+        await stop_task_pollers()
+        await aclose_transport()
+        close_aliyun_client()
         if service:
             await service.__aexit__(None, None, None)
         logger.info("API服务已关闭")
@@ -66,6 +89,17 @@ app = FastAPI(
     lifespan=lifespan
 )
 
+@app.exception_handler(RateLimitError)
+async def rate_limit_handler(request: Request, exc: RateLimitError):
+    """限流或队列已满时返回429"""
+    headers = {"Retry-After": str(exc.retry_after)} if exc.retry_after else None
+    return JSONResponse(
+        status_code=429,
+        content={"success": False, "message": exc.message, "retry_after": exc.retry_after},
+        headers=headers
+    )
+
+
 # 配置CORS
 app.add_middleware(
     CORSMiddleware,
@@ -83,6 +117,12 @@ app.include_router(moderation_router, prefix="/api/v1/moderation")
 app.include_router(content_router, prefix="/api/v1/content")
 app.include_router(vocabulary_router, prefix="/api/v1/vocabulary")
 
+# 配置了作业代理令牌时，API服务作为其他主机上工作进程的作业代理
+_job_queue_config = load_config().get("performance", {}).get("job_queue", {}) or {}
+_broker_token = (_job_queue_config.get("broker", {}) or {}).get("token")
+if _broker_token and _job_queue_config.get("backend", "sqlite") == "sqlite":
+    app.include_router(create_broker_router(get_job_queue(), _broker_token, on_result=apply_job_result), prefix="/api/v1/jobs")
+
 
 @app.get("/", response_class=HTMLResponse)
 async def read_index():
@@ -101,7 +141,16 @@ async def health_check():
             "status": health_status.get("status", "unknown"),
             "timestamp": health_status.get("timestamp"),
             "engines": health_status.get("engines", {}),
-            "statistics": health_status.get("statistics", {})
+            "statistics": health_status.get("statistics", {}),
+            "admission": app.state.admission.get_stats(),
+            "vendor_pollers": get_task_poller_stats(),
+            "events": get_event_bus().get_stats(),
+            "job_queue": {
+                **get_job_queue().get_stats(),
+                "worker": app.state.job_worker.get_stats() if app.state.job_worker else None,
+                "workers": get_job_queue().workers()
+            },
+            "vendor_transport": get_transport().get_stats()
         }
     except Exception as e:
         raise HTTPException(status_code=503, detail=f"服务不可用: {str(e)}")
@@ -27,7 +27,8 @@ else:
 import os
 project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 db_path = os.path.join(project_root, 'security_check.db')
-db = SqliteDatabase(db_path)
+# WAL模式下读不阻塞写，synchronous=normal 只在检查点时刷盘，减少高频小事务的提交开销
+db = SqliteDatabase(db_path, pragmas={"journal_mode": "wal", "synchronous": "normal"})
 
 
 class CustomDateTimeField(DateTimeField):
@@ -46,6 +47,7 @@ class Task(Model):
     type = CharField(choices=[(t.value, t.name) for t in TaskType])  # 任务类型
     status = IntegerField(choices=[(s.value, s.name) for s in TaskStatus])  # 任务状态
     content = CharField(null=True)  # 存储任务内容，一般为http链接
+    vendor = CharField(default="wangyiyun")  # 审核厂商：wangyiyun, aliyun
     is_compliant = BooleanField(null=True)
     result_text = TextField(null=True)
     created_at = CustomDateTimeField(default=datetime.now, help_text="创建时间")
@@ -110,18 +112,110 @@ class ViolationWord(Model):
             (('wrong_input',), False),  # 为错误输入创建索引，提高查询效率
         )
 
+# 媒体审核结论缓存表，同一媒体（规范化URL或文件内容哈希）复用已有结论，不再重复提交厂商
+class MediaVerdict(Model):
+    key = CharField(primary_key=True)  # 任务类型:规范化URL的sha1
+    type = CharField(choices=[(t.value, t.name) for t in TaskType])
+    url = TextField()  # 规范化后的URL
+    content_hash = CharField(null=True, index=True)  # 文件内容sha256，未计算时为空
+    task_id = CharField(null=True, index=True)  # 产生该结论的厂商任务
+    is_compliant = BooleanField(null=True)  # 为空表示审核中
+    result_text = TextField(null=True)
+    created_at = CustomDateTimeField(default=datetime.now, help_text="创建时间")
+    updated_at = CustomDateTimeField(default=datetime.now, help_text="更新时间")
+
+    class Meta:
+        database = db
+
+# 图片感知哈希表，缩放、重新压缩后的同一图片按汉明距离复用已有结论
+class ImageFingerprint(Model):
+    id = AutoField()
+    phash = BigIntegerField(index=True)  # 64位感知哈希，按有符号整数存储
+    url = TextField(null=True)
+    task_id = CharField(null=True, index=True)  # 产生该结论的厂商任务
+    is_compliant = BooleanField(null=True)  # 为空表示审核中
+    result_text = TextField(null=True)
+    created_at = CustomDateTimeField(default=datetime.now, help_text="创建时间")
+    updated_at = CustomDateTimeField(default=datetime.now, help_text="更新时间")
+
+    class Meta:
+        database = db
+
+# 审核作业队列表：API进程入队，工作循环按租约领取执行；进程退出后租约过期的作业可被其他工作循环重新领取
+class AuditJob(Model):
+    id = CharField(primary_key=True)  # 作业ID，即对外返回的task_id
+    kind = CharField()  # 作业类型，对应工作循环中注册的处理函数
+    content_id = IntegerField(null=True, index=True)
+    payload = TextField(null=True)  # 处理参数，JSON格式
+    priority = IntegerField(default=0)  # 数值越大越先领取
+    status = CharField(choices=[(s.value, s.name) for s in ProcessingStatus], default=ProcessingStatus.PENDING.value)
+    attempts = IntegerField(default=0)  # 已领取次数
+    max_attempts = IntegerField(default=3)
+    available_at = DateTimeField(default=datetime.now)  # 可领取时间，重试退避时推后
+    lease_owner = CharField(null=True)  # 持有租约的工作循环
+    lease_expires_at = DateTimeField(null=True)  # 租约到期后作业重新可见
+    result = TextField(null=True)  # 处理结果，JSON格式
+    error = TextField(null=True)
+    created_at = CustomDateTimeField(default=datetime.now, help_text="创建时间")
+    updated_at = CustomDateTimeField(default=datetime.now, help_text="更新时间")
+    finished_at = DateTimeField(null=True)  # 完成或最终失败时间，按此清理过期作业
+
+    class Meta:
+        database = db
+        indexes = (
+            (('status', 'available_at'), False),  # 领取时按状态和可领取时间查找
+        )
+
+# 作业工作循环心跳表，每个工作循环一行，记录最近一次上报时间和吞吐统计
+class WorkerHeartbeat(Model):
+    worker_id = CharField(primary_key=True)
+    info = TextField(null=True)  # 主机、进程、并发与吞吐统计，JSON格式
+    started_at = DateTimeField(default=datetime.now)
+    last_seen = DateTimeField(default=datetime.now)
+
+    class Meta:
+        database = db
+
+# 跨进程租约表：多进程部署时由持有租约的进程独占执行某项后台工作（如扫描Task表积压任务）
+class ServiceLease(Model):
+    name = CharField(primary_key=True)  # 租约名称
+    owner = CharField()  # 持有租约的进程
+    expires_at = DateTimeField()  # 到期未续约时其他进程可接管
+
+    class Meta:
+        database = db
+
 # Audit表已删除，相关功能迁移到Contents表中
 
+def _add_missing_columns():
+    """为已存在的旧表补充新增字段"""
+    from playhouse.migrate import SqliteMigrator, migrate
+
+    migrator = SqliteMigrator(db)
+    columns = {column.name for column in db.get_columns(Task._meta.table_name)}
+    if "vendor" not in columns:
+        migrate(migrator.add_column(Task._meta.table_name, "vendor", Task.vendor))
+
+
 # 创建表
 def create_tables():
     # 强制创建表，包含所有字段
     with db:
-        db.create_tables([Task, Contents, AuditStats, ViolationWord], safe=True)
+        db.create_tables([Task, Contents, AuditStats, ViolationWord, MediaVerdict, ImageFingerprint, AuditJob, WorkerHeartbeat, ServiceLease], safe=True)
+        _add_missing_columns()
     # print("数据库表创建成功！")
     # print("- Task 表")
     # print("- Contents 表 (包含 images, audios, videos 字段)")
     # print("- AuditStats 表 (审核统计表)")
     # print("- ViolationWord 表 (违规词库表)")
 
+def use_database(path: str):
+    """切换到另一个数据库文件并建表，供压测等离线工具使用，避免写入业务库"""
+    if not db.is_closed():
+        db.close()
+    db.init(path, pragmas={"journal_mode": "wal", "synchronous": "normal"})
+    create_tables()
+
+
 if __name__ == "__main__":
     create_tables()
\ No newline at end of file
@@ -2,7 +2,7 @@
 系统枚举定义
 """
 
-from enum import Enum
+from enum import Enum, IntEnum
 # 枚举类型：任务状态
 class TaskStatus(Enum):
     CREATED = 0  # 任务创建
@@ -63,6 +63,13 @@ class ProcessingStatus(str, Enum):
     TIMEOUT = "timeout"        # 超时
 
 
+class RequestPriority(IntEnum):
+    """审核请求优先级，数值越大越先获得AI调用名额"""
+    BULK = 0           # 批量/爬取审核
+    NORMAL = 5         # 普通请求
+    INTERACTIVE = 10   # 交互式实时审核
+
+
 class ActionType(str, Enum):
     """处理动作类型"""
     APPROVE = "approve"     # 通过
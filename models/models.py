@@ -143,6 +143,7 @@ class ModerationResult(BaseModel):
     # 统计信息
     total_matches: int = Field(0, description="总匹配数")
     categories_detected: List[ContentCategory] = Field(default_factory=list, description="检测到的分类")
+    truncated_stages: List[str] = Field(default_factory=list, description="因超时预算耗尽被截断的阶段")
 
     class Config:
         json_encoders = {
@@ -173,6 +174,8 @@ class BatchModerationResult(BaseModel):
     results: List[ModerationResult] = Field(..., description="审核结果列表")
     errors: List[Dict[str, Any]] = Field(default_factory=list, description="错误信息")
     processing_time: float = Field(..., description="总处理时间")
+    stage_timings: Dict[str, float] = Field(default_factory=dict, description="各阶段耗时（秒）")
+    truncated_stages: List[str] = Field(default_factory=list, description="因超时预算耗尽被截断的阶段")
     timestamp: datetime = Field(default_factory=datetime.now, description="处理时间戳")
 
     class Config:
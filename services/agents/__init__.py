@@ -4,9 +4,13 @@ AI代理模块 - 基于AgentScope实现的智能审核代理
 
 from .base_agent import BaseAgent
 from .moderation_agent import ModerationAgent, create_moderation_agent
+from .agent_pool import AgentPool, PrioritySlots, get_agent_pool
 
 __all__ = [
     "BaseAgent",
     "ModerationAgent", 
-    "create_moderation_agent"
+    "create_moderation_agent",
+    "AgentPool",
+    "PrioritySlots",
+    "get_agent_pool"
 ] 
\ No newline at end of file
@@ -0,0 +1,118 @@
+"""
+AI代理池 - 按后端限制在途大模型请求数，等待中的请求按优先级排队
+交互式审核请求优先于批量爬取审核获得调用名额
+"""
+
+import heapq
+import itertools
+import asyncio
+from contextlib import asynccontextmanager
+from typing import Dict, Any, List, Optional
+
+from models.models import AIResult
+from models.enums import RequestPriority
+from utils.logger import get_logger
+
+
+class PrioritySlots:
+    """优先级信号量：名额释放时唤醒优先级最高（同级先到先得）的等待者"""
+
+    def __init__(self, limit: int):
+        self.limit = max(int(limit), 1)
+        self.in_flight = 0
+        self._waiters: List[tuple] = []
+        self._counter = itertools.count()
+
+    @property
+    def waiting(self) -> int:
+        return sum(1 for _, _, future in self._waiters if not future.done())
+
+    async def acquire(self, priority: int = 0):
+        """获取名额，priority数值越大越先获得"""
+        # 有等待者时名额总是直接转交，不会出现空闲名额与等待者并存
+        if self.in_flight < self.limit:
+            self.in_flight += 1
+            return
+
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (-int(priority), next(self._counter), future))
+        try:
+            await future
+        except asyncio.CancelledError:
+            # 名额已转交给本请求但调用方已取消，转交给下一个等待者
+            if future.done() and not future.cancelled():
+                self.release()
+            raise
+
+    def release(self):
+        """释放名额，直接转交给最高优先级的等待者"""
+        while self._waiters:
+            _, _, future = heapq.heappop(self._waiters)
+            if not future.done():
+                future.set_result(None)
+                return
+        self.in_flight -= 1
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "limit": self.limit,
+            "in_flight": self.in_flight,
+            "waiting": self.waiting
+        }
+
+
+class AgentPool:
+    """AI代理池，每个模型后端一组优先级名额"""
+
+    def __init__(self, default_limit: int = 4, backend_limits: Optional[Dict[str, int]] = None):
+        self.default_limit = default_limit
+        self.backend_limits = backend_limits or {}
+        self.logger = get_logger("agent_pool")
+        self._slots: Dict[str, PrioritySlots] = {}
+
+    def _get_slots(self, backend: str) -> PrioritySlots:
+        slots = self._slots.get(backend)
+        if slots is None:
+            slots = PrioritySlots(self.backend_limits.get(backend, self.default_limit))
+            self._slots[backend] = slots
+        return slots
+
+    @asynccontextmanager
+    async def slot(self, backend: str, priority: int = RequestPriority.NORMAL):
+        """占用指定后端的一个调用名额"""
+        slots = self._get_slots(backend)
+        await slots.acquire(priority)
+        try:
+            yield
+        finally:
+            slots.release()
+
+    async def process(self, agent, content: str, priority: int = RequestPriority.NORMAL, **kwargs) -> AIResult:
+        """在名额限制下调用代理的异步处理方法"""
+        async with self.slot(agent.backend_key, priority):
+            return await agent.aprocess(content, **kwargs)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取各后端的在途和排队数"""
+        return {backend: slots.get_stats() for backend, slots in self._slots.items()}
+
+
+def create_agent_pool(config: Dict[str, Any]) -> AgentPool:
+    """根据配置创建代理池"""
+    pool_config = config.get("performance", {}).get("agent_pool", {})
+    return AgentPool(
+        default_limit=pool_config.get("max_in_flight", 4),
+        backend_limits=pool_config.get("backends") or {}
+    )
+
+
+# 全局代理池实例
+_agent_pool = None
+
+
+def get_agent_pool(config: Optional[Dict[str, Any]] = None) -> AgentPool:
+    """获取全局代理池，首次调用时按配置创建"""
+    global _agent_pool
+    if _agent_pool is None:
+        _agent_pool = create_agent_pool(config or {})
+    return _agent_pool
@@ -3,6 +3,7 @@ AI代理基类
 """
 
 import time
+import asyncio
 from abc import ABC, abstractmethod
 from typing import Dict, Any, Optional
 
@@ -40,6 +41,20 @@ class BaseAgent(ABC):
         """处理内容，返回AI审核结果"""
         pass
     
+    async def aprocess(self, content: str, **kwargs) -> AIResult:
+        """异步处理内容，默认在线程中执行同步的process"""
+        return await asyncio.to_thread(self.process, content, **kwargs)
+    
+    @property
+    def backend_key(self) -> str:
+        """模型后端标识，代理池按此限制在途请求数"""
+        return (
+            self.model_config.get("api_base")
+            or self.model_config.get("config_name")
+            or self.model_config.get("model_name")
+            or self.name
+        )
+    
     def _validate_input(self, content: str) -> None:
         """验证输入内容"""
         if not content or not content.strip():
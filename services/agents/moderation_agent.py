@@ -3,10 +3,10 @@
 """
 
 import time
-import json
-import re
+import asyncio
 from typing import Dict, Any, List, Optional
 import requests
+import aiohttp
 
 import agentscope
 from agentscope.agents import UserAgent
@@ -15,7 +15,8 @@ from agentscope.models import OllamaChatWrapper
 
 from .base_agent import BaseAgent
 from models.models import AIResult
-from models.enums import RiskLevel, ContentCategory
+from models.enums import RiskLevel
+from utils.ai_parser import get_ai_response_parser
 from utils.exceptions import ModelError, TimeoutError
 from utils.logger import get_logger
 from utils.metrics import record_timing
@@ -36,6 +37,9 @@ class ModerationAgent(BaseAgent):
         # 优化后的提示词模板
         self.system_prompt = self._create_system_prompt()
         
+        # 异步调用复用的aiohttp会话
+        self._session: Optional[aiohttp.ClientSession] = None
+        
         # 初始化AgentScope模型
         self.model = None
         self.agent = None
@@ -231,28 +235,82 @@ class ModerationAgent(BaseAgent):
             self._record_metrics(processing_time, "error")
             return self._create_default_result(content, f"处理失败: {str(e)}")
     
-    def _process_with_ollama(self, content: str) -> AIResult:
-        """使用Ollama处理内容"""
-        api_base = self.model_config.get("api_base", "http://175.27.143.201:11434")
-        model_name = self.model_config.get("model_name", "qwen2.5:7b")
+    async def aprocess(self, content: str, **kwargs) -> AIResult:
+        """异步处理内容审核，Ollama后端直接走aiohttp，AgentScope后端在线程中执行"""
+        if self.agent:
+            return await super().aprocess(content, **kwargs)
         
-        # 构建请求
-        prompt = f"{self.system_prompt}\n\n内容：{content}"
-        
-        payload = {
-            "model": model_name,
-            "prompt": prompt,
+        start_time = time.time()
+        try:
+            self._validate_input(content)
+            result = await self._aprocess_with_ollama(content)
+            
+            processing_time = time.time() - start_time
+            result.processing_time = processing_time
+            result.model_name = self.model_config.get("model_name", "unknown")
+            
+            self._record_metrics(processing_time, "success")
+            return result
+            
+        except Exception as e:
+            processing_time = time.time() - start_time
+            self.logger.error(f"内容处理失败: {e}")
+            self._record_metrics(processing_time, "error")
+            return self._create_default_result(content, f"处理失败: {str(e)}")
+    
+    def _build_ollama_payload(self, content: str) -> Dict[str, Any]:
+        """构建Ollama生成请求"""
+        return {
+            "model": self.model_config.get("model_name", "qwen2.5:7b"),
+            "prompt": f"{self.system_prompt}\n\n内容：{content}",
             "stream": False,
             "options": {
                 "temperature": self.model_config.get("temperature", 0.1),
                 "num_predict": self.model_config.get("max_tokens", 2000),
             }
         }
+    
+    async def _get_session(self) -> aiohttp.ClientSession:
+        """获取复用的aiohttp会话"""
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(
+                timeout=aiohttp.ClientTimeout(total=self.timeout)
+            )
+        return self._session
+    
+    async def aclose(self):
+        """关闭aiohttp会话"""
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+    
+    async def _aprocess_with_ollama(self, content: str) -> AIResult:
+        """使用aiohttp异步调用Ollama"""
+        api_base = self.model_config.get("api_base", "http://175.27.143.201:11434")
+        session = await self._get_session()
         
+        try:
+            async with session.post(
+                f"{api_base}/api/generate",
+                json=self._build_ollama_payload(content)
+            ) as response:
+                response.raise_for_status()
+                result_data = await response.json(content_type=None)
+            
+            return self._parse_ai_response(result_data.get("response", ""))
+            
+        except asyncio.TimeoutError:
+            raise TimeoutError(f"Ollama请求超时 ({self.timeout}s)")
+        except aiohttp.ClientError as e:
+            raise ModelError(f"Ollama请求失败: {e}")
+    
+    def _process_with_ollama(self, content: str) -> AIResult:
+        """使用Ollama处理内容"""
+        api_base = self.model_config.get("api_base", "http://175.27.143.201:11434")
         try:
             response = requests.post(
                 f"{api_base}/api/generate",
-                json=payload,
+                json=self._build_ollama_payload(content),
                 timeout=self.timeout
             )
             response.raise_for_status()
@@ -287,112 +345,7 @@ class ModerationAgent(BaseAgent):
     
     def _parse_ai_response(self, response_text: str) -> AIResult:
         """解析AI响应"""
-        try:
-            # 尝试提取JSON
-            json_match = re.search(r'```json\s*(\{.*?\})\s*```', response_text, re.DOTALL)
-            if json_match:
-                json_str = json_match.group(1)
-            else:
-                # 尝试直接解析整个响应
-                json_str = response_text.strip()
-            
-            data = json.loads(json_str)
-            
-            # 映射风险等级
-            risk_level_map = {
-                "safe": RiskLevel.SAFE,
-                "suspicious": RiskLevel.SUSPICIOUS,
-                "risky": RiskLevel.RISKY,
-                "blocked": RiskLevel.BLOCKED
-            }
-            
-            risk_level = risk_level_map.get(data.get("risk_level", "safe"), RiskLevel.SAFE)
-            
-            # 映射分类
-            category_map = {
-                "political": ContentCategory.POLITICAL,
-                "violence": ContentCategory.VIOLENCE,
-                "adult": ContentCategory.ADULT,
-                "illegal": ContentCategory.ILLEGAL,
-                "fraud": ContentCategory.FRAUD,
-                "privacy": ContentCategory.PRIVACY,
-                "hate_speech": ContentCategory.HATE_SPEECH,
-                "harassment": ContentCategory.HARASSMENT,
-                "spam": ContentCategory.SPAM,
-                "misinformation": ContentCategory.MISINFORMATION
-            }
-            
-            categories = [
-                category_map.get(cat, ContentCategory.OTHER)
-                for cat in data.get("categories", [])
-                if cat in category_map
-            ]
-            
-            # 计算风险分数
-            confidence = data.get("confidence_score", 0.5)
-            risk_score = self._calculate_risk_score(risk_level, confidence)
-            
-            return AIResult(
-                risk_level=risk_level,
-                violated_categories=categories,
-                risk_score=risk_score,
-                risk_reasons=data.get("recommendations", []),
-                detailed_analysis=data.get("reasoning", ""),
-                confidence_score=confidence,
-                suspicious_segments=data.get("suspicious_segments", []),
-                keywords_found=data.get("keywords_found", []),
-                evasion_techniques=data.get("evasion_techniques", []),
-                reasoning=data.get("reasoning", ""),
-                recommendations=data.get("recommendations", [])
-            )
-            
-        except (json.JSONDecodeError, KeyError) as e:
-            self.logger.warning(f"AI响应解析失败，使用后备解析: {e}")
-            return self._fallback_parse(response_text)
-    
-    def _fallback_parse(self, response_text: str) -> AIResult:
-        """后备解析方法"""
-        text_lower = response_text.lower()
-        
-        # 简单的关键词检测
-        if any(keyword in text_lower for keyword in ["blocked", "严重", "违规"]):
-            risk_level = RiskLevel.BLOCKED
-            risk_score = 0.8
-        elif any(keyword in text_lower for keyword in ["risky", "风险", "危险"]):
-            risk_level = RiskLevel.RISKY
-            risk_score = 0.6
-        elif any(keyword in text_lower for keyword in ["suspicious", "可疑", "注意"]):
-            risk_level = RiskLevel.SUSPICIOUS
-            risk_score = 0.4
-        else:
-            risk_level = RiskLevel.SAFE
-            risk_score = 0.1
-        
-        return AIResult(
-            risk_level=risk_level,
-            violated_categories=[],
-            risk_score=risk_score,
-            risk_reasons=["AI响应解析失败，使用简单分析"],
-            detailed_analysis=response_text[:200] + "...",
-            confidence_score=0.3,
-            suspicious_segments=[],
-            keywords_found=[],
-            evasion_techniques=[],
-            reasoning="后备解析方法",
-            recommendations=["建议人工复核"]
-        )
-    
-    def _calculate_risk_score(self, risk_level: RiskLevel, confidence: float) -> float:
-        """根据风险等级和置信度计算风险分数"""
-        base_scores = {
-            RiskLevel.SAFE: 0.1,
-            RiskLevel.SUSPICIOUS: 0.4,
-            RiskLevel.RISKY: 0.7,
-            RiskLevel.BLOCKED: 0.9
-        }
-        base_score = base_scores.get(risk_level, 0.5)
-        # 置信度影响最终分数
-        return min(base_score * confidence + 0.1, 1.0)
+        return get_ai_response_parser().parse(response_text, source=self.name)
     
     def _create_default_result(self, content: str, error_msg: str) -> AIResult:
         """创建默认错误结果"""
@@ -0,0 +1,147 @@
+"""
+阿里云内容安全服务
+与易盾相同的任务登记：每条提交内容写入Task表（vendor=aliyun），同步检测的结论直接回写并写入媒体结论缓存，
+异步检测（音频、视频）登记为未完成，由阿里云结果轮询器批量查询后统一回写
+"""
+
+import asyncio
+from datetime import datetime
+from typing import Dict, Tuple
+
+from models.database import Task, db
+from models.enums import TaskType, TaskStatus
+from services.media_cache import get_media_cache
+from utils.logger import get_logger
+from .client import (
+    AliyunGreenClient,
+    create_aliyun_client,
+    get_aliyun_client,
+    close_aliyun_client,
+    parse_task_result,
+    QUERY_BATCH_SIZE
+)
+
+logger = get_logger("aliyun")
+
+VENDOR = "aliyun"
+
+SUBMIT_TASK_TYPES = {
+    "text": TaskType.TEXT.value,
+    "images": TaskType.IMAGE.value,
+    "audios": TaskType.AUDIO.value,
+    "videos": TaskType.VIDEO.value
+}
+# 异步检测的模态，结论由轮询器查询
+ASYNC_TASK_TYPES = {"audios": TaskType.AUDIO.value, "videos": TaskType.VIDEO.value}
+_TASK_TYPE_MODALITIES = {task_type: modality for modality, task_type in ASYNC_TASK_TYPES.items()}
+
+
+def _submit_result(modality, content, item):
+    result = {"task_id": item.get("task_id"), "data_id": item["data_id"]}
+    if modality != "text":
+        result["file_path"] = content
+    if not item.get("task_id") or item.get("code") not in (200, 280):
+        result["task_id"] = None
+        result["msg"] = f"Error: {item.get('msg')}"
+        return result
+    # 异步检测提交成功只表示任务已受理，结论由轮询器查询
+    verdict = parse_task_result(item) if modality not in ASYNC_TASK_TYPES else None
+    if verdict is None:
+        result["msg"] = "Pending"
+    else:
+        result["msg"] = "Completed"
+        result["status"] = "completed"
+        result["is_compliant"], result["result_text"] = verdict
+    return result
+
+
+def _record_scanned(modality, contents, items):
+    """按批登记Task，同步检测的结论一并写入；媒体的同步结论写入结论缓存"""
+    results = [_submit_result(modality, content, item) for content, item in zip(contents, items)]
+    now = datetime.now()
+    rows = []
+    for content, result in zip(contents, results):
+        if not result["task_id"]:
+            continue
+        completed = result.get("status") == "completed"
+        rows.append({
+            "id": result["data_id"],
+            "task_id": result["task_id"],
+            "type": SUBMIT_TASK_TYPES[modality],
+            "vendor": VENDOR,
+            "status": (TaskStatus.SUCCESS if completed else TaskStatus.CREATED).value,
+            "content": content,
+            "is_compliant": result.get("is_compliant"),
+            "result_text": result.get("result_text"),
+            "created_at": now,
+            "updated_at": now
+        })
+    cache = get_media_cache() if modality != "text" else None
+    finished = {result["task_id"]: (result["is_compliant"], result["result_text"])
+                for result in results if result.get("status") == "completed"}
+    if not rows:
+        return results
+    try:
+        # Task与媒体结论缓存在同一事务中登记
+        with db.atomic():
+            Task.insert_many(rows).execute()
+            if cache is not None and finished:
+                # 只缓存已完成的结论：异步任务不登记在途，避免其他厂商复用后按自己的接口查询
+                cache.record_submitted(SUBMIT_TASK_TYPES[modality], [
+                    (content, result["task_id"], None)
+                    for content, result in zip(contents, results) if result["task_id"] in finished
+                ])
+                cache.record_results(finished)
+    except Exception as e:
+        logger.error(f"登记{len(rows)}个阿里云{modality}任务失败: {e}")
+    return results
+
+
+def check_service(modality, contents):
+    """同步批量提交，返回结果与输入顺序一致"""
+    client = get_aliyun_client()
+    if client is None:
+        return [{"task_id": None, "msg": "Aliyun client not initialized"} for _ in contents]
+    contents = list(contents)
+    return _record_scanned(modality, contents, client.scan(modality, contents))
+
+
+async def acheck_service(modality, contents):
+    """异步批量提交，各批次并发发送，Task登记在线程中执行"""
+    client = get_aliyun_client()
+    if client is None:
+        return [{"task_id": None, "msg": "Aliyun client not initialized"} for _ in contents]
+    contents = list(contents)
+    items = await client.ascan(modality, contents)
+    return await asyncio.to_thread(_record_scanned, modality, contents, items)
+
+
+async def aquery_tasks(task_ids, task_type) -> Dict[str, Tuple[bool, str]]:
+    """批量查询异步检测结果，只返回已完成的任务，不更新Task表"""
+    modality = _TASK_TYPE_MODALITIES.get(task_type)
+    if modality is None:
+        raise Exception(f"Unsupported aliyun async task type: {task_type}")
+    client = get_aliyun_client()
+    if client is None:
+        raise Exception("Aliyun client not initialized")
+    return await client.aquery(modality, task_ids)
+
+
+from .aliyunsdk import check_images_service, check_audios_service, check_videos_service
+
+__all__ = [
+    "AliyunGreenClient",
+    "create_aliyun_client",
+    "get_aliyun_client",
+    "close_aliyun_client",
+    "parse_task_result",
+    "QUERY_BATCH_SIZE",
+    "SUBMIT_TASK_TYPES",
+    "ASYNC_TASK_TYPES",
+    "check_service",
+    "acheck_service",
+    "aquery_tasks",
+    "check_images_service",
+    "check_audios_service",
+    "check_videos_service"
+]
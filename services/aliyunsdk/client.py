@@ -0,0 +1,248 @@
+"""
+阿里云内容安全共享客户端
+长期复用一个AcsClient（SDK内部维护HTTP连接池），同一模态的多条内容合并为一次多任务请求，
+各批次在专用线程池中并发发送；文本和图片为同步检测直接返回结论，音频和视频为异步检测，返回taskId供轮询器查询
+"""
+
+import json
+import uuid
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, List, Optional, Tuple
+
+try:
+    from aliyunsdkcore.client import AcsClient
+    from aliyunsdkcore.acs_exception.exceptions import ClientException, ServerException
+    from aliyunsdkgreen.request.v20180509 import (
+        TextScanRequest,
+        ImageSyncScanRequest,
+        VoiceAsyncScanRequest,
+        VoiceAsyncScanResultsRequest,
+        VideoAsyncScanRequest,
+        VideoAsyncScanResultsRequest
+    )
+except ImportError:
+    AcsClient = None
+
+from utils.logger import get_logger
+
+
+DEFAULT_SCENES = {
+    "text": ["antispam"],
+    "images": ["porn", "terrorism"],
+    "audios": ["antispam"],
+    "videos": ["porn", "terrorism"]
+}
+
+# 单次请求可携带的最大任务数
+DEFAULT_BATCH_SIZES = {"text": 100, "images": 100, "audios": 100, "videos": 100}
+QUERY_BATCH_SIZE = 100
+
+# 任务返回码：200为检测完成，280为异步检测处理中
+DONE_CODE = 200
+PROCESSING_CODE = 280
+
+
+def parse_task_result(item: Dict[str, Any]) -> Optional[Tuple[bool, str]]:
+    """解析单个任务的各场景结论，检测未完成时返回None，所有场景均为pass时判定合规"""
+    if item.get("code") != DONE_CODE:
+        return None
+    scene_results = item.get("results") or []
+    suggestions = [
+        f"{scene.get('scene')}: {scene.get('suggestion')}({scene.get('label')})" for scene in scene_results
+    ]
+    is_compliant = all(scene.get("suggestion") == "pass" for scene in scene_results)
+    return is_compliant, "; ".join(suggestions) or "无检测结果"
+
+
+class AliyunGreenClient:
+    """阿里云内容安全客户端：共享AcsClient + 多任务批量请求 + 批次并发发送"""
+
+    def __init__(
+        self,
+        access_key_id: str,
+        access_key_secret: str,
+        region: str = "cn-shanghai",
+        endpoint: str = "",
+        protocol: str = "",
+        pool_size: int = 16,
+        connect_timeout: float = 3.0,
+        read_timeout: float = 10.0,
+        batch_sizes: Optional[Dict[str, int]] = None,
+        scenes: Optional[Dict[str, List[str]]] = None
+    ):
+        if AcsClient is None:
+            raise ImportError("阿里云审核需要安装 aliyun-python-sdk-core 和 aliyun-python-sdk-green")
+        self.endpoint = endpoint
+        self.protocol = protocol
+        self.pool_size = pool_size
+        self.batch_sizes = {**DEFAULT_BATCH_SIZES, **(batch_sizes or {})}
+        self.scenes = {**DEFAULT_SCENES, **(scenes or {})}
+        self.logger = get_logger("aliyun.client")
+
+        self.client = AcsClient(
+            access_key_id, access_key_secret, region,
+            connect_timeout=connect_timeout, timeout=read_timeout, pool_size=pool_size
+        )
+        # SDK为同步调用，使用专用线程池，线程数与连接池大小一致
+        self._executor = ThreadPoolExecutor(max_workers=pool_size, thread_name_prefix="aliyun-green")
+        self.requests = 0
+        self.tasks = 0
+        self.failures = 0
+
+    @staticmethod
+    def _submit_request(modality: str):
+        return {
+            "text": TextScanRequest.TextScanRequest,
+            "images": ImageSyncScanRequest.ImageSyncScanRequest,
+            "audios": VoiceAsyncScanRequest.VoiceAsyncScanRequest,
+            "videos": VideoAsyncScanRequest.VideoAsyncScanRequest
+        }[modality]()
+
+    @staticmethod
+    def _query_request(modality: str):
+        return {
+            "audios": VoiceAsyncScanResultsRequest.VoiceAsyncScanResultsRequest,
+            "videos": VideoAsyncScanResultsRequest.VideoAsyncScanResultsRequest
+        }[modality]()
+
+    def _do_action(self, request, content: Any) -> Dict[str, Any]:
+        """发送一次请求，请求失败或返回码非200时抛出异常"""
+        request.set_accept_format("JSON")
+        if self.endpoint:
+            request.set_endpoint(self.endpoint)
+        if self.protocol:
+            request.set_protocol_type(self.protocol)
+        request.set_content(json.dumps(content).encode("utf-8"))
+        self.requests += 1
+        try:
+            response = json.loads(self.client.do_action_with_exception(request))
+        except (ClientException, ServerException, ValueError) as e:
+            self.failures += 1
+            raise Exception(f"阿里云请求失败: {e}")
+        if response.get("code") != DONE_CODE:
+            self.failures += 1
+            raise Exception(f"阿里云请求失败: {response.get('code')} {response.get('msg')}")
+        return response
+
+    def chunks(self, modality: str, contents: List[str]) -> List[List[str]]:
+        size = self.batch_sizes[modality]
+        return [contents[start:start + size] for start in range(0, len(contents), size)]
+
+    def scan_batch(self, modality: str, contents: List[str]) -> List[Dict[str, Any]]:
+        """一次请求提交一批内容，按dataId把任务结果对应回各条目，结果与输入顺序一致"""
+        data_ids = [str(uuid.uuid4()) for _ in contents]
+        key = "content" if modality == "text" else "url"
+        body = {
+            "tasks": [{"dataId": data_id, key: content} for data_id, content in zip(data_ids, contents)],
+            "scenes": self.scenes[modality]
+        }
+        if modality == "audios":
+            body["live"] = False
+        try:
+            response = self._do_action(self._submit_request(modality), body)
+        except Exception as e:
+            return [{"data_id": data_id, "code": None, "msg": str(e)} for data_id in data_ids]
+        self.tasks += len(contents)
+
+        by_data_id = {item.get("dataId"): item for item in response.get("data") or [] if isinstance(item, dict)}
+        return [
+            {
+                "data_id": data_id,
+                "task_id": by_data_id.get(data_id, {}).get("taskId"),
+                "code": by_data_id.get(data_id, {}).get("code"),
+                "msg": by_data_id.get(data_id, {}).get("msg", "无任务结果"),
+                "results": by_data_id.get(data_id, {}).get("results")
+            }
+            for data_id in data_ids
+        ]
+
+    def scan(self, modality: str, contents: List[str]) -> List[Dict[str, Any]]:
+        """同步分批提交，各批次在线程池中并发发送"""
+        batches = list(self._executor.map(lambda chunk: self.scan_batch(modality, chunk), self.chunks(modality, contents)))
+        return [item for batch in batches for item in batch]
+
+    async def ascan(self, modality: str, contents: List[str]) -> List[Dict[str, Any]]:
+        """异步分批提交，各批次并发发送"""
+        loop = asyncio.get_running_loop()
+        batches = await asyncio.gather(*[
+            loop.run_in_executor(self._executor, self.scan_batch, modality, chunk)
+            for chunk in self.chunks(modality, contents)
+        ])
+        return [item for batch in batches for item in batch]
+
+    def query(self, modality: str, task_ids: List[str]) -> Dict[str, Tuple[bool, str]]:
+        """批量查询异步检测结果（最多QUERY_BATCH_SIZE个），只返回已完成的任务 {task_id: (是否合规, 结果描述)}"""
+        response = self._do_action(self._query_request(modality), list(task_ids))
+        finished = {}
+        for item in response.get("data") or []:
+            parsed = parse_task_result(item) if isinstance(item, dict) else None
+            if parsed is not None and item.get("taskId"):
+                finished[item["taskId"]] = parsed
+        return finished
+
+    async def aquery(self, modality: str, task_ids: List[str]) -> Dict[str, Tuple[bool, str]]:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, self.query, modality, list(task_ids))
+
+    def close(self):
+        """关闭线程池"""
+        self._executor.shutdown(wait=False)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取请求、任务与失败次数"""
+        return {
+            "requests": self.requests,
+            "tasks": self.tasks,
+            "failures": self.failures,
+            "pool_size": self.pool_size
+        }
+
+
+def create_aliyun_client(config: Optional[Dict[str, Any]] = None) -> Optional[AliyunGreenClient]:
+    """根据 platform.aliyun 配置创建客户端，SDK未安装或未配置AccessKey时返回None"""
+    config = config or {}
+    logger = get_logger("aliyun.client")
+    if AcsClient is None:
+        logger.warning("未安装阿里云内容安全SDK，阿里云审核不可用")
+        return None
+    if not config.get("access_key_id") or not config.get("access_key_secret"):
+        logger.warning("未配置阿里云AccessKey，阿里云审核不可用")
+        return None
+    return AliyunGreenClient(
+        access_key_id=config["access_key_id"],
+        access_key_secret=config["access_key_secret"],
+        region=config.get("region") or "cn-shanghai",
+        endpoint=config.get("endpoint") or "",
+        protocol=config.get("protocol") or "",
+        pool_size=config.get("pool_size", 16),
+        connect_timeout=config.get("connect_timeout", 3.0),
+        read_timeout=config.get("read_timeout", 10.0),
+        batch_sizes=config.get("batch_sizes"),
+        scenes=config.get("scenes")
+    )
+
+
+# 全局共享客户端
+_aliyun_client = None
+_aliyun_client_loaded = False
+
+
+def get_aliyun_client() -> Optional[AliyunGreenClient]:
+    """获取全局共享客户端，首次调用时按配置创建，不可用时返回None"""
+    global _aliyun_client, _aliyun_client_loaded
+    if not _aliyun_client_loaded:
+        try:
+            from config import settings
+        except ImportError:
+            settings = None
+        config = (settings.get_config("platform.aliyun", {}) or {}) if settings else {}
+        _aliyun_client = create_aliyun_client(config)
+        _aliyun_client_loaded = True
+    return _aliyun_client
+
+
+def close_aliyun_client():
+    """关闭已创建的全局客户端"""
+    if _aliyun_client is not None:
+        _aliyun_client.close()
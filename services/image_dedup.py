@@ -0,0 +1,322 @@
+"""
+图片近似重复检测 - 感知哈希 + BK树
+抓取站点常把同一图片缩放或重新压缩后放在不同URL下，URL和内容哈希都无法命中，
+这里对图片计算64位pHash/dHash，与已审核图片按汉明距离比对，阈值内直接沿用已有结论而不再提交厂商
+"""
+
+import io
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Dict, Any, List, Optional, Tuple
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
+
+from models.database import ImageFingerprint, db
+from utils.logger import get_logger
+
+
+HASH_BITS = 64
+
+
+def _to_signed(value: int) -> int:
+    return value - (1 << HASH_BITS) if value >= 1 << (HASH_BITS - 1) else value
+
+
+def _to_unsigned(value: int) -> int:
+    return value + (1 << HASH_BITS) if value < 0 else value
+
+
+def _bits_to_int(bits: "np.ndarray") -> int:
+    return int.from_bytes(np.packbits(bits.astype(np.uint8).ravel()).tobytes(), "big")
+
+
+def _grayscale(data: bytes, size: Tuple[int, int]) -> "np.ndarray":
+    with Image.open(io.BytesIO(data)) as image:
+        image = image.convert("L").resize(size, Image.LANCZOS)
+        return np.asarray(image, dtype=np.float64)
+
+
+_dct_matrices: Dict[int, "np.ndarray"] = {}
+
+
+def _dct_matrix(n: int) -> "np.ndarray":
+    """DCT-II变换矩阵"""
+    matrix = _dct_matrices.get(n)
+    if matrix is None:
+        k = np.arange(n)[:, None]
+        i = np.arange(n)[None, :]
+        matrix = np.cos(np.pi * (2 * i + 1) * k / (2 * n))
+        _dct_matrices[n] = matrix
+    return matrix
+
+
+def phash(data: bytes, hash_size: int = 8, highfreq_factor: int = 4) -> int:
+    """pHash：灰度缩放后做二维DCT，取左上角低频系数与中位数比较"""
+    size = hash_size * highfreq_factor
+    pixels = _grayscale(data, (size, size))
+    matrix = _dct_matrix(size)
+    low = (matrix @ pixels @ matrix.T)[:hash_size, :hash_size]
+    return _bits_to_int(low > np.median(low))
+
+
+def dhash(data: bytes, hash_size: int = 8) -> int:
+    """dHash：灰度缩放为 (hash_size+1) x hash_size，比较水平相邻像素"""
+    pixels = _grayscale(data, (hash_size + 1, hash_size))
+    return _bits_to_int(pixels[:, 1:] > pixels[:, :-1])
+
+
+HASH_FUNCTIONS = {"phash": phash, "dhash": dhash}
+
+
+def hamming(a: int, b: int) -> int:
+    """两个哈希的汉明距离"""
+    return bin(a ^ b).count("1")
+
+
+class BKTree:
+    """汉明距离BK树，节点为 [哈希, 值列表, {距离: 子节点}]"""
+
+    def __init__(self):
+        self._root = None
+        self.size = 0
+
+    def add(self, key: int, value: Any):
+        self.size += 1
+        if self._root is None:
+            self._root = [key, [value], {}]
+            return
+        node = self._root
+        while True:
+            distance = hamming(key, node[0])
+            if distance == 0:
+                node[1].append(value)
+                return
+            child = node[2].get(distance)
+            if child is None:
+                node[2][distance] = [key, [value], {}]
+                return
+            node = child
+
+    def search(self, key: int, radius: int) -> List[Tuple[int, Any]]:
+        """返回距离不超过radius的 [(距离, 值)]，按距离升序"""
+        found = []
+        stack = [self._root] if self._root is not None else []
+        while stack:
+            node = stack.pop()
+            distance = hamming(key, node[0])
+            if distance <= radius:
+                found.extend((distance, value) for value in node[1])
+            # 三角不等式：只有距离在 [d-r, d+r] 的子树可能命中
+            for child_distance, child in node[2].items():
+                if distance - radius <= child_distance <= distance + radius:
+                    stack.append(child)
+        found.sort(key=lambda item: item[0])
+        return found
+
+
+class NearDuplicateIndex:
+    """已审核图片的感知哈希索引：BK树 + ImageFingerprint表"""
+
+    def __init__(
+        self,
+        threshold: int = 6,
+        algorithm: str = "phash",
+        ttl: float = 7 * 86400,
+        max_size: int = 100000,
+        refresh_interval: float = 60.0
+    ):
+        if np is None or Image is None:
+            raise ImportError("图片近似重复检测需要安装 numpy 和 Pillow")
+        if algorithm not in HASH_FUNCTIONS:
+            raise ValueError(f"不支持的感知哈希算法: {algorithm}")
+
+        self.threshold = threshold
+        self.algorithm = algorithm
+        self.ttl = ttl
+        self.max_size = max_size
+        self.refresh_interval = refresh_interval
+        self.logger = get_logger("image_dedup")
+
+        self._tree = BKTree()
+        self._loaded = False
+        self._row_ids = set()  # 已加入BK树的ImageFingerprint行，避免增量加载重复添加
+        self._loaded_until = None  # 已加载行的最大updated_at
+        self._refreshed_at = 0.0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.failures = 0
+
+    def fingerprint(self, data: bytes) -> Optional[int]:
+        """计算图片的感知哈希，无法解码时返回None"""
+        try:
+            return HASH_FUNCTIONS[self.algorithm](data)
+        except Exception as e:
+            self.failures += 1
+            self.logger.debug(f"计算感知哈希失败: {e}")
+            return None
+
+    def fingerprints(self, images: Dict[str, bytes]) -> Dict[str, int]:
+        """批量计算感知哈希 {url: 哈希}"""
+        found = {}
+        for url, data in images.items():
+            value = self.fingerprint(data)
+            if value is not None:
+                found[url] = value
+        return found
+
+    def _add_row(self, row: ImageFingerprint, at: datetime):
+        if row.id in self._row_ids:
+            return
+        self._row_ids.add(row.id)
+        self._tree.add(_to_unsigned(row.phash), (row.task_id, row.is_compliant, row.result_text, at))
+        if self._loaded_until is None or at > self._loaded_until:
+            self._loaded_until = at
+
+    def _load_rows(self, since: datetime, limit: Optional[int] = None) -> int:
+        query = (ImageFingerprint
+                 .select()
+                 .where((ImageFingerprint.is_compliant.is_null(False)) & (ImageFingerprint.updated_at >= since))
+                 .order_by(ImageFingerprint.updated_at.desc()))
+        if limit:
+            query = query.limit(limit)
+        before = self._tree.size
+        for row in query:
+            at = row.updated_at
+            if isinstance(at, str):
+                at = datetime.strptime(at, "%Y-%m-%d %H:%M:%S")
+            self._add_row(row, at)
+        return self._tree.size - before
+
+    def _ensure_loaded(self):
+        """首次查找时从ImageFingerprint表加载有效期内的已完成结论，之后按refresh_interval增量加载其他进程写入的结论"""
+        if not self._loaded:
+            self._load_rows(datetime.now() - timedelta(seconds=self.ttl), self.max_size)
+            self._loaded = True
+            self._refreshed_at = time.monotonic()
+            self.logger.info(f"加载图片感知哈希 {self._tree.size} 条")
+            return
+        if time.monotonic() - self._refreshed_at < self.refresh_interval:
+            return
+        self._refreshed_at = time.monotonic()
+        # updated_at精度为秒，用 >= 取回同一秒写入的行，已加载的行按id跳过
+        since = self._loaded_until or datetime.now() - timedelta(seconds=self.ttl)
+        added = self._load_rows(since)
+        if added:
+            self.logger.debug(f"增量加载图片感知哈希 {added} 条")
+
+    def lookup(self, value: int) -> Optional[Dict[str, Any]]:
+        """查找阈值内最近的已审核图片，返回其结论"""
+        expire_before = datetime.now() - timedelta(seconds=self.ttl)
+        with self._lock:
+            self._ensure_loaded()
+            for distance, (task_id, is_compliant, result_text, at) in self._tree.search(value, self.threshold):
+                if at < expire_before:
+                    continue
+                self.hits += 1
+                return {
+                    "task_id": task_id,
+                    "status": "completed",
+                    "is_compliant": is_compliant,
+                    "result_text": result_text,
+                    "distance": distance
+                }
+            self.misses += 1
+        return None
+
+    def record_submitted(self, submitted: List[Tuple[str, str, int]]):
+        """登记已提交图片 [(url, task_id, 感知哈希)]，结论由 record_results 补齐"""
+        now = datetime.now()
+        rows = [{
+            "phash": _to_signed(value),
+            "url": url,
+            "task_id": task_id,
+            "created_at": now,
+            "updated_at": now
+        } for url, task_id, value in submitted if task_id and value is not None]
+        if rows:
+            ImageFingerprint.insert_many(rows).execute()
+
+    def record_results(self, finished: Dict[str, Tuple[bool, str]]):
+        """写入已完成任务的结论并加入索引，非图片任务无对应条目"""
+        if not finished:
+            return
+        now = datetime.now()
+        with db.atomic("IMMEDIATE"):
+            rows = list(ImageFingerprint.select().where(
+                (ImageFingerprint.task_id.in_(list(finished))) & (ImageFingerprint.is_compliant.is_null(True))
+            ))
+            for row in rows:
+                row.is_compliant, row.result_text = finished[row.task_id]
+                row.updated_at = now
+            if rows:
+                ImageFingerprint.bulk_update(rows, fields=[ImageFingerprint.is_compliant, ImageFingerprint.result_text,
+                                                           ImageFingerprint.updated_at], batch_size=100)
+        with self._lock:
+            if not self._loaded:
+                return
+            for row in rows:
+                self._add_row(row, now)
+            if self._tree.size > self.max_size * 2:
+                # BK树不支持删除，过大时从表中按有效期重建
+                self._tree = BKTree()
+                self._row_ids = set()
+                self._loaded_until = None
+                self._loaded = False
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取索引大小和命中统计"""
+        total = self.hits + self.misses
+        return {
+            "size": self._tree.size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total > 0 else 0.0,
+            "decode_failures": self.failures,
+            "algorithm": self.algorithm,
+            "threshold": self.threshold
+        }
+
+
+def create_near_duplicate_index(config: Dict[str, Any]) -> Optional[NearDuplicateIndex]:
+    """根据 cache.media.near_duplicate 配置创建索引，未启用或依赖不可用时返回None"""
+    media_config = config.get("cache", {}).get("media", {})
+    dedup_config = media_config.get("near_duplicate", {})
+    if not media_config.get("enabled", True) or not dedup_config.get("enabled", False):
+        return None
+    if np is None or Image is None:
+        get_logger("image_dedup").warning("未安装numpy或Pillow，图片近似重复检测已禁用")
+        return None
+
+    return NearDuplicateIndex(
+        threshold=dedup_config.get("threshold", 6),
+        algorithm=dedup_config.get("algorithm", "phash"),
+        ttl=media_config.get("ttl", 7 * 86400),
+        max_size=dedup_config.get("max_size", 100000),
+        refresh_interval=dedup_config.get("refresh_interval", 60)
+    )
+
+
+# 全局图片近似重复索引
+_near_duplicate_index = None
+_near_duplicate_index_loaded = False
+
+
+def get_near_duplicate_index() -> Optional[NearDuplicateIndex]:
+    """获取全局图片近似重复索引，未启用时返回None"""
+    global _near_duplicate_index, _near_duplicate_index_loaded
+    if not _near_duplicate_index_loaded:
+        from utils.config import load_config
+
+        _near_duplicate_index = create_near_duplicate_index(load_config())
+        _near_duplicate_index_loaded = True
+    return _near_duplicate_index
@@ -0,0 +1,282 @@
+"""
+媒体审核结论缓存
+同一图片/音频/视频在大量抓取内容中反复出现，按规范化URL（可选再按文件内容哈希）复用已有结论，
+命中时不再提交厂商；审核中的同一媒体复用在途任务，结论由轮询器或回调回写时一并写入缓存
+"""
+
+import asyncio
+import hashlib
+import threading
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Dict, Any, List, Optional, Tuple, Iterable
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
+
+from models.database import MediaVerdict, db
+from utils.logger import get_logger
+
+
+DEFAULT_PORTS = {"http": 80, "https": 443}
+
+
+def normalize_media_url(url: str) -> str:
+    """规范化URL：协议和主机小写、去掉默认端口和片段、查询参数排序"""
+    url = (url or "").strip()
+    try:
+        parts = urlsplit(url)
+    except ValueError:
+        return url
+    if not parts.scheme or not parts.netloc:
+        return url
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or "").lower()
+    if parts.port and parts.port != DEFAULT_PORTS.get(scheme):
+        host = f"{host}:{parts.port}"
+    query = urlencode(sorted(parse_qsl(parts.query, keep_blank_values=True)))
+    return urlunsplit((scheme, host, parts.path or "/", query, ""))
+
+
+def media_key(task_type: str, url: str) -> str:
+    """缓存主键：任务类型 + 规范化URL的sha1"""
+    return f"{task_type}:{hashlib.sha1(normalize_media_url(url).encode('utf-8')).hexdigest()}"
+
+
+class MediaVerdictCache:
+    """媒体审核结论缓存：内存LRU + MediaVerdict表"""
+
+    def __init__(
+        self,
+        ttl: float = 7 * 86400,
+        pending_ttl: float = 600,
+        memory_size: int = 10000,
+        hash_content: bool = False,
+        hash_types: Iterable[str] = ("image",),
+        max_fetch_bytes: int = 5 * 1024 * 1024,
+        fetch_timeout: float = 3.0,
+        fetch_concurrency: int = 16
+    ):
+        self.ttl = ttl
+        self.pending_ttl = pending_ttl
+        self.memory_size = memory_size
+        self.hash_content = hash_content and aiohttp is not None
+        self.hash_types = set(hash_types)
+        self.max_fetch_bytes = max_fetch_bytes
+        self.fetch_timeout = fetch_timeout
+        self.fetch_concurrency = fetch_concurrency
+        self._fetch_slots: Optional[asyncio.Semaphore] = None
+        self.logger = get_logger("media_cache")
+
+        # 只缓存已完成的结论：key → (task_id, 是否合规, 结果描述, 写入时间)
+        self._memory: "OrderedDict[str, Tuple[str, bool, str, datetime]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.pending_hits = 0
+        self.hash_hits = 0
+        self.misses = 0
+
+    def _remember(self, key: str, task_id: str, is_compliant: bool, result_text: str, at: datetime):
+        with self._lock:
+            self._memory[key] = (task_id, is_compliant, result_text, at)
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.memory_size:
+                self._memory.popitem(last=False)
+
+    def _from_memory(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is None:
+                return None
+            task_id, is_compliant, result_text, at = entry
+            if datetime.now() - at > timedelta(seconds=self.ttl):
+                del self._memory[key]
+                return None
+            self._memory.move_to_end(key)
+        return {"task_id": task_id, "status": "completed", "is_compliant": is_compliant, "result_text": result_text}
+
+    @staticmethod
+    def _updated_at(row: MediaVerdict) -> datetime:
+        value = row.updated_at
+        if isinstance(value, str):
+            return datetime.strptime(value, "%Y-%m-%d %H:%M:%S")
+        return value or datetime.now()
+
+    @staticmethod
+    def _entry(row: MediaVerdict) -> Dict[str, Any]:
+        if row.is_compliant is None:
+            return {"task_id": row.task_id, "status": "pending"}
+        return {"task_id": row.task_id, "status": "completed",
+                "is_compliant": row.is_compliant, "result_text": row.result_text}
+
+    def _fresh(self, query):
+        """过滤过期条目：已完成按ttl，审核中按pending_ttl"""
+        now = datetime.now()
+        done_since = now - timedelta(seconds=self.ttl)
+        pending_since = now - timedelta(seconds=self.pending_ttl)
+        return query.where(
+            ((MediaVerdict.is_compliant.is_null(False)) & (MediaVerdict.updated_at >= done_since))
+            | ((MediaVerdict.is_compliant.is_null(True)) & (MediaVerdict.updated_at >= pending_since))
+        )
+
+    def lookup(self, task_type: str, urls: List[str]) -> Dict[str, Dict[str, Any]]:
+        """批量查找，返回 {url: 缓存条目}，条目status为completed或pending"""
+        found: Dict[str, Dict[str, Any]] = {}
+        keys: Dict[str, List[str]] = {}
+        for url in urls:
+            key = media_key(task_type, url)
+            entry = self._from_memory(key)
+            if entry is not None:
+                found[url] = entry
+            else:
+                keys.setdefault(key, []).append(url)
+
+        if keys:
+            rows = self._fresh(MediaVerdict.select().where(MediaVerdict.key.in_(list(keys))))
+            for row in rows:
+                entry = self._entry(row)
+                if entry["status"] == "completed":
+                    self._remember(row.key, row.task_id, row.is_compliant, row.result_text, self._updated_at(row))
+                for url in keys[row.key]:
+                    found[url] = entry
+
+        for url in urls:
+            entry = found.get(url)
+            if entry is None:
+                self.misses += 1
+            elif entry["status"] == "completed":
+                self.hits += 1
+            else:
+                self.pending_hits += 1
+        return found
+
+    def lookup_hashes(self, task_type: str, hashes: Dict[str, str]) -> Dict[str, Dict[str, Any]]:
+        """按文件内容哈希查找已完成的结论，hashes为 {url: sha256}"""
+        if not hashes:
+            return {}
+        rows = self._fresh(MediaVerdict.select().where(
+            (MediaVerdict.type == task_type)
+            & (MediaVerdict.content_hash.in_(list(set(hashes.values()))))
+            & (MediaVerdict.is_compliant.is_null(False))
+        ))
+        by_hash = {row.content_hash: self._entry(row) for row in rows}
+        found = {url: by_hash[content_hash] for url, content_hash in hashes.items() if content_hash in by_hash}
+        self.hash_hits += len(found)
+        self.misses -= len(found)
+        return found
+
+    def record_submitted(self, task_type: str, submitted: List[Tuple[str, str, Optional[str]]]):
+        """登记已提交的媒体 [(url, task_id, 内容哈希)]，结论未出前作为在途任务供重复媒体复用"""
+        now = datetime.now()
+        rows = [{
+            "key": media_key(task_type, url),
+            "type": task_type,
+            "url": normalize_media_url(url),
+            "content_hash": content_hash,
+            "task_id": task_id,
+            "is_compliant": None,
+            "result_text": None,
+            "created_at": now,
+            "updated_at": now
+        } for url, task_id, content_hash in submitted if task_id]
+        if rows:
+            MediaVerdict.insert_many(rows).on_conflict_replace().execute()
+
+    def record_results(self, finished: Dict[str, Tuple[bool, str]]):
+        """写入已完成任务的结论 {task_id: (是否合规, 结果描述)}，非媒体任务无对应条目"""
+        if not finished:
+            return
+        now = datetime.now()
+        with db.atomic("IMMEDIATE"):
+            rows = list(MediaVerdict.select().where(MediaVerdict.task_id.in_(list(finished))))
+            for row in rows:
+                row.is_compliant, row.result_text = finished[row.task_id]
+                row.updated_at = now
+            if rows:
+                MediaVerdict.bulk_update(rows, fields=[MediaVerdict.is_compliant, MediaVerdict.result_text,
+                                                       MediaVerdict.updated_at], batch_size=100)
+        for row in rows:
+            self._remember(row.key, row.task_id, row.is_compliant, row.result_text, now)
+
+    def wants_content_hash(self, task_type: str) -> bool:
+        """该类型未命中URL时是否下载文件按内容哈希再查"""
+        return self.hash_content and task_type in self.hash_types
+
+    async def fetch(self, urls: List[str]) -> Dict[str, bytes]:
+        """限并发下载文件，超出大小或下载失败的URL不返回"""
+        if aiohttp is None or not urls:
+            return {}
+        if self._fetch_slots is None:
+            self._fetch_slots = asyncio.Semaphore(self.fetch_concurrency)
+        timeout = aiohttp.ClientTimeout(total=self.fetch_timeout)
+        async with aiohttp.ClientSession(timeout=timeout) as session:
+            results = await asyncio.gather(*[self._fetch_one(session, url) for url in urls], return_exceptions=True)
+        return {url: data for url, data in zip(urls, results) if isinstance(data, bytes)}
+
+    async def _fetch_one(self, session, url: str) -> Optional[bytes]:
+        async with self._fetch_slots:
+            chunks = []
+            size = 0
+            async with session.get(url) as response:
+                if response.status != 200:
+                    return None
+                async for chunk in response.content.iter_chunked(64 * 1024):
+                    size += len(chunk)
+                    if size > self.max_fetch_bytes:
+                        return None
+                    chunks.append(chunk)
+            return b"".join(chunks)
+
+    @staticmethod
+    def content_hash(data: bytes) -> str:
+        """文件内容sha256"""
+        return hashlib.sha256(data).hexdigest()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取命中统计"""
+        total = self.hits + self.pending_hits + self.hash_hits + self.misses
+        return {
+            "memory_size": len(self._memory),
+            "hits": self.hits,
+            "pending_hits": self.pending_hits,
+            "hash_hits": self.hash_hits,
+            "misses": self.misses,
+            "hit_rate": (self.hits + self.pending_hits + self.hash_hits) / total if total > 0 else 0.0,
+            "hash_content": self.hash_content
+        }
+
+
+def create_media_cache(config: Dict[str, Any]) -> Optional[MediaVerdictCache]:
+    """根据 cache.media 配置创建媒体结论缓存，未启用时返回None"""
+    media_config = config.get("cache", {}).get("media", {})
+    if not media_config.get("enabled", True):
+        return None
+    return MediaVerdictCache(
+        ttl=media_config.get("ttl", 7 * 86400),
+        pending_ttl=media_config.get("pending_ttl", 600),
+        memory_size=media_config.get("memory_size", 10000),
+        hash_content=media_config.get("hash_content", False),
+        hash_types=media_config.get("hash_types", ["image"]),
+        max_fetch_bytes=media_config.get("max_fetch_bytes", 5 * 1024 * 1024),
+        fetch_timeout=media_config.get("fetch_timeout", 3.0),
+        fetch_concurrency=media_config.get("fetch_concurrency", 16)
+    )
+
+
+# 全局媒体结论缓存
+_media_cache = None
+_media_cache_loaded = False
+
+
+def get_media_cache() -> Optional[MediaVerdictCache]:
+    """获取全局媒体结论缓存，未启用时返回None"""
+    global _media_cache, _media_cache_loaded
+    if not _media_cache_loaded:
+        from utils.config import load_config
+
+        _media_cache = create_media_cache(load_config())
+        _media_cache_loaded = True
+    return _media_cache
@@ -0,0 +1,263 @@
+"""
+多模态审核服务
+一条内容的文本和每个图片/音频/视频URL作为独立维度并发检查，按模态限制并发数，
+结果按完成顺序汇总，任一维度返回拦截结论时立即判定整条内容拒绝并取消其余在途检查；
+每个维度经厂商路由交给该模态配置的主厂商，必要时对冲或切换到备用厂商
+"""
+
+import json
+import asyncio
+from dataclasses import dataclass, field
+from typing import Dict, Any, List, Optional, Callable, Awaitable, Tuple
+
+from models.enums import RequestPriority
+from services.agents.agent_pool import PrioritySlots
+from services.vendors import create_vendor_router
+from utils.deadline import Deadline
+from utils.events import bind_audit_context, publish_event
+from utils.logger import get_logger
+
+
+MEDIA_MODALITIES = ("images", "audios", "videos")
+
+# 各模态默认并发上限，视频审核耗时最长，限制最严；图片和文本可批量提交，上限放宽以便合并
+DEFAULT_MODALITY_LIMITS = {"text": 32, "images": 64, "audios": 4, "videos": 2}
+
+@dataclass
+class DimensionCheck:
+    """单个审核维度：modality为模态，key为维度内标识（如文件URL）"""
+    modality: str
+    key: str
+    run: Callable[[], Awaitable[Any]]
+
+
+@dataclass
+class FanOutResult:
+    """并发审核结果，results按完成顺序记录(模态, 标识, 结果)"""
+    results: List[Tuple[str, str, Any]] = field(default_factory=list)
+    blocked_by: Optional[Tuple[str, str]] = None
+    cancelled: List[Tuple[str, str]] = field(default_factory=list)
+
+    def by_modality(self, modality: str) -> List[Tuple[str, Any]]:
+        return [(key, result) for m, key, result in self.results if m == modality]
+
+
+def media_urls(value: Any) -> List[str]:
+    """解析Contents中以JSON字符串存储的媒体URL列表"""
+    if not value:
+        return []
+    if isinstance(value, str):
+        try:
+            value = json.loads(value)
+        except ValueError:
+            return [value]
+    if isinstance(value, str):
+        return [value]
+    return [url for url in value if url]
+
+
+def dimension_event_fields(result: Any) -> Dict[str, Any]:
+    """维度结论事件携带的字段，文本引擎结果（非字典）只报告完成"""
+    if not isinstance(result, dict):
+        return {"status": "completed"}
+    fields = {key: result[key] for key in ("status", "is_compliant", "vendor", "task_id", "cached") if key in result}
+    fields.setdefault("status", "error")
+    return fields
+
+
+def is_media_blocking(result: Dict[str, Any]) -> bool:
+    """厂商已完成审核且判定不合规即为拦截结论，超时或出错不视为拦截"""
+    return result.get("status") == "completed" and not result.get("is_compliant", False)
+
+
+def summarize_media(items: List[Tuple[str, Dict[str, Any]]], cancelled: List[str]) -> Dict[str, Any]:
+    """汇总一个模态下所有文件的审核结果"""
+    files = [{"file_path": key, **result} for key, result in items]
+    files.extend({"file_path": key, "status": "cancelled", "is_compliant": None} for key in cancelled)
+    completed = [f for f in files if f.get("status") == "completed"]
+    if any(not f.get("is_compliant", False) for f in completed):
+        status = "completed"
+        is_compliant = False
+    elif len(completed) == len(files):
+        status = "completed"
+        is_compliant = True
+    else:
+        status = "error" if not cancelled else "cancelled"
+        is_compliant = False
+    result_texts = [
+        f"{f['file_path']}: {f.get('result_text') or f.get('error') or f.get('status')}" for f in files
+    ]
+    return {
+        "status": status,
+        "is_compliant": is_compliant,
+        "result_text": "; ".join(result_texts),
+        "items": files
+    }
+
+
+class MediaModerationService:
+    """多模态审核服务：按模态的优先级并发名额 + 厂商提交与轮询"""
+
+    def __init__(self, config: Dict[str, Any]):
+        self.config = config
+        self.logger = get_logger("media_moderation")
+        performance = config.get("performance", {})
+        limits = {**DEFAULT_MODALITY_LIMITS, **(performance.get("modalities") or {})}
+        self._slots = {modality: PrioritySlots(limit) for modality, limit in limits.items()}
+        self.vendors = create_vendor_router(config)
+
+    async def check_text(self, text: str, deadline: Optional[Deadline] = None) -> Dict[str, Any]:
+        """提交文本到厂商审核并等待结果"""
+        if deadline is not None and deadline.expired():
+            deadline.cut("text")
+            return {"status": "timeout", "is_compliant": False, "error": "请求超时预算耗尽，未提交审核"}
+        return await self.vendors.check("text", text, deadline)
+
+    async def check_file(self, modality: str, url: str, deadline: Optional[Deadline] = None) -> Dict[str, Any]:
+        """提交单个媒体文件到厂商审核并等待结果"""
+        if modality not in MEDIA_MODALITIES:
+            return {"status": "error", "is_compliant": False, "error": f"不支持的模态: {modality}"}
+        if deadline is not None and deadline.expired():
+            deadline.cut(modality)
+            return {"status": "timeout", "is_compliant": False, "error": "请求超时预算耗尽，未提交审核"}
+        return await self.vendors.check(modality, url, deadline)
+
+    def vendor_checks(
+        self,
+        text: Optional[str],
+        media: Dict[str, List[str]],
+        deadline: Optional[Deadline] = None
+    ) -> List[DimensionCheck]:
+        """构建全部交由厂商审核的维度：文本一项，每个媒体文件各一项"""
+        checks = []
+        if text:
+            checks.append(DimensionCheck("text", "content", lambda: self.check_text(text, deadline)))
+        for modality in MEDIA_MODALITIES:
+            for url in media.get(modality) or []:
+                checks.append(DimensionCheck(
+                    modality, url,
+                    lambda modality=modality, url=url: self.check_file(modality, url, deadline)
+                ))
+        return checks
+
+    async def moderate_with_vendor(
+        self,
+        text: Optional[str],
+        media: Dict[str, List[str]],
+        deadline: Optional[Deadline] = None,
+        priority: int = RequestPriority.NORMAL,
+        content_id: Optional[int] = None
+    ) -> Tuple[Dict[str, Any], FanOutResult]:
+        """文本和所有媒体文件并发提交厂商审核，返回按维度汇总的结果；给出content_id时发布各维度进度事件"""
+        fanout = await self.fan_out(
+            self.vendor_checks(text, media, deadline),
+            lambda modality, result: is_media_blocking(result),
+            priority=priority,
+            content_id=content_id
+        )
+        audit_results = {}
+        for key, result in fanout.by_modality("text"):
+            audit_results[key] = {
+                "status": result.get("status", "error"),
+                "is_compliant": result.get("is_compliant", False),
+                "result_text": result.get("result_text") or result.get("error") or "未知结果"
+            }
+        if any(modality == "text" for modality, _ in fanout.cancelled):
+            audit_results["content"] = {"status": "cancelled", "is_compliant": None, "result_text": "cancelled"}
+        for modality in MEDIA_MODALITIES:
+            items = fanout.by_modality(modality)
+            cancelled = [key for m, key in fanout.cancelled if m == modality]
+            if items or cancelled:
+                audit_results[modality] = summarize_media(items, cancelled)
+        return audit_results, fanout
+
+    async def _run_check(self, check: DimensionCheck, priority: int, content_id: Optional[int] = None):
+        if content_id is not None:
+            # 在维度子任务内登记审核上下文，厂商层据此发布等待结果事件
+            bind_audit_context(content_id=content_id, dimension=check.modality, item=check.key)
+            publish_event("dimension_submitted")
+        try:
+            result = await self._run_slotted(check, priority)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            if content_id is not None:
+                publish_event("dimension_completed", status="error", error=str(e))
+            raise
+        if content_id is not None:
+            publish_event("dimension_completed", **dimension_event_fields(result))
+        return result
+
+    async def _run_slotted(self, check: DimensionCheck, priority: int):
+        slots = self._slots.get(check.modality)
+        if slots is None:
+            return await check.run()
+        await slots.acquire(priority)
+        try:
+            return await check.run()
+        finally:
+            slots.release()
+
+    async def fan_out(
+        self,
+        checks: List[DimensionCheck],
+        is_blocking: Callable[[str, Any], bool],
+        priority: int = RequestPriority.NORMAL,
+        content_id: Optional[int] = None
+    ) -> FanOutResult:
+        """并发执行所有维度检查，结果按完成顺序汇总，出现拦截结论时取消其余检查"""
+        outcome = FanOutResult()
+        if not checks:
+            return outcome
+
+        tasks = {
+            asyncio.ensure_future(self._run_check(check, priority, content_id)): check
+            for check in checks
+        }
+        pending = set(tasks)
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    check = tasks[task]
+                    exc = task.exception()
+                    if exc is not None:
+                        self.logger.error(f"{check.modality}维度审核失败({check.key}): {exc}")
+                        result = {"status": "error", "is_compliant": False, "error": str(exc)}
+                    else:
+                        result = task.result()
+                    outcome.results.append((check.modality, check.key, result))
+                    if outcome.blocked_by is None and is_blocking(check.modality, result):
+                        outcome.blocked_by = (check.modality, check.key)
+
+                if outcome.blocked_by is not None and pending:
+                    self.logger.info(
+                        f"{outcome.blocked_by[0]}维度返回拦截结论，取消其余 {len(pending)} 项在途检查"
+                    )
+                    break
+        finally:
+            for task in pending:
+                task.cancel()
+            if pending:
+                await asyncio.gather(*pending, return_exceptions=True)
+                outcome.cancelled = [(check.modality, check.key) for task, check in tasks.items() if task in pending]
+                if content_id is not None:
+                    for modality, key in outcome.cancelled:
+                        publish_event("dimension_cancelled", content_id=content_id, dimension=modality, item=key)
+        return outcome
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取各模态的在途和排队数"""
+        return {modality: slots.get_stats() for modality, slots in self._slots.items()}
+
+
+# 全局多模态审核服务实例，各审核入口共享同一组模态名额
+_media_moderation_service = None
+
+
+def get_media_moderation_service(config: Optional[Dict[str, Any]] = None) -> MediaModerationService:
+    """获取全局多模态审核服务，首次调用时按配置创建"""
+    global _media_moderation_service
+    if _media_moderation_service is None:
+        _media_moderation_service = MediaModerationService(config or {})
+    return _media_moderation_service
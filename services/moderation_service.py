@@ -2,11 +2,13 @@
 内容审核服务
 """
 
+import os
 import time
 import uuid
 import asyncio
+from datetime import datetime
 from typing import Dict, Any, List, Optional, Union
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from concurrent.futures import ThreadPoolExecutor
 
 import json
 from peewee import DoesNotExist
@@ -20,14 +22,52 @@ from models.models import (
     RuleResult,
     FusionResult
 )
-from models.enums import RiskLevel, EngineType, ProcessingStatus
+from models.enums import RiskLevel, EngineType, ProcessingStatus, RequestPriority
 from utils.exceptions import ModerationError, TimeoutError as ModerationTimeoutError
 from services.text_moderation_service import TextModerationService
+from services.pipeline import StagePipeline, PipelineStage, stage_settings
+from services.media_cache import get_media_cache
+from services.image_dedup import get_near_duplicate_index
+from services.media_moderation_service import (
+    get_media_moderation_service, DimensionCheck, MEDIA_MODALITIES,
+    media_urls, is_media_blocking, summarize_media
+)
 from engines import RuleEngine, FusionEngine
+from utils.ai_parser import get_ai_response_parser
+from utils.deadline import Deadline
+from utils.events import publish_event, FINAL_EVENT
 from utils.metrics import get_metrics_collector
 from utils.logger import get_logger
 
 
+# 风险等级严重程度，用于比较高低
+RISK_SEVERITY = {
+    RiskLevel.SAFE: 0,
+    RiskLevel.SUSPICIOUS: 1,
+    RiskLevel.RISKY: 2,
+    RiskLevel.BLOCKED: 3
+}
+
+# 跨主机的工作进程不访问API的数据库：作业携带待审核字段的快照，审核结论字段随作业结果交回API写入
+CONTENT_SNAPSHOT_FIELDS = ("title", "content", "images", "audios", "videos")
+CONTENT_RESULT_FIELDS = ("audit_status", "risk_level", "processing_status", "processing_content", "processing_html")
+
+
+def content_snapshot(content_obj: Contents) -> Dict[str, Any]:
+    """内容记录中待审核字段的快照"""
+    return {field: getattr(content_obj, field) for field in CONTENT_SNAPSHOT_FIELDS}
+
+
+def content_from_snapshot(content_id: int, snapshot: Dict[str, Any]) -> Contents:
+    """由快照构造不保存的内容记录"""
+    return Contents(id=content_id, **{field: snapshot.get(field) for field in CONTENT_SNAPSHOT_FIELDS})
+
+
+def content_update(content_obj: Contents) -> Dict[str, Any]:
+    """内容记录中的审核结论字段，由API进程写回Contents表"""
+    return {field: getattr(content_obj, field) for field in CONTENT_RESULT_FIELDS if getattr(content_obj, field) is not None}
+
+
 class ModerationService:
     """内容审核服务"""
     
@@ -39,9 +79,12 @@ class ModerationService:
         # 初始化各个引擎
         self._init_engines()
         
-        # 线程池用于并行处理
-        max_workers = config.get("performance", {}).get("max_concurrent_requests", 50)
-        self.executor = ThreadPoolExecutor(max_workers=max_workers)
+        # 小线程池只承载CPU密集和阻塞数据库的阶段，AI调用走异步IO
+        cpu_workers = config.get("performance", {}).get("cpu_workers") or min(4, os.cpu_count() or 1)
+        self.executor = ThreadPoolExecutor(max_workers=cpu_workers, thread_name_prefix="moderation")
+        
+        # 分阶段审核流水线
+        self._init_pipeline()
         
         # 统计信息
         self.total_requests = 0
@@ -58,6 +101,9 @@ class ModerationService:
             self.text_moderation_service = TextModerationService(self.config)
             self.logger.info("文字审核服务初始化成功")
             
+            # 初始化多模态审核服务
+            self.media_service = get_media_moderation_service(self.config)
+            
             # 初始化融合引擎
             fusion_config = engines_config.get("fusion", {})
             self.fusion_engine = FusionEngine(
@@ -70,48 +116,55 @@ class ModerationService:
             self.logger.error(f"引擎初始化失败: {e}")
             raise ModerationError(f"引擎初始化失败: {e}")
     
+    def _init_pipeline(self):
+        """初始化分阶段审核流水线：获取 → 归一化 → 规则 → 多模态并发审核 → 融合 → 持久化"""
+        stages = [
+            PipelineStage("fetch", self._stage_fetch, offload=True,
+                          **stage_settings(self.config, "fetch", 4, 200)),
+            PipelineStage("normalize", self._stage_normalize,
+                          **stage_settings(self.config, "normalize", 2, 200)),
+            PipelineStage("rules", self._stage_rules, offload=True,
+                          **stage_settings(self.config, "rules", 4, 200)),
+            PipelineStage("fanout", self._run_all_moderations,
+                          **stage_settings(self.config, "fanout", 16, 500)),
+            PipelineStage("fusion", self._stage_fusion,
+                          **stage_settings(self.config, "fusion", 2, 200)),
+            PipelineStage("persist", self._stage_persist, offload=True,
+                          **stage_settings(self.config, "persist", 2, 200)),
+        ]
+        self.pipeline = StagePipeline("moderation", stages, executor=self.executor)
+    
     async def moderate(
         self,
         content_id: int,
-        db_session: Optional[Any] = None  # 数据库会话
+        db_session: Optional[Any] = None,  # 数据库会话
+        priority: int = RequestPriority.BULK,
+        timeout: Optional[float] = None,
+        content: Optional[Dict[str, Any]] = None
     ) -> dict:
-        """审核单条内容"""
+        """审核单条内容，timeout为整条流水线（含排队）的超时预算；
+        给出content快照时不读写本地数据库，审核结论字段在返回值的content_update中"""
         start_time = time.time()
         self.total_requests += 1
-        
-        # 1. 根据 content_id 查询内容
-        content_obj = Contents.get_or_none(Contents.id == content_id)
-        if not content_obj:
-            raise ModerationError(f"内容不存在: {content_id}")
+        deadline = Deadline(timeout)
         
         try:
             self.logger.info(f"开始审核内容: {content_id}")
+            publish_event("audit_started", content_id=content_id)
             
-            # 2. 准备待审核数据
-            content_to_moderate = {
-                "text": content_obj.content,
-                "images": json.loads(content_obj.images) if content_obj.images else [],
-                "audios": json.loads(content_obj.audios) if content_obj.audios else [],
-                "videos": json.loads(content_obj.videos) if content_obj.videos else [],
-            }
-
-            # 3. 并行执行所有类型的审核
-            all_results = await self._run_all_moderations(content_to_moderate)
-
-            # 4. 综合判断最终结果
-            final_decision, final_score = self._get_final_decision(all_results)
-
-            # 5. 保存审核结果到Contents表
-            updated_content = self._save_audit_result(
-                content_obj, final_decision, all_results
+            context = await self.pipeline.submit(
+                {"content_id": content_id, "priority": priority, "deadline": deadline, "snapshot": content},
+                priority=priority
             )
-
-            # 记录指标
-            # self._record_success_metrics(result) # 可根据需要调整
-
+            final_decision = context["final_decision"]
             
             self.logger.info(
-                f"内容审核完成: {content_id}, 最终决策: {final_decision.value}"
+                f"内容审核完成: {content_id}, 最终决策: {final_decision.value}, "
+                f"处理时间={time.time() - start_time:.2f}s"
+            )
+            publish_event(
+                FINAL_EVENT, content_id=content_id, decision=final_decision.value,
+                short_circuited_by=context.get("short_circuited_by")
             )
 
             return {
@@ -119,37 +172,148 @@ class ModerationService:
                 "final_decision": final_decision.value,
                 "risk_level": final_decision.value,
                 "processing_status": ProcessingStatus.COMPLETED.value,
-                "details": all_results
+                "details": context["all_results"],
+                "short_circuited_by": context.get("short_circuited_by"),
+                "truncated_stages": deadline.cut_stages,
+                **({"content_update": context["content_update"]} if "content_update" in context else {})
             }
             
+        except ModerationError as e:
+            if e.error_code == "CONTENT_NOT_FOUND":
+                raise
+            self.failed_requests += 1
+            self.logger.error(f"内容审核失败: {content_id}, 错误: {e}")
+            publish_event(FINAL_EVENT, content_id=content_id, decision="ERROR", error=str(e))
+            return {"error": f"审核失败: {e}"}
         except Exception as e:
-            processing_time = time.time() - start_time
             self.failed_requests += 1
             
             self.logger.error(f"内容审核失败: {content_id}, 错误: {e}")
+            publish_event(FINAL_EVENT, content_id=content_id, decision="ERROR", error=str(e))
             
             # 返回错误结果
             return {"error": f"审核失败: {e}"}
     
-    async def _run_all_moderations(self, content_data: dict) -> dict:
-        """并行执行文本、图片、音频、视频的审核"""
-        tasks = {}
-        if content_data.get("text"):
-            tasks["text"] = asyncio.create_task(self._run_detection_engines(content_data["text"]))
-        # 此处添加图片、音频、视频的审核逻辑
-        # for image_url in content_data.get("images", []):
-        #     tasks[f"image:{image_url}"] = asyncio.create_task(self.image_moderation_service.moderate(image_url))
-
-        results = await asyncio.gather(*tasks.values(), return_exceptions=True)
-
-        final_results = {}
-        for task_name, result in zip(tasks.keys(), results):
-            if isinstance(result, Exception):
-                self.logger.error(f"{task_name} 审核失败: {result}")
-                final_results[task_name] = self._get_default_error_result(str(result))
-            else:
-                final_results[task_name] = result
-        return final_results
+    def _stage_fetch(self, context: dict):
+        """获取阶段：根据 content_id 查询内容，作业携带快照时直接使用快照"""
+        if context.get("snapshot") is not None:
+            context["content_obj"] = content_from_snapshot(context["content_id"], context["snapshot"])
+            return
+        content_obj = Contents.get_or_none(Contents.id == context["content_id"])
+        if not content_obj:
+            raise ModerationError(f"内容不存在: {context['content_id']}", error_code="CONTENT_NOT_FOUND")
+        context["content_obj"] = content_obj
+    
+    async def _stage_normalize(self, context: dict):
+        """归一化阶段：准备待审核数据"""
+        content_obj = context["content_obj"]
+        context["content_data"] = {
+            "text": content_obj.content,
+            "images": media_urls(content_obj.images),
+            "audios": media_urls(content_obj.audios),
+            "videos": media_urls(content_obj.videos),
+        }
+    
+    def _stage_rules(self, context: dict):
+        """规则阶段：规则匹配、近似重复缓存与预筛分类（CPU密集，在线程池执行）"""
+        text = context["content_data"].get("text")
+        if not text:
+            return
+        context["text_started_at"] = time.time()
+        try:
+            context["rule_result"], context["ai_result"] = \
+                self.text_moderation_service._pre_ai_checks(text)
+        except Exception as e:
+            self.logger.error(f"文字检测引擎失败: {e}")
+            context["ai_result"], context["rule_result"] = \
+                self.text_moderation_service._build_error_results(e, 0.0)
+    
+    async def _check_text(self, context: dict) -> tuple[AIResult, RuleResult]:
+        """文本维度：未被缓存或预筛命中的文本调用大模型"""
+        text_service = self.text_moderation_service
+        try:
+            if context["ai_result"] is None:
+                context["ai_result"] = await text_service._aai_based_check(
+                    context["content_data"]["text"], context["priority"], context["deadline"]
+                )
+        except Exception as e:
+            self.logger.error(f"文字检测引擎失败: {e}")
+            context["ai_result"], context["rule_result"] = text_service._build_error_results(e, 0.0)
+        return text_service._finish_moderation(
+            context["ai_result"], context["rule_result"], context["text_started_at"]
+        )
+    
+    def _is_blocking(self, modality: str, result: Any) -> bool:
+        """维度结果是否为拦截结论：文本融合结果为blocked，媒体文件被厂商判定不合规"""
+        if modality == "text":
+            if not isinstance(result, tuple):
+                return False
+            ai_result, rule_result = result
+            fusion_result = self.fusion_engine.process(content="", ai_result=ai_result, rule_result=rule_result)
+            return fusion_result.risk_level == RiskLevel.BLOCKED
+        return is_media_blocking(result)
+    
+    async def _run_all_moderations(self, context: dict):
+        """多模态并发审核：文本和每个媒体URL各为一个维度，按模态限制并发，拦截时短路"""
+        content_data = context["content_data"]
+        deadline = context["deadline"]
+        checks = []
+        if "rule_result" in context:
+            checks.append(DimensionCheck("text", "text", lambda: self._check_text(context)))
+        checks.extend(self._media_checks(content_data, deadline))
+        context["fanout"] = await self.media_service.fan_out(
+            checks, self._is_blocking, priority=context["priority"], content_id=context["content_id"]
+        )
+    
+    def _media_checks(self, content_data: dict, deadline: Deadline) -> List[DimensionCheck]:
+        """每个媒体URL一个维度检查"""
+        checks = []
+        for modality in MEDIA_MODALITIES:
+            for url in content_data.get(modality) or []:
+                checks.append(DimensionCheck(
+                    modality, url,
+                    lambda modality=modality, url=url: self.media_service.check_file(modality, url, deadline)
+                ))
+        return checks
+    
+    def _decide(self, fanout, all_results: dict) -> tuple[RiskLevel, float, Optional[str]]:
+        """汇总各媒体维度结果到all_results并给出最终决策，有维度返回拦截结论时直接判定为blocked"""
+        for modality in MEDIA_MODALITIES:
+            items = fanout.by_modality(modality)
+            cancelled = [key for m, key in fanout.cancelled if m == modality]
+            if items or cancelled:
+                all_results[modality] = summarize_media(items, cancelled)
+        if fanout.blocked_by is not None:
+            short_circuited_by = ":".join(fanout.blocked_by)
+            if fanout.cancelled:
+                all_results["short_circuit"] = {
+                    "blocked_by": short_circuited_by,
+                    "cancelled": [f"{m}:{key}" for m, key in fanout.cancelled]
+                }
+            return RiskLevel.BLOCKED, 1.0, short_circuited_by
+        return (*self._get_final_decision(all_results), None)
+    
+    async def _stage_fusion(self, context: dict):
+        """融合阶段：综合判断最终结果"""
+        fanout = context["fanout"]
+        all_results = {}
+        text_results = fanout.by_modality("text")
+        if text_results and isinstance(text_results[0][1], tuple):
+            all_results["text"] = text_results[0][1]
+        context["all_results"] = all_results
+        context["final_decision"], context["final_score"], short_circuited_by = self._decide(fanout, all_results)
+        if short_circuited_by is not None:
+            context["short_circuited_by"] = short_circuited_by
+    
+    def _stage_persist(self, context: dict):
+        """持久化阶段：保存审核结果到Contents表，按快照审核时只整理结论字段"""
+        if context.get("snapshot") is not None:
+            self._apply_audit_result(context["content_obj"], context["final_decision"], context["all_results"])
+            context["content_update"] = content_update(context["content_obj"])
+            return
+        self._save_audit_result(
+            context["content_obj"], context["final_decision"], context["all_results"]
+        )
 
     def _get_final_decision(self, all_results: dict) -> tuple[RiskLevel, float]:
         """根据所有审核结果综合判断"""
@@ -159,15 +323,25 @@ class ModerationService:
         for result_group in all_results.values():
             # 假设每个result_group是(ai_result, rule_result)
             if isinstance(result_group, tuple):
-                 ai_res, rule_res = result_group
-                 fusion_res = self.fusion_engine.process(
+                ai_res, rule_res = result_group
+                fusion_res = self.fusion_engine.process(
                     content="", ai_result=ai_res, rule_result=rule_res
                 )
-                 if fusion_res.risk_level.value > highest_risk.value:
+                if RISK_SEVERITY[fusion_res.risk_level] > RISK_SEVERITY[highest_risk]:
                     highest_risk = fusion_res.risk_level
-                 if fusion_res.risk_score > highest_score:
+                if fusion_res.risk_score > highest_score:
                     highest_score = fusion_res.risk_score
-            # 可扩展处理其他类型结果
+            # 媒体维度：厂商判定不合规为blocked，超时或出错需人工复核
+            elif isinstance(result_group, dict) and "is_compliant" in result_group:
+                if result_group["is_compliant"]:
+                    continue
+                if result_group["status"] == "completed":
+                    level, score = RiskLevel.BLOCKED, 1.0
+                else:
+                    level, score = RiskLevel.SUSPICIOUS, 0.5
+                if RISK_SEVERITY[level] > RISK_SEVERITY[highest_risk]:
+                    highest_risk = level
+                highest_score = max(highest_score, score)
 
         # 只要有一个不安全，整体就为不安全
         if highest_risk != RiskLevel.SAFE:
@@ -175,38 +349,38 @@ class ModerationService:
 
         return RiskLevel.SAFE, 0.0
 
+    def _apply_audit_result(self, content_obj: Contents, final_decision: RiskLevel, all_results: dict):
+        """将审核结果写入内容对象（不保存）"""
+        from models.enums import AuditStatus
+        # 更新内容表的审核状态和处理结果
+        if final_decision == RiskLevel.SAFE:
+            content_obj.audit_status = AuditStatus.APPROVED.value
+        else:
+            content_obj.audit_status = AuditStatus.REJECTED.value
+        content_obj.risk_level = final_decision.value
+        content_obj.processing_status = ProcessingStatus.COMPLETED.value
+        content_obj.processing_content = json.dumps(all_results, default=str, ensure_ascii=False)
+        content_obj.updated_at = datetime.now()
+
     def _save_audit_result(self, content_obj: Contents, final_decision: RiskLevel, all_results: dict) -> Contents:
         """保存审核结果到Contents表"""
-        from models.enums import AuditStatus
         # Peewee操作是同步的，不需要在异步方法中特别处理
         with db.atomic():
-            # 更新内容表的审核状态和处理结果
-            if final_decision == RiskLevel.SAFE:
-                content_obj.audit_status = AuditStatus.APPROVED.value
-            else:
-                content_obj.audit_status = AuditStatus.REJECTED.value
-            content_obj.risk_level = final_decision.value
-            content_obj.processing_status = ProcessingStatus.COMPLETED.value
-            content_obj.processing_content = json.dumps(all_results, default=str, ensure_ascii=False)
+            self._apply_audit_result(content_obj, final_decision, all_results)
             content_obj.save()
         return content_obj
 
-    def _get_default_error_result(self, error_msg: str):
-        return {
-            "risk_level": RiskLevel.SUSPICIOUS.value,
-            "risk_score": 0.5,
-            "error": error_msg
-        }
-
-    async def _run_detection_engines(self, content: str) -> tuple[AIResult, RuleResult]:
-        """运行文字检测引擎"""
+    async def _run_detection_engines(
+        self,
+        content: str,
+        priority: int = RequestPriority.BULK,
+        deadline: Optional[Deadline] = None
+    ) -> tuple[AIResult, RuleResult]:
+        """运行文字检测引擎，AI调用按优先级排队"""
         try:
             # 使用新的文字审核服务
-            loop = asyncio.get_event_loop()
-            ai_result, rule_result = await loop.run_in_executor(
-                self.executor,
-                self.text_moderation_service.moderate_text,
-                content
+            ai_result, rule_result = await self.text_moderation_service.amoderate_text(
+                content, priority=priority, deadline=deadline
             )
             return ai_result, rule_result
         except Exception as e:
@@ -215,8 +389,6 @@ class ModerationService:
             rule_result = self._get_default_result("rule", str(e))
             return ai_result, rule_result
     
-
-    
     def _get_default_result(self, engine_type: str, error_msg: str) -> Union[AIResult, RuleResult]:
         """获取默认的错误结果"""
         if engine_type == "ai":
@@ -262,12 +434,11 @@ class ModerationService:
             rule_result.violated_categories
         ))
         
-        # 确定使用的引擎
-        engines_used = []
-        if self.ai_agent:
-            engines_used.append(EngineType.AI)
-        if self.rule_engine:
-            engines_used.append(EngineType.RULE)
+        # 确定使用的引擎，预筛分类器跳过AI时记为机器学习模型
+        engines_used = [
+            EngineType.ML if ai_result.model_name == "prescreen" else EngineType.AI,
+            EngineType.RULE
+        ]
         
         return ModerationResult(
             content_id=request.content_id or "",
@@ -323,7 +494,7 @@ class ModerationService:
         self.successful_requests += 1
         
         self.metrics.record_request(
-            risk_level=result.final_decision,
+            risk_level=RiskLevel(result.final_decision),
             processing_time=result.processing_time,
             status="success",
             categories=result.categories_detected,
@@ -335,54 +506,127 @@ class ModerationService:
         contents: List[str], 
         content_ids: Optional[List[str]] = None,
         parallel: bool = True,
+        priority: int = RequestPriority.BULK,
+        timeout: Optional[float] = None,
         **kwargs
     ) -> BatchModerationResult:
-        """批量审核内容"""
+        """批量审核内容：一次查询加载、批量规则与AI检测、单事务批量写回"""
         start_time = time.time()
+        deadline = Deadline(timeout)
+        loop = asyncio.get_running_loop()
+        stage_timings: Dict[str, float] = {}
         
-        if content_ids is None:
-            content_ids = [str(uuid.uuid4()) for _ in contents]
+        def mark(stage: str, stage_start: float):
+            stage_timings[stage] = round(time.time() - stage_start, 4)
         
         self.logger.info(f"开始批量审核: {len(contents)} 条内容")
+        self.total_requests += len(contents)
         
-        results = []
+        results: List[Optional[ModerationResult]] = [None] * len(contents)
         errors = []
         
+        def fail(index: int, content_id: str, text: str, error_msg: str):
+            errors.append({
+                "content_id": content_id,
+                "error": error_msg,
+                "content": text[:100] + "..." if len(text) > 100 else text
+            })
+            results[index] = self._build_error_result(content_id, text, error_msg, 0.0)
+        
+        # 1. 获取：一次 WHERE id IN (...) 查询加载全部内容
+        stage_start = time.time()
+        from_db = content_ids is not None
+        rows: Dict[int, Contents] = {}
+        if from_db:
+            content_ids = [str(cid) for cid in content_ids]
+            numeric_ids = [int(cid) for cid in content_ids if cid.isdigit()]
+            if numeric_ids:
+                rows = await loop.run_in_executor(self.executor, self._fetch_contents, numeric_ids)
+        else:
+            content_ids = [str(uuid.uuid4()) for _ in contents]
+        mark("fetch", stage_start)
+        
+        # 2. 归一化：确定每条待审核文本，库中有记录时以记录内容为准
+        stage_start = time.time()
+        items = []  # (下标, 内容ID, 文本, 数据库记录)
+        for index, (content_id, text) in enumerate(zip(content_ids, contents)):
+            content_obj = None
+            if from_db and content_id.isdigit():
+                content_obj = rows.get(int(content_id))
+                if content_obj is None:
+                    fail(index, content_id, text or "", f"内容不存在: {content_id}")
+                    continue
+                text = content_obj.content or text
+            if not text or not text.strip():
+                fail(index, content_id, text or "", "内容为空")
+                continue
+            items.append((index, content_id, text, content_obj))
+        mark("normalize", stage_start)
+        
+        # 3. 规则：整批在线程池中一次执行
+        stage_start = time.time()
+        texts = [text for _, _, text, _ in items]
+        pre_results = await loop.run_in_executor(
+            self.executor, self.text_moderation_service.pre_ai_checks_batch, texts
+        )
+        mark("rules", stage_start)
+        
+        # 4. AI：未命中缓存/预筛的文本批量提交，代理池限制在途请求数
+        stage_start = time.time()
+        text_service = self.text_moderation_service
+        item_deadlines = [deadline.child() for _ in items]
+        pending = [i for i, (_, ai_result) in enumerate(pre_results) if ai_result is None]
         if parallel:
-            # 并行处理
-            tasks = [
-                self.moderate(int(content_id), **kwargs)
-                for content_id in content_ids
-            ]
-            
-            completed_results = await asyncio.gather(*tasks, return_exceptions=True)
-            
-            for i, result in enumerate(completed_results):
-                if isinstance(result, Exception):
-                    errors.append({
-                        "content_id": content_ids[i],
-                        "error": str(result),
-                        "content": contents[i][:100] + "..." if len(contents[i]) > 100 else contents[i]
-                    })
-                    # 添加错误结果
-                    results.append(self._build_error_result(
-                        content_ids[i], contents[i], str(result), 0.0
-                    ))
-                else:
-                    results.append(result)
+            ai_results = await asyncio.gather(*[
+                text_service._aai_based_check(texts[i], priority, item_deadlines[i]) for i in pending
+            ])
         else:
-            # 顺序处理
-            for content_id in content_ids:
-                try:
-                    result = await self.moderate(int(content_id), **kwargs)
-                    results.append(result)
-                except Exception as e:
-                    errors.append({
-                        "content_id": content_id,
-                        "error": str(e),
-                        "content": contents[i][:100] + "..." if len(contents[i]) > 100 else contents[i]
-                    })
-                    results.append(self._build_error_result(content_id, "", str(e), 0.0))
+            ai_results = [
+                await text_service._aai_based_check(texts[i], priority, item_deadlines[i]) for i in pending
+            ]
+        for i, ai_result in zip(pending, ai_results):
+            pre_results[i] = (pre_results[i][0], ai_result)
+        mark("ai", stage_start)
+        
+        # 5. 融合
+        stage_start = time.time()
+        verdicts = []  # (数据库记录, 文本结果, 文本融合结论, 单项超时预算)
+        for (index, content_id, text, content_obj), (rule_result, ai_result), item_deadline in zip(
+            items, pre_results, item_deadlines
+        ):
+            fusion_result = self.fusion_engine.process(text, ai_result=ai_result, rule_result=rule_result)
+            request = ModerationRequest.model_construct(content=text, content_id=content_id)
+            result = self._build_moderation_result(
+                request, ai_result, rule_result, fusion_result, time.time() - start_time
+            )
+            result.truncated_stages = item_deadline.cut_stages
+            for stage in item_deadline.cut_stages:
+                deadline.cut(stage)
+            results[index] = result
+            if content_obj is not None:
+                verdicts.append((content_obj, (ai_result, rule_result), fusion_result.risk_level, item_deadline))
+        mark("fusion", stage_start)
+        
+        # 6. 媒体：库中记录的图片、音频、视频与单条审核一样并发提交厂商，文本已拦截的记录不再检查媒体；
+        #    整条内容的结论综合文本和媒体维度后才写回，避免只审了文本就判定通过
+        stage_start = time.time()
+        to_persist = await asyncio.gather(*[
+            self._finish_batch_item(content_obj, text_result, text_decision, item_deadline, priority)
+            for content_obj, text_result, text_decision, item_deadline in verdicts
+        ])
+        mark("media", stage_start)
+        
+        # 7. 持久化：单事务批量更新
+        stage_start = time.time()
+        if to_persist:
+            await loop.run_in_executor(self.executor, self._bulk_save_audit_results, to_persist)
+        mark("persist", stage_start)
+        
+        for result in results:
+            if result.status == ProcessingStatus.COMPLETED:
+                self._record_success_metrics(result)
+            else:
+                self.failed_requests += 1
         
         processing_time = time.time() - start_time
         success_count = len([r for r in results if r.status == ProcessingStatus.COMPLETED])
@@ -390,7 +634,7 @@ class ModerationService:
         
         self.logger.info(
             f"批量审核完成: 总数={len(contents)}, 成功={success_count}, "
-            f"失败={failed_count}, 处理时间={processing_time:.2f}s"
+            f"失败={failed_count}, 处理时间={processing_time:.2f}s, 阶段耗时={stage_timings}"
         )
         
         return BatchModerationResult(
@@ -399,9 +643,51 @@ class ModerationService:
             failed_count=failed_count,
             results=results,
             errors=errors,
-            processing_time=processing_time
+            processing_time=processing_time,
+            stage_timings=stage_timings,
+            truncated_stages=deadline.cut_stages
         )
     
+    async def _finish_batch_item(
+        self, content_obj: Contents, text_result: tuple, text_decision: RiskLevel,
+        deadline: Deadline, priority: int
+    ) -> Contents:
+        """批量审核中的一条库内记录：检查媒体维度并把综合结论写入记录（不保存）"""
+        all_results = {"text": text_result}
+        final_decision = text_decision
+        if text_decision != RiskLevel.BLOCKED:
+            content_data = {modality: media_urls(getattr(content_obj, modality)) for modality in MEDIA_MODALITIES}
+            checks = self._media_checks(content_data, deadline)
+            if checks:
+                fanout = await self.media_service.fan_out(
+                    checks, self._is_blocking, priority=priority, content_id=content_obj.id
+                )
+                final_decision, _, _ = self._decide(fanout, all_results)
+        self._apply_audit_result(content_obj, final_decision, all_results)
+        return content_obj
+    
+    def _fetch_contents(self, content_ids: List[int]) -> Dict[int, Contents]:
+        """一次查询加载多条内容"""
+        return {
+            content_obj.id: content_obj
+            for content_obj in Contents.select().where(Contents.id.in_(content_ids))
+        }
+    
+    def _bulk_save_audit_results(self, content_objs: List[Contents]):
+        """单事务批量写回审核结果"""
+        with db.atomic():
+            Contents.bulk_update(
+                content_objs,
+                fields=[
+                    Contents.audit_status,
+                    Contents.risk_level,
+                    Contents.processing_status,
+                    Contents.processing_content,
+                    Contents.updated_at
+                ],
+                batch_size=100
+            )
+    
     async def health_check(self) -> Dict[str, Any]:
         """健康检查"""
         health_status = {
@@ -435,7 +721,13 @@ class ModerationService:
             "engines_available": {
                 "text_moderation": self.text_moderation_service is not None,
                 "fusion": True
-            }
+            },
+            "ai_parser": get_ai_response_parser().get_stats(),
+            "pipeline": self.pipeline.get_stats(),
+            "modalities": self.media_service.get_stats(),
+            "vendors": self.media_service.vendors.get_stats(),
+            "media_cache": get_media_cache().get_stats() if get_media_cache() else {"enabled": False},
+            "near_duplicate": get_near_duplicate_index().get_stats() if get_near_duplicate_index() else {"enabled": False}
         }
     
     def reload_rules(self):
@@ -456,6 +748,8 @@ class ModerationService:
     
     async def __aexit__(self, exc_type, exc_val, exc_tb):
         """异步上下文管理器出口"""
+        await self.pipeline.stop()
+        await self.text_moderation_service.aclose()
         self.executor.shutdown(wait=True)
     
     async def moderate_text_direct(self, request: ModerationRequest) -> ModerationResult:
@@ -467,7 +761,10 @@ class ModerationService:
             self.logger.info(f"开始直接文字审核，内容长度: {len(request.content)}")
             
             # 并行运行检测引擎
-            ai_result, rule_result = await self._run_detection_engines(request.content)
+            deadline = Deadline(request.timeout)
+            ai_result, rule_result = await self._run_detection_engines(
+                request.content, priority=request.priority, deadline=deadline
+            )
             
             # 融合结果
             fusion_result = self.fusion_engine.process(
@@ -482,6 +779,7 @@ class ModerationService:
             result = self._build_moderation_result(
                 request, ai_result, rule_result, fusion_result, processing_time
             )
+            result.truncated_stages = deadline.cut_stages
             
             # 记录成功指标
             self._record_success_metrics(result)
@@ -0,0 +1,144 @@
+"""
+异步分阶段审核流水线
+每个阶段有独立的有界优先级队列和并发协程数，只有CPU密集或阻塞的阶段放到线程池执行，
+各阶段队列深度通过 MetricsCollector.update_queue_size 导出
+"""
+
+import asyncio
+import itertools
+from concurrent.futures import Executor
+from dataclasses import dataclass, field
+from typing import Dict, Any, List, Callable, Optional
+
+from utils.exceptions import ModerationError
+from utils.metrics import get_metrics_collector
+from utils.logger import get_logger
+
+
+@dataclass
+class PipelineStage:
+    """流水线阶段定义"""
+    name: str
+    handler: Callable[[Dict[str, Any]], Any]
+    concurrency: int = 4
+    queue_size: int = 200
+    offload: bool = False   # 为True时handler为同步函数，在线程池中执行
+
+
+@dataclass(order=True)
+class _PipelineItem:
+    sort_key: tuple
+    context: Dict[str, Any] = field(compare=False)
+    future: asyncio.Future = field(compare=False)
+
+
+class StagePipeline:
+    """分阶段流水线：条目依次经过各阶段，阶段内按优先级出队"""
+
+    def __init__(self, name: str, stages: List[PipelineStage], executor: Optional[Executor] = None):
+        self.name = name
+        self.stages = stages
+        self.executor = executor
+        self.logger = get_logger(f"pipeline.{name}")
+        self.metrics = get_metrics_collector()
+        self._queues: List[asyncio.PriorityQueue] = []
+        self._workers: List[asyncio.Task] = []
+        self._counter = itertools.count()
+        self._loop = None
+
+    def _ensure_started(self):
+        loop = asyncio.get_running_loop()
+        if self._loop is loop and self._workers:
+            return
+        self._loop = loop
+        self._queues = [asyncio.PriorityQueue(maxsize=stage.queue_size) for stage in self.stages]
+        self._workers = [
+            loop.create_task(self._worker(index))
+            for index, stage in enumerate(self.stages)
+            for _ in range(max(stage.concurrency, 1))
+        ]
+        self.logger.info(
+            "流水线启动: " + ", ".join(f"{s.name}(并发{s.concurrency}/队列{s.queue_size})" for s in self.stages)
+        )
+
+    async def submit(self, context: Dict[str, Any], priority: int = 0) -> Dict[str, Any]:
+        """提交一个条目并等待其走完所有阶段，首个阶段队列满时在此等待（背压）"""
+        self._ensure_started()
+        future = self._loop.create_future()
+        item = _PipelineItem((-int(priority), next(self._counter)), context, future)
+        await self._put(0, item)
+        return await future
+
+    async def _put(self, index: int, item: _PipelineItem):
+        queue = self._queues[index]
+        await queue.put(item)
+        self.metrics.update_queue_size(queue.qsize(), stage=self.stages[index].name)
+
+    async def _run_handler(self, stage: PipelineStage, context: Dict[str, Any]):
+        if stage.offload:
+            return await self._loop.run_in_executor(self.executor, stage.handler, context)
+        return await stage.handler(context)
+
+    async def _worker(self, index: int):
+        stage = self.stages[index]
+        queue = self._queues[index]
+        is_last = index == len(self.stages) - 1
+
+        while True:
+            item = await queue.get()
+            self.metrics.update_queue_size(queue.qsize(), stage=stage.name)
+            try:
+                if item.future.done():
+                    continue
+                try:
+                    await self._run_handler(stage, item.context)
+                except asyncio.CancelledError:
+                    # 只有阶段协程自身被取消（stop）时退出；handler内部的等待被取消时只让该条目失败，协程继续处理队列
+                    if asyncio.current_task().cancelling():
+                        raise
+                    self.logger.error(f"阶段 {stage.name} 处理被取消")
+                    if not item.future.done():
+                        item.future.set_exception(
+                            ModerationError(f"阶段 {stage.name} 处理被取消", error_code="STAGE_CANCELLED")
+                        )
+                    continue
+                except Exception as e:
+                    self.logger.error(f"阶段 {stage.name} 处理失败: {e}")
+                    if not item.future.done():
+                        item.future.set_exception(e)
+                    continue
+
+                if is_last:
+                    if not item.future.done():
+                        item.future.set_result(item.context)
+                else:
+                    await self._put(index + 1, item)
+            finally:
+                queue.task_done()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取各阶段队列深度"""
+        return {
+            stage.name: {
+                "queued": self._queues[index].qsize() if self._queues else 0,
+                "concurrency": stage.concurrency,
+                "queue_size": stage.queue_size
+            }
+            for index, stage in enumerate(self.stages)
+        }
+
+    async def stop(self):
+        """停止所有阶段协程"""
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+
+def stage_settings(config: Dict[str, Any], name: str, concurrency: int, queue_size: int) -> Dict[str, int]:
+    """从 performance.stages 读取阶段并发数和队列深度"""
+    stage_config = config.get("performance", {}).get("stages", {}).get(name, {})
+    return {
+        "concurrency": stage_config.get("concurrency", concurrency),
+        "queue_size": stage_config.get("queue_size", queue_size)
+    }
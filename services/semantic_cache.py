@@ -0,0 +1,173 @@
+"""
+近似重复文本审核结论缓存 - MinHash签名 + LSH分桶索引
+重新抓取的新闻常有署名、日期、标点等细微改动，精确哈希无法命中，
+这里按文字主体的字符shingle相似度复用最近的AI审核结论，规则检测仍对新文本重新执行
+"""
+
+import time
+import threading
+from collections import OrderedDict
+from typing import Dict, Any, Optional, Tuple
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from models.models import AIResult
+from utils.text_features import hashed_char_ngrams, strip_noise
+from utils.logger import get_logger
+
+
+class SemanticVerdictCache:
+    """近似重复审核结论缓存"""
+
+    def __init__(
+        self,
+        similarity_threshold: float = 0.8,
+        num_perm: int = 64,
+        bands: int = 16,
+        shingle_size: int = 3,
+        max_size: int = 5000,
+        ttl: float = 3600,
+        seed: int = 1
+    ):
+        if np is None:
+            raise ImportError("近似重复缓存需要安装 numpy")
+        if num_perm % bands != 0:
+            raise ValueError("num_perm 必须能被 bands 整除")
+
+        self.similarity_threshold = similarity_threshold
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.shingle_size = shingle_size
+        self.max_size = max_size
+        self.ttl = ttl
+        self.logger = get_logger("semantic_cache")
+
+        rng = np.random.default_rng(seed)
+        # 奇数乘子保证映射在 2^64 上可逆
+        self._mul = rng.integers(1, 2 ** 63, size=num_perm, dtype=np.uint64) | np.uint64(1)
+        self._add = rng.integers(0, 2 ** 63, size=num_perm, dtype=np.uint64)
+
+        self._entries: "OrderedDict[int, Tuple[np.ndarray, AIResult, float]]" = OrderedDict()
+        self._buckets: Dict[Tuple[int, bytes], set] = {}
+        self._next_id = 0
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def signature(self, text: str) -> Optional["np.ndarray"]:
+        """计算文本的MinHash签名，文字主体过短时返回None"""
+        body = strip_noise(text)
+        shingles = np.unique(hashed_char_ngrams(body, (self.shingle_size, self.shingle_size)))
+        if len(shingles) == 0:
+            return None
+        with np.errstate(over="ignore"):
+            hashed = shingles[:, None] * self._mul[None, :] + self._add[None, :]
+        return (hashed >> np.uint64(16)).min(axis=0)
+
+    def _band_keys(self, signature: "np.ndarray"):
+        for band in range(self.bands):
+            yield band, signature[band * self.rows:(band + 1) * self.rows].tobytes()
+
+    def _remove(self, entry_id: int):
+        signature = self._entries.pop(entry_id)[0]
+        for key in self._band_keys(signature):
+            bucket = self._buckets.get(key)
+            if bucket is not None:
+                bucket.discard(entry_id)
+                if not bucket:
+                    del self._buckets[key]
+
+    def lookup(self, text: str) -> Optional[Tuple[AIResult, float]]:
+        """查找近似重复文本的AI审核结论，返回(AI结果, 相似度)"""
+        signature = self.signature(text)
+        if signature is None:
+            return None
+
+        now = time.time()
+        with self._lock:
+            candidates = set()
+            for key in self._band_keys(signature):
+                candidates.update(self._buckets.get(key, ()))
+
+            best_id, best_similarity = None, 0.0
+            for entry_id in candidates:
+                cached_signature, _, created_at = self._entries[entry_id]
+                if now - created_at > self.ttl:
+                    self._remove(entry_id)
+                    continue
+                similarity = float(np.count_nonzero(cached_signature == signature)) / self.num_perm
+                if similarity > best_similarity:
+                    best_id, best_similarity = entry_id, similarity
+
+            if best_id is None or best_similarity < self.similarity_threshold:
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(best_id)
+            self.hits += 1
+            _, ai_result, _ = self._entries[best_id]
+
+        ai_copy = ai_result.model_copy(deep=True)
+        ai_copy.detailed_analysis = f"[近似重复缓存命中，相似度{best_similarity:.2f}] {ai_copy.detailed_analysis}"
+        return ai_copy, best_similarity
+
+    def store(self, text: str, ai_result: AIResult):
+        """写入AI审核结论，超出容量时淘汰最久未使用的条目"""
+        signature = self.signature(text)
+        if signature is None:
+            return
+
+        with self._lock:
+            entry_id = self._next_id
+            self._next_id += 1
+            self._entries[entry_id] = (signature, ai_result.model_copy(deep=True), time.time())
+            for key in self._band_keys(signature):
+                self._buckets.setdefault(key, set()).add(entry_id)
+
+            while len(self._entries) > self.max_size:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def clear(self):
+        """清空缓存"""
+        with self._lock:
+            self._entries.clear()
+            self._buckets.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取缓存统计信息"""
+        total = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total > 0 else 0.0,
+            "evictions": self.evictions,
+            "similarity_threshold": self.similarity_threshold
+        }
+
+
+def create_semantic_cache(config: Dict[str, Any]) -> Optional[SemanticVerdictCache]:
+    """根据配置创建近似重复缓存，未启用或不可用时返回None"""
+    semantic_config = config.get("cache", {}).get("semantic", {})
+    if not semantic_config.get("enabled", False):
+        return None
+    if np is None:
+        get_logger("semantic_cache").warning("未安装numpy，近似重复缓存已禁用")
+        return None
+
+    return SemanticVerdictCache(
+        similarity_threshold=semantic_config.get("similarity_threshold", 0.8),
+        num_perm=semantic_config.get("num_perm", 64),
+        bands=semantic_config.get("bands", 16),
+        shingle_size=semantic_config.get("shingle_size", 3),
+        max_size=semantic_config.get("max_size", 5000),
+        ttl=semantic_config.get("ttl", 3600)
+    )
@@ -1,15 +1,20 @@
 """文字审核服务 - 基于AI分析和规则匹配"""
 
 import time
-import re
-import json
+import asyncio
 import requests
+import aiohttp
 from typing import Dict, Any, List, Optional, Tuple
 from datetime import datetime
 
 from models.database import ViolationWord, db
 from models.models import AIResult, RuleResult
-from models.enums import RiskLevel, ContentCategory
+from models.enums import RiskLevel, RequestPriority
+from engines.prescreen_engine import create_prescreen_classifier
+from services.semantic_cache import create_semantic_cache
+from services.agents.agent_pool import get_agent_pool
+from utils.ai_parser import get_ai_response_parser
+from utils.deadline import Deadline
 from utils.logger import get_logger
 from utils.exceptions import ModerationError
 
@@ -17,6 +22,9 @@ from utils.exceptions import ModerationError
 class TextModerationService:
     """文字审核服务"""
     
+    # 剩余预算低于该秒数时不再发起AI调用
+    MIN_AI_BUDGET = 1.0
+    
     def __init__(self, config: Dict[str, Any]):
         self.config = config
         self.logger = get_logger("text_moderation_service")
@@ -32,6 +40,20 @@ class TextModerationService:
         self._cache_update_time = None
         self._cache_ttl = 300  # 缓存5分钟
         
+        # 预筛分类器（可选），明显安全的文本跳过AI检测
+        self.prescreen = create_prescreen_classifier(config)
+        self.prescreen_skipped = 0
+        
+        # 近似重复文本审核结论缓存（可选）
+        self.semantic_cache = create_semantic_cache(config)
+        
+        # AI响应解析器（全局共享，统计解析失败率）
+        self.response_parser = get_ai_response_parser()
+        
+        # 异步AI调用：代理池限制在途请求数，aiohttp会话复用连接
+        self.agent_pool = get_agent_pool(config)
+        self._session: Optional[aiohttp.ClientSession] = None
+        
         self.logger.info("文字审核服务初始化完成")
     
     def moderate_text(self, content: str) -> Tuple[AIResult, RuleResult]:
@@ -41,52 +63,115 @@ class TextModerationService:
         try:
             self.logger.info(f"开始文字审核，内容长度: {len(content)}")
             
-            # 1. 规则匹配检测
-            rule_result = self._rule_based_check(content)
-            
-            # 2. AI分析检测
-            ai_result = self._ai_based_check(content)
-            
-            processing_time = time.time() - start_time
-            rule_result.processing_time = processing_time
-            ai_result.processing_time = processing_time
+            # 1-3. 规则匹配、近似重复缓存、预筛分类
+            rule_result, ai_result = self._pre_ai_checks(content)
             
-            self.logger.info(
-                f"文字审核完成: AI风险等级={ai_result.risk_level.value}, "
-                f"规则风险等级={rule_result.risk_level.value}, "
-                f"处理时间={processing_time:.2f}s"
-            )
+            # 4. AI分析检测
+            if ai_result is None:
+                ai_result = self._ai_based_check(content)
             
-            return ai_result, rule_result
+            return self._finish_moderation(ai_result, rule_result, start_time)
             
         except Exception as e:
             self.logger.error(f"文字审核失败: {e}")
-            processing_time = time.time() - start_time
+            return self._build_error_results(e, time.time() - start_time)
+    
+    async def amoderate_text(
+        self,
+        content: str,
+        priority: int = RequestPriority.NORMAL,
+        deadline: Optional[Deadline] = None
+    ) -> Tuple[AIResult, RuleResult]:
+        """异步文字审核，AI调用经代理池按优先级排队，超时按请求截止时间计算"""
+        start_time = time.time()
+        
+        try:
+            self.logger.info(f"开始文字审核，内容长度: {len(content)}, 优先级: {int(priority)}")
             
-            # 返回默认错误结果
-            error_ai_result = AIResult(
-                risk_level=RiskLevel.SUSPICIOUS,
-                risk_score=0.5,
-                risk_reasons=[f"AI检测失败: {str(e)}"],
-                violated_categories=[],
-                processing_time=processing_time,
-                detailed_analysis="AI检测过程中发生错误",
-                confidence_score=0.1,
-                reasoning=f"错误: {str(e)}",
-                model_name=self.model_config.get("model_name", "unknown")
-            )
+            # 1-3. 规则匹配等CPU/数据库步骤放到线程中，避免阻塞事件循环
+            rule_result, ai_result = await asyncio.to_thread(self._pre_ai_checks, content)
             
-            error_rule_result = RuleResult(
-                risk_level=RiskLevel.SAFE,
-                risk_score=0.0,
-                risk_reasons=[f"规则检测失败: {str(e)}"],
-                violated_categories=[],
-                sensitive_matches=[],
-                processing_time=processing_time,
-                confidence_score=0.0
-            )
+            # 4. AI分析检测
+            if ai_result is None:
+                ai_result = await self._aai_based_check(content, priority, deadline)
+            
+            return self._finish_moderation(ai_result, rule_result, start_time)
             
-            return error_ai_result, error_rule_result
+        except Exception as e:
+            self.logger.error(f"文字审核失败: {e}")
+            return self._build_error_results(e, time.time() - start_time)
+    
+    def _pre_ai_checks(self, content: str) -> Tuple[RuleResult, Optional[AIResult]]:
+        """AI调用之前的检测，返回(规则结果, 可直接使用的AI结果或None)"""
+        # 1. 规则匹配检测
+        rule_result = self._rule_based_check(content)
+        
+        # 2. 近似重复缓存，复用相似文本的AI结论
+        ai_result = self._semantic_cache_check(content)
+        
+        # 3. 预筛分类，明显安全的文本跳过AI检测
+        if ai_result is None:
+            ai_result = self._prescreen_check(content, rule_result)
+        
+        return rule_result, ai_result
+    
+    def pre_ai_checks_batch(self, contents: List[str]) -> List[Tuple[RuleResult, Optional[AIResult]]]:
+        """批量执行AI调用之前的检测，违规词库只加载一次"""
+        self._get_violation_words()
+        results = []
+        for content in contents:
+            try:
+                results.append(self._pre_ai_checks(content))
+            except Exception as e:
+                self.logger.error(f"文字审核失败: {e}")
+                ai_result, rule_result = self._build_error_results(e, 0.0)
+                results.append((rule_result, ai_result))
+        return results
+    
+    def _finish_moderation(
+        self,
+        ai_result: AIResult,
+        rule_result: RuleResult,
+        start_time: float
+    ) -> Tuple[AIResult, RuleResult]:
+        """记录处理时间并输出审核日志"""
+        processing_time = time.time() - start_time
+        rule_result.processing_time = processing_time
+        ai_result.processing_time = processing_time
+        
+        self.logger.info(
+            f"文字审核完成: AI风险等级={ai_result.risk_level.value}, "
+            f"规则风险等级={rule_result.risk_level.value}, "
+            f"处理时间={processing_time:.2f}s"
+        )
+        
+        return ai_result, rule_result
+    
+    def _build_error_results(self, e: Exception, processing_time: float) -> Tuple[AIResult, RuleResult]:
+        """构建默认错误结果"""
+        error_ai_result = AIResult(
+            risk_level=RiskLevel.SUSPICIOUS,
+            risk_score=0.5,
+            risk_reasons=[f"AI检测失败: {str(e)}"],
+            violated_categories=[],
+            processing_time=processing_time,
+            detailed_analysis="AI检测过程中发生错误",
+            confidence_score=0.1,
+            reasoning=f"错误: {str(e)}",
+            model_name=self.model_config.get("model_name", "unknown")
+        )
+        
+        error_rule_result = RuleResult(
+            risk_level=RiskLevel.SAFE,
+            risk_score=0.0,
+            risk_reasons=[f"规则检测失败: {str(e)}"],
+            violated_categories=[],
+            sensitive_matches=[],
+            processing_time=processing_time,
+            confidence_score=0.0
+        )
+        
+        return error_ai_result, error_rule_result
     
     def _rule_based_check(self, content: str) -> RuleResult:
         """基于规则的检测"""
@@ -172,36 +257,131 @@ class TextModerationService:
         start_time = time.time()
         
         try:
-            # 构建AI检测提示词
-            system_prompt = self._create_ai_prompt()
-            
             # 调用AI模型
-            response_text = self._call_ai_model(system_prompt, content)
-            
-            # 解析AI响应
-            ai_result = self._parse_ai_response(response_text)
-            
-            processing_time = time.time() - start_time
-            ai_result.processing_time = processing_time
-            ai_result.model_name = self.model_config.get("model_name", "unknown")
+            response_text = self._call_ai_model(self._create_ai_prompt(), content)
+            return self._handle_ai_response(content, response_text, start_time)
             
-            return ai_result
+        except Exception as e:
+            self.logger.error(f"AI检测失败: {e}")
+            return self._build_ai_error_result(e, time.time() - start_time)
+    
+    async def _aai_based_check(
+        self,
+        content: str,
+        priority: int,
+        deadline: Optional[Deadline] = None
+    ) -> AIResult:
+        """基于AI的异步检测，在代理池名额内调用模型；排队和调用都受截止时间约束"""
+        start_time = time.time()
+        
+        # 剩余预算不足以完成一次模型调用时直接跳过
+        if deadline is not None and not deadline.has_budget(self.MIN_AI_BUDGET):
+            deadline.cut("ai")
+            return self._build_ai_skipped_result(time.time() - start_time)
+        
+        try:
+            api_base = self.model_config.get("api_base", "http://175.27.143.201:11434")
+            remaining = deadline.remaining() if deadline is not None else None
+            async with asyncio.timeout(remaining):
+                async with self.agent_pool.slot(api_base, priority):
+                    timeout = self.ai_config.get("timeout", 30.0)
+                    if deadline is not None:
+                        timeout = deadline.timeout_for(timeout)
+                    response_text = await self._acall_ai_model(self._create_ai_prompt(), content, timeout)
+            return self._handle_ai_response(content, response_text, start_time)
             
         except Exception as e:
+            if deadline is not None and deadline.expired():
+                self.logger.warning(f"请求预算耗尽，AI检测被截断: {e}")
+                deadline.cut("ai")
+                return self._build_ai_skipped_result(time.time() - start_time)
             self.logger.error(f"AI检测失败: {e}")
-            processing_time = time.time() - start_time
+            return self._build_ai_error_result(e, time.time() - start_time)
+    
+    def _handle_ai_response(self, content: str, response_text: str, start_time: float) -> AIResult:
+        """解析AI响应并写入近似重复缓存"""
+        # 后备解析的结果不写入近似重复缓存
+        ai_result, parsed = self.response_parser.parse_with_status(response_text, source="text_service")
+        
+        ai_result.processing_time = time.time() - start_time
+        ai_result.model_name = self.model_config.get("model_name", "unknown")
+        
+        if self.semantic_cache is not None and parsed:
+            self.semantic_cache.store(content, ai_result)
+        
+        return ai_result
+    
+    def _build_ai_skipped_result(self, processing_time: float) -> AIResult:
+        """构建因超时预算耗尽而跳过AI检测的结果"""
+        return AIResult(
+            risk_level=RiskLevel.SUSPICIOUS,
+            risk_score=0.5,
+            risk_reasons=["请求超时预算耗尽，未完成AI检测"],
+            violated_categories=[],
+            processing_time=processing_time,
+            detailed_analysis="超时预算耗尽，AI检测被跳过",
+            confidence_score=0.0,
+            reasoning="超时预算耗尽",
+            recommendations=["建议人工复核"],
+            model_name=self.model_config.get("model_name", "unknown")
+        )
+    
+    def _build_ai_error_result(self, e: Exception, processing_time: float) -> AIResult:
+        """构建AI检测失败结果"""
+        return AIResult(
+            risk_level=RiskLevel.SUSPICIOUS,
+            risk_score=0.5,
+            risk_reasons=[f"AI检测失败: {str(e)}"],
+            violated_categories=[],
+            processing_time=processing_time,
+            detailed_analysis="AI检测过程中发生错误",
+            confidence_score=0.1,
+            reasoning=f"错误: {str(e)}",
+            model_name=self.model_config.get("model_name", "unknown")
+        )
+    
+    def _semantic_cache_check(self, content: str) -> Optional[AIResult]:
+        """近似重复缓存检测，命中时返回缓存的AI结果，否则返回None"""
+        if self.semantic_cache is None:
+            return None
+        
+        try:
+            cached = self.semantic_cache.lookup(content)
+        except Exception as e:
+            self.logger.warning(f"近似重复缓存查询失败: {e}")
+            return None
+        
+        if cached is None:
+            return None
+        ai_result, similarity = cached
+        self.logger.info(f"近似重复缓存命中，相似度: {similarity:.2f}")
+        return ai_result
+    
+    def _prescreen_check(self, content: str, rule_result: RuleResult) -> Optional[AIResult]:
+        """预筛分类检测，可跳过AI时返回安全结果，否则返回None"""
+        if self.prescreen is None or rule_result.risk_level != RiskLevel.SAFE:
+            return None
+        
+        try:
+            start_time = time.time()
+            skip, probability = self.prescreen.is_confidently_safe(content)
+            if not skip:
+                return None
             
+            self.prescreen_skipped += 1
             return AIResult(
-                risk_level=RiskLevel.SUSPICIOUS,
-                risk_score=0.5,
-                risk_reasons=[f"AI检测失败: {str(e)}"],
-                violated_categories=[],
-                processing_time=processing_time,
-                detailed_analysis="AI检测过程中发生错误",
-                confidence_score=0.1,
-                reasoning=f"错误: {str(e)}",
-                model_name=self.model_config.get("model_name", "unknown")
+                risk_level=RiskLevel.SAFE,
+                risk_score=probability,
+                risk_reasons=[],
+                detailed_analysis="预筛分类器判定为安全，跳过AI检测",
+                confidence_score=1.0 - probability,
+                reasoning=f"预筛违规概率 {probability:.4f} 低于阈值 {self.prescreen.skip_threshold}",
+                model_name="prescreen",
+                processing_time=time.time() - start_time
             )
+        except Exception as e:
+            self.logger.warning(f"预筛分类失败，继续AI检测: {e}")
+            return None
     
     def _get_violation_words(self) -> List[Dict[str, Any]]:
         """获取违规词库（带缓存）"""
@@ -284,29 +464,27 @@ class TextModerationService:
 
 现在请分析以下内容："""
     
-    def _call_ai_model(self, system_prompt: str, content: str) -> str:
-        """调用AI模型"""
-        api_base = self.model_config.get("api_base", "http://175.27.143.201:11434")
-        model_name = self.model_config.get("model_name", "qwen2.5:7b")
-        timeout = self.ai_config.get("timeout", 30.0)
-        
-        # 构建请求
-        prompt = f"{system_prompt}\n\n内容：{content}"
-        
-        payload = {
-            "model": model_name,
-            "prompt": prompt,
+    def _build_ai_payload(self, system_prompt: str, content: str) -> Dict[str, Any]:
+        """构建Ollama生成请求"""
+        return {
+            "model": self.model_config.get("model_name", "qwen2.5:7b"),
+            "prompt": f"{system_prompt}\n\n内容：{content}",
             "stream": False,
             "options": {
                 "temperature": self.model_config.get("temperature", 0.1),
                 "num_predict": self.model_config.get("max_tokens", 2000),
             }
         }
+    
+    def _call_ai_model(self, system_prompt: str, content: str) -> str:
+        """调用AI模型"""
+        api_base = self.model_config.get("api_base", "http://175.27.143.201:11434")
+        timeout = self.ai_config.get("timeout", 30.0)
         
         try:
             response = requests.post(
                 f"{api_base}/api/generate",
-                json=payload,
+                json=self._build_ai_payload(system_prompt, content),
                 timeout=timeout
             )
             response.raise_for_status()
@@ -323,114 +501,47 @@ class TextModerationService:
         except Exception as e:
             raise ModerationError(f"AI模型调用失败: {e}")
     
-    def _parse_ai_response(self, response_text: str) -> AIResult:
-        """解析AI响应"""
-        try:
-            # 尝试提取JSON
-            json_match = re.search(r'```json\s*(\{.*?\})\s*```', response_text, re.DOTALL)
-            if json_match:
-                json_str = json_match.group(1)
-            else:
-                # 尝试直接解析整个响应
-                json_str = response_text.strip()
-            
-            data = json.loads(json_str)
-            
-            # 映射风险等级
-            risk_level_map = {
-                "safe": RiskLevel.SAFE,
-                "suspicious": RiskLevel.SUSPICIOUS,
-                "risky": RiskLevel.RISKY,
-                "blocked": RiskLevel.BLOCKED
-            }
-            
-            risk_level = risk_level_map.get(data.get("risk_level", "safe"), RiskLevel.SAFE)
-            
-            # 映射分类
-            category_map = {
-                "political": ContentCategory.POLITICAL,
-                "violence": ContentCategory.VIOLENCE,
-                "adult": ContentCategory.ADULT,
-                "illegal": ContentCategory.ILLEGAL,
-                "fraud": ContentCategory.FRAUD,
-                "privacy": ContentCategory.PRIVACY,
-                "hate_speech": ContentCategory.HATE_SPEECH,
-                "harassment": ContentCategory.HARASSMENT,
-                "spam": ContentCategory.SPAM,
-                "misinformation": ContentCategory.MISINFORMATION
-            }
-            
-            categories = [
-                category_map.get(cat, ContentCategory.OTHER)
-                for cat in data.get("categories", [])
-                if cat in category_map
-            ]
-            
-            # 计算风险分数
-            confidence = data.get("confidence_score", 0.5)
-            risk_score = self._calculate_risk_score(risk_level, confidence)
-            
-            return AIResult(
-                risk_level=risk_level,
-                violated_categories=categories,
-                risk_score=risk_score,
-                risk_reasons=data.get("recommendations", []),
-                detailed_analysis=data.get("reasoning", ""),
-                confidence_score=confidence,
-                suspicious_segments=data.get("suspicious_segments", []),
-                keywords_found=data.get("keywords_found", []),
-                evasion_techniques=[],
-                reasoning=data.get("reasoning", ""),
-                recommendations=data.get("recommendations", [])
+    async def _get_session(self) -> aiohttp.ClientSession:
+        """获取复用的aiohttp会话"""
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(
+                timeout=aiohttp.ClientTimeout(total=self.ai_config.get("timeout", 30.0))
             )
-            
-        except (json.JSONDecodeError, KeyError) as e:
-            self.logger.warning(f"AI响应解析失败，使用后备解析: {e}")
-            return self._fallback_parse_ai_response(response_text)
+        return self._session
     
-    def _fallback_parse_ai_response(self, response_text: str) -> AIResult:
-        """AI响应后备解析方法"""
-        text_lower = response_text.lower()
-        
-        # 简单的关键词检测
-        if any(keyword in text_lower for keyword in ["blocked", "严重", "违规"]):
-            risk_level = RiskLevel.BLOCKED
-            risk_score = 0.8
-        elif any(keyword in text_lower for keyword in ["risky", "风险", "危险"]):
-            risk_level = RiskLevel.RISKY
-            risk_score = 0.6
-        elif any(keyword in text_lower for keyword in ["suspicious", "可疑", "注意"]):
-            risk_level = RiskLevel.SUSPICIOUS
-            risk_score = 0.4
-        else:
-            risk_level = RiskLevel.SAFE
-            risk_score = 0.1
+    async def aclose(self):
+        """关闭aiohttp会话"""
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+    
+    async def _acall_ai_model(self, system_prompt: str, content: str, timeout: Optional[float] = None) -> str:
+        """异步调用AI模型，timeout为空时使用配置的默认超时"""
+        api_base = self.model_config.get("api_base", "http://175.27.143.201:11434")
+        timeout = timeout or self.ai_config.get("timeout", 30.0)
+        session = await self._get_session()
         
-        return AIResult(
-            risk_level=risk_level,
-            violated_categories=[],
-            risk_score=risk_score,
-            risk_reasons=["AI响应解析失败，使用简单分析"],
-            detailed_analysis=response_text[:200] + "...",
-            confidence_score=0.3,
-            suspicious_segments=[],
-            keywords_found=[],
-            evasion_techniques=[],
-            reasoning="后备解析方法",
-            recommendations=["建议人工复核"]
-        )
+        try:
+            async with session.post(
+                f"{api_base}/api/generate",
+                json=self._build_ai_payload(system_prompt, content),
+                timeout=aiohttp.ClientTimeout(total=timeout)
+            ) as response:
+                response.raise_for_status()
+                result_data = await response.json(content_type=None)
+            
+            return result_data.get("response", "")
+            
+        except asyncio.TimeoutError:
+            raise ModerationError(f"AI模型请求超时 ({timeout}s)")
+        except aiohttp.ClientError as e:
+            raise ModerationError(f"AI模型请求失败: {e}")
+        except Exception as e:
+            raise ModerationError(f"AI模型调用失败: {e}")
     
-    def _calculate_risk_score(self, risk_level: RiskLevel, confidence: float) -> float:
-        """根据风险等级和置信度计算风险分数"""
-        base_scores = {
-            RiskLevel.SAFE: 0.1,
-            RiskLevel.SUSPICIOUS: 0.4,
-            RiskLevel.RISKY: 0.7,
-            RiskLevel.BLOCKED: 0.9
-        }
-        base_score = base_scores.get(risk_level, 0.5)
-        # 置信度影响最终分数
-        return min(base_score * confidence + 0.1, 1.0)
+    def _parse_ai_response(self, response_text: str) -> AIResult:
+        """解析AI响应"""
+        return self.response_parser.parse(response_text, source="text_service")
     
     def refresh_violation_words_cache(self):
         """刷新违规词库缓存"""
@@ -460,7 +571,16 @@ class TextModerationService:
                 "rule_engine": {
                     "status": rule_status,
                     "violation_words_count": len(violation_words)
-                }
+                },
+                "prescreen": {
+                    "enabled": self.prescreen is not None,
+                    "skip_threshold": self.prescreen.skip_threshold if self.prescreen else None,
+                    "skipped_count": self.prescreen_skipped,
+                    "report": self.prescreen.report if self.prescreen else {}
+                },
+                "semantic_cache": self.semantic_cache.get_stats() if self.semantic_cache else {"enabled": False},
+                "ai_parser": self.response_parser.get_stats(),
+                "agent_pool": self.agent_pool.get_stats()
             }
         except Exception as e:
             return {
@@ -0,0 +1,21 @@
+"""
+审核厂商模块 - 易盾与阿里云的统一异步接口、按模态的厂商路由与对冲
+"""
+
+from .base import ModerationVendor, SubmitBatcher, LatencyTracker, vendor_error
+from .netease import NeteaseVendor, MODALITY_TASK_TYPES
+from .aliyun import AliyunVendor, create_aliyun_vendor
+from .router import VendorRouter, create_vendor_router
+
+__all__ = [
+    "ModerationVendor",
+    "SubmitBatcher",
+    "LatencyTracker",
+    "vendor_error",
+    "NeteaseVendor",
+    "MODALITY_TASK_TYPES",
+    "AliyunVendor",
+    "create_aliyun_vendor",
+    "VendorRouter",
+    "create_vendor_router"
+]
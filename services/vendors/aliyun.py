@@ -0,0 +1,70 @@
+"""
+阿里云内容安全审核厂商
+同一模态的提交在短时间窗口内合并为多任务请求；文本和图片为同步检测直接得到结论，
+音频和视频提交异步检测后等待阿里云结果轮询器批量查询并写入结果注册表
+"""
+
+from typing import Dict, Any, Optional
+
+from utils.deadline import Deadline
+from .base import ModerationVendor, SubmitBatcher, vendor_error
+
+
+class AliyunVendor(ModerationVendor):
+    """阿里云：共享客户端批量提交 + 轮询取异步检测结论"""
+
+    name = "aliyun"
+    MODALITIES = ("text", "images", "audios", "videos")
+
+    def __init__(self, config: Dict[str, Any], client, latency_window: int = 200):
+        super().__init__(latency_window)
+        self.config = config
+        self.client = client
+        performance = config.get("performance", {})
+        self.result_timeout = performance.get("vendor_result_timeout", 60.0)
+        self._batchers = self._init_batchers(performance.get("vendor_submit_delay", 0.02))
+
+    def _init_batchers(self, max_delay: float) -> Dict[str, SubmitBatcher]:
+        """每个模态一个提交合并器，批量上限取客户端的单次请求任务数"""
+        from services.aliyunsdk import acheck_service
+
+        return {
+            modality: SubmitBatcher(
+                lambda items, modality=modality: acheck_service(modality, items),
+                self.client.batch_sizes[modality], max_delay
+            )
+            for modality in self.MODALITIES
+        }
+
+    async def _check(self, modality: str, content: str, deadline: Optional[Deadline]) -> Dict[str, Any]:
+        from services.aliyunsdk import SUBMIT_TASK_TYPES
+
+        item = await self._batchers[modality].submit(content)
+        task_id = item.get("task_id")
+        if not task_id:
+            return vendor_error(item.get("msg") or "提交审核失败")
+        if item.get("status") == "completed":
+            return {
+                "task_id": task_id,
+                "status": "completed",
+                "is_compliant": item["is_compliant"],
+                "result_text": item.get("result_text")
+            }
+        return await self.poll(task_id, SUBMIT_TASK_TYPES[modality], deadline)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            **super().get_stats(),
+            "client": self.client.get_stats(),
+            "submit": {modality: batcher.get_stats() for modality, batcher in self._batchers.items()}
+        }
+
+
+def create_aliyun_vendor(config: Dict[str, Any], latency_window: int = 200) -> Optional[AliyunVendor]:
+    """使用全局共享的阿里云客户端创建厂商，客户端不可用时返回None"""
+    from services.aliyunsdk import get_aliyun_client
+
+    client = get_aliyun_client()
+    if client is None:
+        return None
+    return AliyunVendor(config, client, latency_window=latency_window)
@@ -0,0 +1,181 @@
+"""
+审核厂商抽象
+易盾和阿里云实现同一异步接口 check(模态, 内容, 截止时间)，返回统一的结论字典
+{"status": completed/timeout/error, "is_compliant", "result_text", "task_id", "vendor"}；
+每个厂商按模态记录最近若干次成功审核的耗时，供对冲策略计算分位数
+"""
+
+import time
+import asyncio
+from abc import ABC, abstractmethod
+from collections import deque
+from typing import Dict, Any, List, Optional, Callable, Awaitable, Tuple
+
+from utils.deadline import Deadline
+from utils.events import publish_event
+from utils.logger import get_logger
+
+
+def vendor_error(error: str, status: str = "error", **extra) -> Dict[str, Any]:
+    """厂商未给出结论时的统一结果"""
+    return {"status": status, "is_compliant": False, "error": error, **extra}
+
+
+class SubmitBatcher:
+    """提交合并器：max_delay窗口内的提交合并为一次批量请求，达到max_batch时立即发送"""
+
+    def __init__(self, submit: Callable[[List[str]], Awaitable[List[Dict[str, Any]]]],
+                 max_batch: int, max_delay: float = 0.02):
+        self._submit = submit
+        self.max_batch = max(int(max_batch), 1)
+        self.max_delay = max_delay
+        self._pending: List[Tuple[str, asyncio.Future]] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._sending = set()
+        self.requests = 0
+        self.items = 0
+
+    async def submit(self, item: str) -> Dict[str, Any]:
+        """提交单个条目，返回该条目的提交结果"""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((item, future))
+        if len(self._pending) >= self.max_batch:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.max_delay, self._flush)
+        return await future
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, []
+        if batch:
+            task = asyncio.get_running_loop().create_task(self._send(batch))
+            self._sending.add(task)
+            task.add_done_callback(self._sending.discard)
+
+    async def _send(self, batch: List[Tuple[str, asyncio.Future]]):
+        items = [item for item, _ in batch]
+        try:
+            results = await self._submit(items)
+        except Exception as e:
+            results = [{"task_id": None, "msg": f"Error: {str(e)}"} for _ in items]
+        self.requests += 1
+        self.items += len(items)
+        for index, (_, future) in enumerate(batch):
+            if future.done():
+                continue
+            # 接口未初始化时只返回一条错误，其余条目沿用该错误
+            result = results[index] if index < len(results) else (results[0] if results else {})
+            future.set_result(result)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {"requests": self.requests, "items": self.items, "max_batch": self.max_batch}
+
+
+class LatencyTracker:
+    """按模态保留最近window个耗时样本，计算分位数"""
+
+    def __init__(self, window: int = 200):
+        self.window = window
+        self._samples: Dict[str, deque] = {}
+
+    def observe(self, modality: str, seconds: float):
+        samples = self._samples.get(modality)
+        if samples is None:
+            samples = self._samples[modality] = deque(maxlen=self.window)
+        samples.append(seconds)
+
+    def count(self, modality: str) -> int:
+        return len(self._samples.get(modality) or ())
+
+    def quantile(self, modality: str, q: float) -> Optional[float]:
+        """耗时的q分位数，无样本时返回None"""
+        samples = self._samples.get(modality)
+        if not samples:
+            return None
+        ordered = sorted(samples)
+        return ordered[min(int(q * len(ordered)), len(ordered) - 1)]
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            modality: {
+                "samples": len(samples),
+                "p50": self.quantile(modality, 0.5),
+                "p90": self.quantile(modality, 0.9)
+            }
+            for modality, samples in self._samples.items()
+        }
+
+
+class ModerationVendor(ABC):
+    """审核厂商基类，子类声明厂商名 name 和支持的模态 MODALITIES，异步检测的子类设置 config 和 result_timeout"""
+
+    name = ""
+    MODALITIES: Tuple[str, ...] = ()
+    config: Dict[str, Any] = {}
+    result_timeout: float = 60.0
+
+    def __init__(self, latency_window: int = 200):
+        self.latency = LatencyTracker(latency_window)
+        self.logger = get_logger(f"vendor.{self.name}")
+        self.requests = 0
+        self.errors = 0
+
+    def supports(self, modality: str) -> bool:
+        return modality in self.MODALITIES
+
+    @abstractmethod
+    async def _check(self, modality: str, content: str, deadline: Optional[Deadline]) -> Dict[str, Any]:
+        """提交一条内容并等待结论"""
+        pass
+
+    async def check(self, modality: str, content: str, deadline: Optional[Deadline] = None) -> Dict[str, Any]:
+        """审核一条内容（文本或媒体URL），只有厂商实际给出结论的请求计入耗时样本，
+        缓存命中几乎不耗时，计入后会拉低p90，使大多数未命中缓存的请求被对冲到备用厂商"""
+        if not self.supports(modality):
+            return vendor_error(f"{self.name}不支持{modality}审核", vendor=self.name)
+        started = time.monotonic()
+        self.requests += 1
+        try:
+            result = await self._check(modality, content, deadline)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            self.logger.error(f"{modality}审核失败: {e}")
+            result = vendor_error(str(e))
+        if result.get("status") == "completed":
+            if not result.get("cached"):
+                self.latency.observe(modality, time.monotonic() - started)
+        else:
+            self.errors += 1
+        result.setdefault("vendor", self.name)
+        return result
+
+    async def poll(self, task_id: str, task_type: str, deadline: Optional[Deadline] = None) -> Dict[str, Any]:
+        """在结果注册表上等待该厂商的异步审核结果，由其集中轮询器（易盾还有厂商回调）写入后唤醒"""
+        from task.poller import get_task_poller, poller_channel
+        from task.registry import get_task_result_registry
+
+        # 确保该厂商、任务类型的轮询器已创建，登记等待时会被唤醒
+        get_task_poller(task_type, self.config, vendor=self.name)
+        timeout = deadline.timeout_for(self.result_timeout) if deadline is not None else self.result_timeout
+        publish_event("vendor_pending", vendor=self.name, task_id=task_id)
+        verdict = await get_task_result_registry().wait(task_id, poller_channel(task_type, self.name), timeout)
+        if verdict is None:
+            if deadline is not None and deadline.expired():
+                deadline.cut(f"{task_type}_poll")
+            return vendor_error("审核超时或失败", status="timeout", task_id=task_id)
+
+        is_compliant, result_text = verdict
+        return {
+            "task_id": task_id,
+            "status": "completed",
+            "is_compliant": is_compliant,
+            "result_text": result_text
+        }
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {"requests": self.requests, "errors": self.errors, "latency": self.latency.get_stats()}
@@ -0,0 +1,66 @@
+"""
+易盾审核厂商
+同一模态的提交在短时间窗口内合并为批量请求，结论由集中轮询器或厂商回调写入结果注册表后唤醒等待方
+"""
+
+from typing import Dict, Any, Optional
+
+from models.enums import TaskType
+from utils.deadline import Deadline
+from .base import ModerationVendor, SubmitBatcher, vendor_error
+
+
+MODALITY_TASK_TYPES = {
+    "text": TaskType.TEXT.value,
+    "images": TaskType.IMAGE.value,
+    "audios": TaskType.AUDIO.value,
+    "videos": TaskType.VIDEO.value
+}
+
+
+class NeteaseVendor(ModerationVendor):
+    """易盾：批量提交 + 轮询/回调取结论"""
+
+    name = "wangyiyun"
+    MODALITIES = ("text", "images", "audios", "videos")
+
+    def __init__(self, config: Dict[str, Any], latency_window: int = 200):
+        super().__init__(latency_window)
+        self.config = config
+        performance = config.get("performance", {})
+        self.result_timeout = performance.get("vendor_result_timeout", 60.0)
+        self._batchers = self._init_batchers(performance.get("vendor_submit_delay", 0.02))
+
+    def _init_batchers(self, max_delay: float) -> Dict[str, SubmitBatcher]:
+        """每个模态一个提交合并器，批量上限取易盾接口的单次提交上限"""
+        from services.wangyiyunsdk import SUBMIT_BATCH_SIZES, acheck_texts_service, acheck_media_service
+
+        batchers = {"text": SubmitBatcher(acheck_texts_service, SUBMIT_BATCH_SIZES["text"], max_delay)}
+        for modality in ("images", "audios", "videos"):
+            batchers[modality] = SubmitBatcher(
+                lambda items, modality=modality: acheck_media_service(modality, items),
+                SUBMIT_BATCH_SIZES[modality], max_delay
+            )
+        return batchers
+
+    async def _check(self, modality: str, content: str, deadline: Optional[Deadline]) -> Dict[str, Any]:
+        item = await self._batchers[modality].submit(content)
+        task_id = item.get("task_id")
+        if not task_id:
+            return vendor_error(item.get("msg") or item.get("error", "提交审核失败"))
+        if item.get("cached") and item.get("is_compliant") is not None:
+            # 媒体结论缓存命中，无需等待厂商结果
+            return {
+                "task_id": task_id,
+                "status": "completed",
+                "is_compliant": item["is_compliant"],
+                "result_text": item.get("result_text"),
+                "cached": True
+            }
+        return await self.poll(task_id, MODALITY_TASK_TYPES[modality], deadline)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            **super().get_stats(),
+            "submit": {modality: batcher.get_stats() for modality, batcher in self._batchers.items()}
+        }
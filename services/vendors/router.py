@@ -0,0 +1,167 @@
+"""
+厂商路由与对冲
+每个模态配置主厂商和可选的备用厂商：主厂商返回错误或超时时改由备用厂商审核；
+开启对冲时，主厂商超过其近期耗时分位数（默认p90）仍未返回，就把同一内容同时提交给备用厂商，
+取先给出的结论并取消另一方，单个厂商变慢时尾部延迟不再受其拖累
+"""
+
+import asyncio
+from typing import Dict, Any, Optional, Tuple
+
+from utils.deadline import Deadline
+from utils.logger import get_logger
+from utils.metrics import get_metrics_collector
+from .base import ModerationVendor, vendor_error
+
+
+MODALITIES = ("text", "images", "audios", "videos")
+
+
+class VendorRouter:
+    """按模态选择主备厂商并执行对冲"""
+
+    def __init__(
+        self,
+        vendors: Dict[str, ModerationVendor],
+        routes: Dict[str, Dict[str, Any]],
+        hedge_quantile: float = 0.9,
+        min_samples: int = 20,
+        initial_delay: float = 3.0,
+        min_delay: float = 0.2
+    ):
+        self.vendors = vendors
+        self.hedge_quantile = hedge_quantile
+        self.min_samples = min_samples
+        self.initial_delay = initial_delay
+        self.min_delay = min_delay
+        self.logger = get_logger("vendor.router")
+        self.metrics = get_metrics_collector()
+        self.routes = {modality: self._resolve(modality, route) for modality, route in routes.items()}
+        self.outcomes: Dict[str, Dict[str, int]] = {modality: {} for modality in self.routes}
+
+    def _resolve(self, modality: str, route: Dict[str, Any]) -> Tuple[Optional[str], Optional[str], bool]:
+        """校验路由配置：不可用的厂商被剔除，主厂商不可用时由备用厂商顶替"""
+        names = []
+        for name in (route.get("primary"), route.get("secondary")):
+            if not name or name in names:
+                continue
+            vendor = self.vendors.get(name)
+            if vendor is None or not vendor.supports(modality):
+                self.logger.warning(f"{modality}审核厂商 {name} 不可用，已忽略")
+                continue
+            names.append(name)
+        primary = names[0] if names else None
+        secondary = names[1] if len(names) > 1 else None
+        return primary, secondary, bool(route.get("hedge", False)) and secondary is not None
+
+    def hedge_delay(self, vendor: ModerationVendor, modality: str) -> float:
+        """主厂商的对冲等待时间：样本足够时取耗时分位数，否则取初始值"""
+        if vendor.latency.count(modality) < self.min_samples:
+            return self.initial_delay
+        return max(vendor.latency.quantile(modality, self.hedge_quantile), self.min_delay)
+
+    def _record(self, modality: str, outcome: str):
+        counts = self.outcomes.setdefault(modality, {})
+        counts[outcome] = counts.get(outcome, 0) + 1
+        self.metrics.record_vendor_hedge(modality, outcome)
+
+    async def check(self, modality: str, content: str, deadline: Optional[Deadline] = None) -> Dict[str, Any]:
+        """按路由审核一条内容"""
+        primary_name, secondary_name, hedge = self.routes.get(modality, (None, None, False))
+        if primary_name is None:
+            return vendor_error(f"未配置可用的{modality}审核厂商")
+        primary = self.vendors[primary_name]
+        if secondary_name is None:
+            return await primary.check(modality, content, deadline)
+        secondary = self.vendors[secondary_name]
+
+        first = asyncio.ensure_future(primary.check(modality, content, deadline))
+        tasks = {first}
+        try:
+            delay = self.hedge_delay(primary, modality) if hedge else None
+            if delay is not None and deadline is not None:
+                delay = deadline.timeout_for(delay)
+            await asyncio.wait(tasks, timeout=delay)
+
+            if first.done():
+                result = first.result()
+                if result.get("status") == "completed" or (deadline is not None and deadline.expired()):
+                    self._record(modality, "primary")
+                    return result
+                # 主厂商出错或超时，改由备用厂商审核
+                fallback = await secondary.check(modality, content, deadline)
+                self._record(modality, "failover" if fallback.get("status") == "completed" else "failed")
+                return fallback if fallback.get("status") == "completed" else result
+
+            # 主厂商超过分位数耗时仍未返回，对冲到备用厂商
+            second = asyncio.ensure_future(secondary.check(modality, content, deadline))
+            tasks.add(second)
+            failed = None
+            pending = set(tasks)
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    result = task.result()
+                    if result.get("status") == "completed":
+                        self._record(modality, "hedge_primary" if task is first else "hedge_secondary")
+                        return result
+                    if failed is None or task is first:
+                        failed = result
+            self._record(modality, "failed")
+            return failed
+        finally:
+            pending = [task for task in tasks if not task.done()]
+            for task in pending:
+                task.cancel()
+            if pending:
+                await asyncio.gather(*pending, return_exceptions=True)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """各模态的路由、当前对冲等待时间与结果分布，以及各厂商统计"""
+        routes = {}
+        for modality, (primary, secondary, hedge) in self.routes.items():
+            routes[modality] = {
+                "primary": primary,
+                "secondary": secondary,
+                "hedge": hedge,
+                "hedge_delay": self.hedge_delay(self.vendors[primary], modality) if hedge else None,
+                "outcomes": self.outcomes.get(modality, {})
+            }
+        return {
+            "routes": routes,
+            "vendors": {name: vendor.get_stats() for name, vendor in self.vendors.items()}
+        }
+
+
+def create_vendor_router(config: Dict[str, Any]) -> VendorRouter:
+    """根据 platform.vendors 配置创建厂商路由，各模态的主厂商默认取 platform.current"""
+    from .netease import NeteaseVendor
+    from .aliyun import create_aliyun_vendor
+
+    platform = config.get("platform", {})
+    vendors_config = platform.get("vendors", {}) or {}
+    default_primary = platform.get("current") or NeteaseVendor.name
+    configured = vendors_config.get("modalities") or {}
+    routes = {
+        modality: {"primary": default_primary, **(configured.get(modality) or {})}
+        for modality in MODALITIES
+    }
+    window = vendors_config.get("latency_window", 200)
+
+    names = {route.get(key) for route in routes.values() for key in ("primary", "secondary")}
+    vendors: Dict[str, ModerationVendor] = {}
+    if NeteaseVendor.name in names:
+        vendors[NeteaseVendor.name] = NeteaseVendor(config, latency_window=window)
+    if "aliyun" in names:
+        aliyun = create_aliyun_vendor(config, latency_window=window)
+        if aliyun is not None:
+            vendors[aliyun.name] = aliyun
+
+    return VendorRouter(
+        vendors,
+        routes,
+        hedge_quantile=vendors_config.get("hedge_quantile", 0.9),
+        min_samples=vendors_config.get("min_samples", 20),
+        initial_delay=vendors_config.get("initial_delay", 3.0),
+        min_delay=vendors_config.get("min_delay", 0.2)
+    )
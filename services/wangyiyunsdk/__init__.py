@@ -1,4 +1,8 @@
 import json
+import hmac
+import time
+import asyncio
+from urllib.parse import urlparse
 
 try:
     from config import settings
@@ -13,11 +17,18 @@ from .image_query import ImageQueryByTaskIdsDemo
 from .audio_query import AudioQueryByTaskIdsDemo
 from .video_query import VideoQueryByTaskIdsDemo
 from .text_query import TextQueryByTaskIdsDemo
-from models.database import Task, TaskType, TaskStatus
+from .transport import get_transport
+from services.media_cache import get_media_cache, media_key
+from services.image_dedup import get_near_duplicate_index
+from utils.logger import get_logger
+from models.database import Task, TaskType, TaskStatus, db
+from utils.exceptions import ValidationError
 from datetime import datetime
 import uuid
 import json
 
+logger = get_logger("wangyiyun")
+
 # 初始化 SDK 实例
 if settings:
     image_create_api = ImageSubmitAPIDemo(settings.WANGYIYUN_SECRET_ID, settings.WANGYIYUN_SECRET_KEY, settings.IMAGE_BUSINESS_ID)
@@ -39,118 +50,246 @@ else:
     video_query_api = None
     text_query_api = None
 
-def check_images_service(img_path_list, callback_url=""):
-    if image_create_api is None:
-        return [{"error": "Image API not initialized"}]
-    
-    results = []
-    for img_path in img_path_list:
-        data_id = str(uuid.uuid4())
-        params = {
-        "images": json.dumps([{"name": data_id, "data": img_path, "level": 2}])
+# 接口地址可替换为本地模拟服务等，只保留各接口原有路径
+API_BASE = (settings.WANGYIYUN_API_BASE or "") if settings else ""
+if API_BASE:
+    for _api in (image_create_api, audio_create_api, video_create_api, text_create_api,
+                 image_query_api, audio_query_api, video_query_api, text_query_api):
+        _api.API_URL = API_BASE.rstrip("/") + urlparse(_api.API_URL).path
+
+# 主动回调地址，配置后提交时携带，审核完成由易盾回调 /api/v1/check/callback/wangyiyun
+DEFAULT_CALLBACK_URL = (settings.WANGYIYUN_CALLBACK_URL or "") if settings else ""
+# 回调timestamp（毫秒）与本机时间相差超过该秒数时拒绝，防止截获的回调被重放
+CALLBACK_MAX_AGE = 300
+
+# 单次提交请求可携带的最大条目数，音视频v4提交接口每次只接受一个条目
+IMAGE_SUBMIT_BATCH_SIZE = 32
+TEXT_SUBMIT_BATCH_SIZE = 100
+SUBMIT_BATCH_SIZES = {
+    "text": TEXT_SUBMIT_BATCH_SIZE,
+    "images": IMAGE_SUBMIT_BATCH_SIZE,
+    "audios": 1,
+    "videos": 1
+}
+
+
+# 各提交类型对应的任务类型、条目标识字段和结果中的内容字段
+SUBMIT_TASK_TYPES = {
+    "text": TaskType.TEXT.value,
+    "images": TaskType.IMAGE.value,
+    "audios": TaskType.AUDIO.value,
+    "videos": TaskType.VIDEO.value
+}
+_SUBMIT_ID_KEYS = {"text": "dataId", "images": "name", "audios": "dataId", "videos": "dataId"}
+
+
+def _get_submit_api(media_type):
+    apis = {
+        "text": text_create_api,
+        "images": image_create_api,
+        "audios": audio_create_api,
+        "videos": video_create_api
     }
+    if media_type not in apis:
+        raise Exception(f"Unsupported media type: {media_type}")
+    return apis[media_type]
 
-        try:
-            res = image_create_api.check(params)
-            if res and res.get("result"):
-                task_id = res["result"][0]['taskId']
-            else:
-                raise Exception("Invalid response from image API")
-            Task.create(
-                id=data_id,
-                task_id=task_id,
-                type=TaskType.IMAGE.value,
-                status=TaskStatus.CREATED.value,
-                create_time=datetime.now(),
-                update_time=datetime.now(),
-                content=img_path
-            )
-            results.append({
-                "file_path": img_path,
-                "task_id": task_id,
-                "msg": "Pending"
-            })
-        except Exception as e:
-            results.append({
-                "file_path": img_path,
-                "task_id": None,
-                "msg": f"Error: {str(e)}"
-            })
+
+def _map_task_ids(res, key, data_ids):
+    """将提交结果中的taskId按条目标识映射回各条目，结果未带标识时按顺序对应"""
+    result = res.get("result") or []
+    if isinstance(result, dict):
+        result = [result]
+    task_ids = {item.get(key): item.get("taskId") for item in result if isinstance(item, dict) and item.get(key)}
+    if not task_ids and len(result) == len(data_ids):
+        task_ids = {data_id: item.get("taskId") for data_id, item in zip(data_ids, result) if isinstance(item, dict)}
+    return task_ids
+
+
+def _build_submit_params(media_type, contents, callback_url):
+    """构造一次提交请求的参数：文本和图片为数组批量提交，音视频每次一个条目"""
+    data_ids = [str(uuid.uuid4()) for _ in contents]
+    if media_type in ("audios", "videos"):
+        params = {"dataId": data_ids[0], "url": contents[0]}
+        if callback_url:
+            params["callbackUrl"] = callback_url
+        return data_ids, params
+
+    items = []
+    for data_id, content in zip(data_ids, contents):
+        if media_type == "text":
+            item = {"dataId": data_id, "content": content, "action": "0"}
+        else:
+            item = {"name": data_id, "data": content, "level": 2}
+        if callback_url:
+            item["callbackUrl"] = callback_url
+        items.append(item)
+    return data_ids, {("texts" if media_type == "text" else "images"): json.dumps(items)}
+
+
+def _submit_result(media_type, content, data_id, task_id, msg):
+    if media_type == "text":
+        return {"task_id": task_id, "data_id": data_id, "msg": msg}
+    return {"file_path": content, "task_id": task_id, "msg": msg}
+
+
+def _record_submitted(media_type, contents, data_ids, res, error=None, hashes=None, fingerprints=None):
+    """解析提交结果，整批Task在一个事务中insert_many登记，单个条目缺少taskId时只影响该条目；
+    媒体同时登记到结论缓存和感知哈希索引，与Task同一事务提交"""
+    if not res or res.get("code") != 200 or not res.get("result"):
+        error = error or f"Error: {res.get('msg', 'Unknown error') if res else 'No response'}"
+        return [_submit_result(media_type, content, data_id, None, error)
+                for content, data_id in zip(contents, data_ids)]
+
+    task_ids = _map_task_ids(res, _SUBMIT_ID_KEYS[media_type], data_ids)
+    now = datetime.now()
+    results = []
+    rows = []
+    for content, data_id in zip(contents, data_ids):
+        task_id = task_ids.get(data_id)
+        if not task_id:
+            results.append(_submit_result(media_type, content, data_id, None, f"Error: No taskId returned for {media_type}"))
+            continue
+        rows.append({
+            "id": data_id,
+            "task_id": task_id,
+            "type": SUBMIT_TASK_TYPES[media_type],
+            "status": TaskStatus.CREATED.value,
+            "content": content,
+            "created_at": now,
+            "updated_at": now
+        })
+        results.append(_submit_result(media_type, content, data_id, task_id, "Pending"))
+    if not rows:
+        return results
+
+    cache = _media_cache_for(media_type)
+    try:
+        with db.atomic():
+            Task.insert_many(rows).execute()
+            if cache is not None:
+                cache.record_submitted(SUBMIT_TASK_TYPES[media_type], [
+                    (content, result["task_id"], (hashes or {}).get(content))
+                    for content, result in zip(contents, results)
+                ])
+            if fingerprints:
+                get_near_duplicate_index().record_submitted([
+                    (content, result["task_id"], fingerprints.get(content))
+                    for content, result in zip(contents, results)
+                ])
+    except Exception as e:
+        logger.error(f"登记{len(rows)}个{media_type}任务失败: {e}")
+        return [_submit_result(media_type, content, data_id, None, f"Error: {str(e)}")
+                for content, data_id in zip(contents, data_ids)]
+    return results
+
+
+def _submit_chunk(media_type, contents, callback_url):
+    """同步提交一个批次"""
+    data_ids, params = _build_submit_params(media_type, contents, callback_url)
+    try:
+        res, error = _get_submit_api(media_type).check(params), None
+    except Exception as e:
+        res, error = None, f"Error: {str(e)}"
+    return _record_submitted(media_type, contents, data_ids, res, error)
+
+
+async def _asubmit_chunk(media_type, contents, callback_url, hashes=None, fingerprints=None):
+    """异步提交一个批次，HTTP经共享传输直接await，Task登记在线程中执行"""
+    data_ids, params = _build_submit_params(media_type, contents, callback_url)
+    try:
+        res, error = await _get_submit_api(media_type).acheck(params), None
+    except Exception as e:
+        res, error = None, f"Error: {str(e)}"
+    return await asyncio.to_thread(_record_submitted, media_type, contents, data_ids, res, error, hashes, fingerprints)
+
+
+def _media_cache_for(media_type):
+    """媒体提交使用结论缓存，文本不缓存"""
+    return get_media_cache() if media_type in ("images", "audios", "videos") else None
+
+
+def _cached_result(media_type, content, entry):
+    """由缓存条目构造提交结果：已完成的直接带结论，审核中的复用在途任务"""
+    completed = entry["status"] == "completed"
+    result = _submit_result(media_type, content, None, entry["task_id"], "Cached" if completed else "Pending")
+    result["cached"] = True
+    if completed:
+        result["is_compliant"] = entry["is_compliant"]
+        result["result_text"] = entry["result_text"]
+    return result
+
+
+def _plan_submit(media_type, contents, cache):
+    """按规范化URL去重并查找缓存，返回 ({缓存键: 首个内容}, {缓存键: 已命中结果}, 待提交内容)"""
+    task_type = SUBMIT_TASK_TYPES[media_type]
+    unique = {}
+    for content in contents:
+        unique.setdefault(media_key(task_type, content), content)
+    found = cache.lookup(task_type, list(unique.values()))
+    by_key = {key: _cached_result(media_type, content, found[content])
+              for key, content in unique.items() if content in found}
+    misses = [content for key, content in unique.items() if key not in by_key]
+    return unique, by_key, misses
+
+
+def _assemble(media_type, contents, by_key):
+    """按输入顺序组装结果，重复媒体共用同一任务"""
+    task_type = SUBMIT_TASK_TYPES[media_type]
+    results = []
+    for content in contents:
+        result = dict(by_key[media_key(task_type, content)])
+        if "file_path" in result:
+            result["file_path"] = content
+        results.append(result)
     return results
 
+
+def _chunks(media_type, contents):
+    size = SUBMIT_BATCH_SIZES[media_type]
+    return [contents[start:start + size] for start in range(0, len(contents), size)]
+
+
+def _submit_service(media_type, contents, callback_url=""):
+    """按单次提交上限分批同步提交，返回结果与输入顺序一致"""
+    callback_url = callback_url or DEFAULT_CALLBACK_URL
+    contents = list(contents)
+    cache = _media_cache_for(media_type)
+    if cache is None:
+        results = []
+        for chunk in _chunks(media_type, contents):
+            results.extend(_submit_chunk(media_type, chunk, callback_url))
+        return results
+
+    _, by_key, misses = _plan_submit(media_type, contents, cache)
+    task_type = SUBMIT_TASK_TYPES[media_type]
+    for chunk in _chunks(media_type, misses):
+        for content, result in zip(chunk, _submit_chunk(media_type, chunk, callback_url)):
+            by_key[media_key(task_type, content)] = result
+    return _assemble(media_type, contents, by_key)
+
+
+def check_images_service(img_path_list, callback_url=""):
+    """图片审核服务，按IMAGE_SUBMIT_BATCH_SIZE分批提交，返回结果与输入顺序一致"""
+    if image_create_api is None:
+        return [{"error": "Image API not initialized"}]
+    return _submit_service("images", img_path_list, callback_url)
+
 def check_audios_service(audio_path_list, callback_url=""):
     if audio_create_api is None:
         return [{"error": "Audio API not initialized"}]
-    
-    results = []
-    for audio_path in audio_path_list:
-        data_id = str(uuid.uuid4())
-        params = {"dataId": data_id, "url": audio_path}
-        try:
-            res = audio_create_api.check(params)
-            if res and res.get("result"):
-                task_id = res["result"][0]['taskId']
-            else:
-                raise Exception("Invalid response from audio API")
-            Task.create(
-                id=data_id,
-                task_id=task_id,
-                type=TaskType.AUDIO.value,
-                status=TaskStatus.CREATED.value,
-                create_time=datetime.now(),
-                update_time=datetime.now(),
-                content=audio_path
-            )
-            results.append({
-                "file_path": audio_path,
-                "task_id": task_id,
-                "msg": "Pending"
-            })
-        except Exception as e:
-            results.append({
-                "file_path": audio_path,
-                "task_id": None,
-                "msg": f"Error: {str(e)}"
-            })
-    return results
+    return _submit_service("audios", audio_path_list, callback_url)
 
 def check_videos_service(video_path_list, callback_url=""):
     if video_create_api is None:
         return [{"error": "Video API not initialized"}]
-    
-    results = []
-    for video_path in video_path_list:
-        data_id = str(uuid.uuid4())
-        params = {"dataId": data_id, "url": video_path}
-        try:
-            res = video_create_api.check(params)
-            if res and res.get("result"):
-                task_id = res["result"][0]['taskId']
-            else:
-                raise Exception("Invalid response from video API")
-            Task.create(
-                id=data_id,
-                task_id=task_id,
-                type=TaskType.VIDEO.value,
-                status=TaskStatus.CREATED.value,
-                create_time=datetime.now(),
-                update_time=datetime.now(),
-                content=video_path
-            )
-            results.append({
-                "file_path": video_path,
-                "task_id": task_id,
-                "msg": "Pending"
-            })
-        except Exception as e:
-            results.append({
-                "file_path": video_path,
-                "task_id": None,
-                "msg": f"Error: {str(e)}"
-            })
-    return results
+    return _submit_service("videos", video_path_list, callback_url)
 
-def query_task(task_id, task_type):
+# 结果查询接口单次请求最多携带的taskId数
+QUERY_BATCH_SIZE = 100
+
+
+def _get_query_api(task_type):
     if task_type == TaskType.IMAGE.value:
         api = image_query_api
     elif task_type == TaskType.AUDIO.value:
@@ -164,100 +303,264 @@ def query_task(task_id, task_type):
     
     if api is None:
         raise Exception(f"API not initialized for task type: {task_type}")
+    return api
+
+
+def parse_query_item(result_item):
+    """解析单个任务的查询结果，审核未完成时返回None，否则返回(是否合规, 结果描述)"""
+    if result_item.get("status") != 0:
+        return None
+    is_compliant = False
+    labels = result_item.get("labels", [])
+    label_dict = {i["label"]: i["rate"] for i in labels if isinstance(i, dict)}
+    if label_dict.get(100):
+        msg = f"""涉嫌<font color="red">色情</font>，置信度：<font color="red">{label_dict[100]}</font>"""
+    # 100：色情，110：性感低俗，200：广告，210：二维码，260：广告法，300：暴恐，400：违禁，500：涉政，800：恶心类，900：其他，1100：涉价值观
+    elif label_dict.get(110):
+        msg = f"""涉嫌<font color="red">性感低俗</font>，置信度：<font color="red">{label_dict[110]}</font>"""
+    elif label_dict.get(200):
+        msg = f"""涉嫌<font color="red">广告</font>，置信度：<font color="red">{label_dict[200]}</font>"""
+    elif label_dict.get(210):
+        msg = f"""涉嫌<font color="red">二维码</font>，置信度：<font color="red">{label_dict[210]}</font>"""
+    elif label_dict.get(260):
+        msg = f"""涉嫌<font color="red">广告法</font>，置信度：<font color="red">{label_dict[260]}</font>"""
+    elif label_dict.get(300):
+        msg = f"""涉嫌<font color="red">暴恐</font>，置信度：<font color="red">{label_dict[300]}</font>"""
+    elif label_dict.get(400):
+        msg = f"""涉嫌<font color="red">违禁</font>，置信度：<font color="red">{label_dict[400]}</font>"""
+    # elif label_dict.get(500):
+    #     msg = f"""涉嫌<font color="red">涉政</font>，置信度：<font color="red">{label_dict[500]}</font>"""
+    elif label_dict.get(800):
+        msg = f"""涉嫌<font color="red">恶心</font>，置信度：<font color="red">{label_dict[800]}</font>"""
+    # elif label_dict.get(900):
+    #     msg = f"""涉嫌<font color="red">其他</font>，置信度：<font color="red">{label_dict[900]}</font>"""
+    # elif label_dict.get(1100):
+    #     msg = f"""涉嫌<font color="red">涉价值观</font>，置信度：<font color="red">{label_dict[1100]}</font>"""
+    else:
+        msg = f"""合规"""
+        is_compliant = True
+    return is_compliant, msg
+
+
+def query_tasks(task_ids, task_type):
+    """批量查询审核结果（最多QUERY_BATCH_SIZE个），只返回已完成的任务 {task_id: (是否合规, 结果描述)}，不更新Task表"""
+    api = _get_query_api(task_type)
+    params = {"taskIds": json.dumps(list(task_ids))}
+    return _parse_query_response(api.query(params))
+
+
+def _parse_query_response(result):
+    if not result or result.get("code") != 200:
+        error_msg = result.get('msg', 'Unknown error') if result else 'No response'
+        raise Exception(f"Error querying tasks: {error_msg}")
+    
+    finished = {}
+    for result_item in result.get("result") or []:
+        parsed = parse_query_item(result_item)
+        if parsed is not None and result_item.get("taskId"):
+            finished[result_item["taskId"]] = parsed
+    return finished
+
+
+def save_task_results(finished):
+    """单事务批量回写已完成任务 {task_id: (是否合规, 结果描述)}，媒体结论缓存和感知哈希索引在同一事务中更新"""
+    now = datetime.now()
+    cache = get_media_cache()
+    index = get_near_duplicate_index()
+    # 先读后写的事务直接获取写锁，避免并发事务从读锁升级时互相等待
+    with db.atomic("IMMEDIATE"):
+        rows = list(Task.select().where(Task.task_id.in_(list(finished))))
+        for row in rows:
+            row.is_compliant, row.result_text = finished[row.task_id]
+            row.status = TaskStatus.SUCCESS.value
+            row.updated_at = now
+        if rows:
+            Task.bulk_update(
+                rows,
+                fields=[Task.is_compliant, Task.result_text, Task.status, Task.updated_at],
+                batch_size=100
+            )
+        if cache is not None:
+            cache.record_results(finished)
+        if index is not None:
+            index.record_results(finished)
+    return rows
+
+
+def parse_callback(params):
+    """解析易盾主动回调：按businessId定位接口并校验签名，返回已完成任务 {task_id: (是否合规, 结果描述)}"""
+    apis = [api for api in (image_create_api, audio_create_api, video_create_api, text_create_api)
+            if api is not None and api.business_id == params.get("businessId")]
+    if not apis:
+        raise ValidationError("未知的businessId", field="businessId", value=params.get("businessId"))
+    api = apis[0]
+    signature = params.get("signature", "")
+    expected = api.gen_signature({k: v for k, v in params.items() if k != "signature"})
+    if params.get("secretId") != api.secret_id or not hmac.compare_digest(
+            signature.encode("utf-8"), expected.encode("utf-8")):
+        raise ValidationError("回调签名校验失败", field="signature")
+    try:
+        timestamp = int(params.get("timestamp") or 0) / 1000
+    except ValueError:
+        raise ValidationError("回调timestamp格式错误", field="timestamp", value=params.get("timestamp"))
+    if abs(time.time() - timestamp) > CALLBACK_MAX_AGE:
+        raise ValidationError("回调已过期", field="timestamp", value=params.get("timestamp"))
+    
+    try:
+        data = json.loads(params.get("callbackData") or "[]")
+    except ValueError:
+        raise ValidationError("callbackData格式错误", field="callbackData")
+    
+    finished = {}
+    for item in data if isinstance(data, list) else [data]:
+        if not isinstance(item, dict):
+            continue
+        # v5接口的回调结果包在antispam中，回调只在审核完成后发送
+        item = item.get("antispam", item)
+        task_id = item.get("taskId")
+        parsed = parse_query_item({"status": 0, **item})
+        if task_id and parsed is not None:
+            finished[task_id] = parsed
+    return finished
+
+
+def handle_callback(params):
+    """处理易盾主动回调并回写Task表，返回 {task_id: (是否合规, 结果描述)}"""
+    finished = parse_callback(params)
+    if finished:
+        save_task_results(finished)
+    return finished
+
+
+def query_task(task_id, task_type):
+    api = _get_query_api(task_type)
     
     params = {"taskIds": [task_id]}
     result = api.query(params)
     if result and result.get("code") == 200:
-        is_compliant = False
-        msg = "未知结果"  # 初始化msg变量，避免None值
         result_data = result.get("result", [])
         if not result_data:
             return None
-        result_item = result_data[0]
-        if result_item.get("status") != 0:
-            msg = "审核中"
+        parsed = parse_query_item(result_data[0])
+        if parsed is None:
             return None
-        labels = result_item.get("labels", [])
-        label_dict = {i["label"]: i["rate"] for i in labels if isinstance(i, dict)}
-        if label_dict.get(100):
-            msg = f"""涉嫌<font color="red">色情</font>，置信度：<font color="red">{label_dict[100]}</font>"""
-        # 根据以下内容编写 elif分支 # 100：色情，110：性感低俗，200：广告，210：二维码，260：广告法，300：暴恐，400：违禁，500：涉政，800：恶心类，900：其他，1100：涉价值观
-        elif label_dict.get(110):
-            msg = f"""涉嫌<font color="red">性感低俗</font>，置信度：<font color="red">{label_dict[110]}</font>"""
-        elif label_dict.get(200):
-            msg = f"""涉嫌<font color="red">广告</font>，置信度：<font color="red">{label_dict[200]}</font>"""
-        elif label_dict.get(210):
-            msg = f"""涉嫌<font color="red">二维码</font>，置信度：<font color="red">{label_dict[210]}</font>"""
-        elif label_dict.get(260):
-            msg = f"""涉嫌<font color="red">广告法</font>，置信度：<font color="red">{label_dict[260]}</font>"""
-        elif label_dict.get(300):
-            msg = f"""涉嫌<font color="red">暴恐</font>，置信度：<font color="red">{label_dict[300]}</font>"""
-        elif label_dict.get(400):
-            msg = f"""涉嫌<font color="red">违禁</font>，置信度：<font color="red">{label_dict[400]}</font>"""
-        # elif label_dict.get(500):
-        #     msg = f"""涉嫌<font color="red">涉政</font>，置信度：<font color="red">{label_dict[500]}</font>"""
-        elif label_dict.get(800):
-            msg = f"""涉嫌<font color="red">恶心</font>，置信度：<font color="red">{label_dict[800]}</font>"""
-        # elif label_dict.get(900):
-        #     msg = f"""涉嫌<font color="red">其他</font>，置信度：<font color="red">{label_dict[900]}</font>"""
-        # elif label_dict.get(1100):
-        #     msg = f"""涉嫌<font color="red">涉价值观</font>，置信度：<font color="red">{label_dict[1100]}</font>"""
-        else:
-            msg = f"""合规"""
-            is_compliant = True
-        task = Task.get(Task.task_id == task_id)
-        task.is_compliant = is_compliant
-        task.status = TaskStatus.SUCCESS.value
-        task.result_text = msg
-        task.update_time = datetime.now()
-        task.save()
-        return task
+        rows = save_task_results({task_id: parsed})
+        return rows[0] if rows else None
     else:
         error_msg = result.get('msg', 'Unknown error') if result else 'No response'
         raise Exception(f"Error querying task: {error_msg}")
 
 
+def check_texts_service(text_list, callback_url=""):
+    """批量文本审核服务，按TEXT_SUBMIT_BATCH_SIZE分批提交，返回结果与输入顺序一致"""
+    if text_create_api is None:
+        return [{"error": "Text API not initialized"} for _ in text_list]
+    return _submit_service("text", text_list, callback_url)
+
+
 def check_text_service(text_content, callback_url=""):
     """文本审核服务"""
     if text_create_api is None:
         return {"error": "Text API not initialized"}
-    
-    data_id = str(uuid.uuid4())
-    _params = {
-        "dataId": data_id,
-        "content": text_content,
-        "action": "0"
-    }
-    params = {
-        "texts": json.dumps([_params])
-    }
-    try:
-        res = text_create_api.check(params)
-        if res and res.get("code") == 200:
-            task_id = res["result"][0]["taskId"]
-            Task.create(
-                id=data_id,
-                task_id=task_id,
-                type=TaskType.TEXT.value,
-                status=TaskStatus.CREATED.value,
-                create_time=datetime.now(),
-                update_time=datetime.now(),
-                content=text_content
-            )
-            return {
-                "task_id": task_id,
-                "data_id": data_id,
-                "msg": "Pending"
-            }
-        else:
-            return {
-                "task_id": None,
-                "data_id": data_id,
-                "msg": f"Error: {res.get('msg', 'Unknown error') if res else 'No response'}"
-            }
-    except Exception as e:
-        return {
-            "task_id": None,
-            "data_id": data_id,
-            "msg": f"Error: {str(e)}"
-        }
+    return check_texts_service([text_content], callback_url)[0]
+
+
+async def _resolve_by_content(media_type, misses, by_key, cache):
+    """下载URL未命中的文件，依次按内容sha256（需开启hash_content）和图片感知哈希（需开启near_duplicate）查找结论，
+    命中的写入by_key，返回 (仍需提交的内容, {内容: sha256}, {内容: 感知哈希})"""
+    task_type = SUBMIT_TASK_TYPES[media_type]
+    index = get_near_duplicate_index() if media_type == "images" else None
+    if not misses or (index is None and not cache.wants_content_hash(task_type)):
+        return misses, {}, {}
+
+    fetched = await cache.fetch(misses)
+    found = {}
+    hashes = {}
+    if cache.wants_content_hash(task_type):
+        hashes = {content: cache.content_hash(data) for content, data in fetched.items()}
+        found.update(await asyncio.to_thread(cache.lookup_hashes, task_type, hashes))
+    fingerprints = {}
+    if index is not None:
+        fingerprints = await asyncio.to_thread(
+            index.fingerprints, {content: data for content, data in fetched.items() if content not in found}
+        )
+        for content, value in fingerprints.items():
+            entry = await asyncio.to_thread(index.lookup, value)
+            if entry is not None:
+                found[content] = entry
+
+    for content, entry in found.items():
+        by_key[media_key(task_type, content)] = _cached_result(media_type, content, entry)
+    return [content for content in misses if content not in found], hashes, fingerprints
+
+
+# 异步接口：HTTP请求经共享传输直接await，各批次并发提交
+async def _asubmit_service(media_type, contents, callback_url=""):
+    callback_url = callback_url or DEFAULT_CALLBACK_URL
+    contents = list(contents)
+    cache = _media_cache_for(media_type)
+    if cache is None:
+        chunk_results = await asyncio.gather(
+            *[_asubmit_chunk(media_type, chunk, callback_url) for chunk in _chunks(media_type, contents)]
+        )
+        return [result for results in chunk_results for result in results]
+
+    # 先按规范化URL查缓存，未命中的再按文件内容查，仍未命中的才提交
+    task_type = SUBMIT_TASK_TYPES[media_type]
+    _, by_key, misses = await asyncio.to_thread(_plan_submit, media_type, contents, cache)
+    misses, hashes, fingerprints = await _resolve_by_content(media_type, misses, by_key, cache)
+
+    chunks = _chunks(media_type, misses)
+    chunk_results = await asyncio.gather(
+        *[_asubmit_chunk(media_type, chunk, callback_url, hashes, fingerprints) for chunk in chunks]
+    )
+    for chunk, results in zip(chunks, chunk_results):
+        for content, result in zip(chunk, results):
+            by_key[media_key(task_type, content)] = result
+    return _assemble(media_type, contents, by_key)
+
+
+async def acheck_text_service(text_content, callback_url=""):
+    """异步文本审核提交"""
+    if text_create_api is None:
+        return {"error": "Text API not initialized"}
+    return (await _asubmit_service("text", [text_content], callback_url))[0]
+
+
+async def acheck_texts_service(text_list, callback_url=""):
+    """异步批量文本审核提交"""
+    if text_create_api is None:
+        return [{"error": "Text API not initialized"} for _ in text_list]
+    return await _asubmit_service("text", text_list, callback_url)
+
+
+async def acheck_media_service(media_type, path_list, callback_url=""):
+    """异步媒体审核提交，media_type为images/audios/videos"""
+    if media_type not in ("images", "audios", "videos"):
+        raise Exception(f"Unsupported media type: {media_type}")
+    if _get_submit_api(media_type) is None:
+        return [{"error": f"{media_type} API not initialized"}]
+    return await _asubmit_service(media_type, path_list, callback_url)
+
+
+async def aquery_task(task_id, task_type):
+    """异步查询审核结果，未完成时返回None"""
+    finished = await aquery_tasks([task_id], task_type)
+    if task_id not in finished:
+        return None
+    from task.writer import get_task_result_writer
+
+    rows = await get_task_result_writer().save({task_id: finished[task_id]})
+    return rows[0] if rows else None
+
+
+async def aquery_tasks(task_ids, task_type):
+    """异步批量查询审核结果"""
+    api = _get_query_api(task_type)
+    result = await api.aquery({"taskIds": json.dumps(list(task_ids))})
+    return _parse_query_response(result)
+
+
+async def aclose_transport():
+    """关闭共享传输的连接池"""
+    await get_transport().aclose()
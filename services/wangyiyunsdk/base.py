@@ -0,0 +1,205 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+易盾接口基类
+统一公共参数、签名与请求发送，所有提交和查询接口经共享传输访问易盾，可同步调用也可直接await；
+发送前按业务ID限流排队，遇到限流、服务端错误和连接异常时重新签名并按指数退避重试；
+提交接口只在连接失败、限流和服务端错误时重试，读超时不重试以免重复提交
+"""
+
+import hashlib
+import time
+import random
+import asyncio
+from urllib.parse import urlparse
+from gmssl import sm3, func
+
+from utils.exceptions import RateLimitError
+from utils.metrics import get_metrics_collector
+from utils.logger import get_logger
+from .transport import get_transport, TransportError
+
+# 易盾业务返回码：411为请求频率超限，5xx为服务端异常，均可重试
+THROTTLE_CODES = (411,)
+SERVER_ERROR_CODES = (500, 502, 503, 504)
+
+
+class NeteaseAPIBase(object):
+    """易盾接口基类，子类声明 API_URL、VERSION 和请求类别 KIND（submit/query）"""
+
+    API_URL = ""
+    VERSION = ""
+    KIND = "query"
+    EXTRA_PARAMS = {}  # 每次请求附带的固定参数
+
+    def __init__(self, secret_id, secret_key, business_id, transport=None):
+        """
+        Args:
+            secret_id (str) 产品密钥ID，产品标识
+            secret_key (str) 产品私有密钥，服务端生成签名信息使用
+            business_id (str) 业务ID，易盾根据产品业务特点分配
+            transport (NeteaseTransport) 传输对象，默认使用全局共享传输
+        """
+        self.secret_id = secret_id
+        self.secret_key = secret_key
+        self.business_id = business_id
+        self._transport = transport
+        self.logger = get_logger(f"wangyiyun.{self.__class__.__name__}")
+        self.metrics = get_metrics_collector()
+
+    @property
+    def transport(self):
+        if self._transport is None:
+            self._transport = get_transport()
+        return self._transport
+
+    def gen_signature(self, params=None):
+        """生成签名信息
+        Args:
+            params (object) 请求参数
+        Returns:
+            参数签名md5值
+        """
+        buff = ""
+        for k in sorted(params.keys()):
+            buff += str(k) + str(params[k])
+        buff += self.secret_key
+        if "signatureMethod" in params.keys() and params["signatureMethod"] == "SM3":
+            return sm3.sm3_hash(func.bytes_to_list(bytes(buff, encoding='utf8')))
+        else:
+            return hashlib.md5(buff.encode("utf8")).hexdigest()
+
+    def sign_params(self, params):
+        """补充公共参数并签名"""
+        params["secretId"] = self.secret_id
+        params["businessId"] = self.business_id
+        params["version"] = self.VERSION
+        params["timestamp"] = int(time.time() * 1000)
+        params["nonce"] = int(random.random() * 100000000)
+        params.update(self.EXTRA_PARAMS)
+        # params["signatureMethod"] = "SM3"  # 签名方法，默认MD5，支持SM3
+        params["signature"] = self.gen_signature(params)
+        return params
+
+    @property
+    def api_name(self):
+        """指标中的接口名，取接口路径"""
+        return urlparse(self.API_URL).path
+
+    def _retry_reason(self, result=None, error=None):
+        """判断本次结果是否需要重试，返回重试原因或None，限流时通知限流器降速"""
+        limiter = self.transport.rate_limiter
+        if error is not None:
+            if error.throttled:
+                reason = "throttled"
+            else:
+                reason = "server_error" if error.status else "connection"
+            if not error.retryable:
+                return None
+            # 提交接口在请求已发出后失败（读超时、连接中断）时厂商可能已受理，重试会重复提交
+            if self.KIND == "submit" and not error.status and not error.connect_failed:
+                return None
+        else:
+            code = result.get("code") if isinstance(result, dict) else None
+            if code in THROTTLE_CODES:
+                reason = "throttled"
+            elif code in SERVER_ERROR_CODES:
+                reason = "server_error"
+            else:
+                if limiter is not None:
+                    limiter.on_success(self.business_id)
+                return None
+        if reason == "throttled":
+            self.metrics.record_vendor_throttle(self.api_name)
+            if limiter is not None:
+                limiter.on_throttle(self.business_id)
+        return reason
+
+    def request(self, params):
+        """同步请求易盾接口
+        Args:
+            params (object) 请求参数
+        Returns:
+            请求结果，json格式；重试后仍失败时返回None
+        """
+        transport = self.transport
+        result = None
+        for attempt in range(transport.max_retries + 1):
+            try:
+                if transport.rate_limiter is not None:
+                    self.metrics.record_vendor_rate_wait(
+                        self.api_name, transport.rate_limiter.acquire_sync(self.business_id)
+                    )
+                # 每次尝试重新生成时间戳和随机数并签名
+                result = transport.post(self.API_URL, self.sign_params(dict(params)), kind=self.KIND)
+                reason = self._retry_reason(result=result)
+            except TransportError as ex:
+                reason = self._retry_reason(error=ex)
+                if reason is None or attempt >= transport.max_retries:
+                    self.logger.error(f"调用API接口失败: {ex}")
+                    return None
+            except RateLimitError as ex:
+                self.logger.error(f"调用API接口失败: {ex.message}")
+                return None
+            if reason is None or attempt >= transport.max_retries:
+                return result
+            transport.retries += 1
+            self.metrics.record_vendor_retry(self.api_name, reason)
+            time.sleep(transport.backoff(attempt))
+        return result
+
+    async def arequest(self, params):
+        """异步请求易盾接口，返回值同 request"""
+        transport = self.transport
+        result = None
+        for attempt in range(transport.max_retries + 1):
+            try:
+                if transport.rate_limiter is not None:
+                    self.metrics.record_vendor_rate_wait(
+                        self.api_name, await transport.rate_limiter.acquire(self.business_id)
+                    )
+                # 每次尝试重新生成时间戳和随机数并签名
+                result = await transport.apost(self.API_URL, self.sign_params(dict(params)), kind=self.KIND)
+                reason = self._retry_reason(result=result)
+            except TransportError as ex:
+                reason = self._retry_reason(error=ex)
+                if reason is None or attempt >= transport.max_retries:
+                    self.logger.error(f"调用API接口失败: {ex}")
+                    return None
+            except RateLimitError as ex:
+                self.logger.error(f"调用API接口失败: {ex.message}")
+                return None
+            if reason is None or attempt >= transport.max_retries:
+                return result
+            transport.retries += 1
+            self.metrics.record_vendor_retry(self.api_name, reason)
+            await asyncio.sleep(transport.backoff(attempt))
+        return result
+
+
+class NeteaseSubmitAPI(NeteaseAPIBase):
+    """提交接口基类"""
+
+    KIND = "submit"
+
+    def check(self, params):
+        """提交检测，返回请求结果"""
+        return self.request(params)
+
+    async def acheck(self, params):
+        """异步提交检测"""
+        return await self.arequest(params)
+
+
+class NeteaseQueryAPI(NeteaseAPIBase):
+    """结果查询接口基类"""
+
+    KIND = "query"
+
+    def query(self, params):
+        """查询检测结果，返回请求结果"""
+        return self.request(params)
+
+    async def aquery(self, params):
+        """异步查询检测结果"""
+        return await self.arequest(params)
@@ -0,0 +1,215 @@
+"""
+易盾SDK共享HTTP传输层
+所有提交与查询接口共用一个传输对象：异步调用走aiohttp连接池，同步调用（示例入口、同步服务函数）走urllib3连接池，
+两者使用同一份连接池大小、keep-alive、超时与重试配置，连接在各媒体类型之间复用；
+传输只负责单次发送，重试和按业务ID限流由接口基类在每次重新签名后执行
+"""
+
+import json
+import random
+import asyncio
+from typing import Dict, Any, Optional
+from urllib.parse import urlencode
+
+import urllib3
+
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
+
+from utils.rate_limiter import create_vendor_rate_limiter
+from utils.logger import get_logger
+
+
+FORM_HEADERS = {"Content-Type": "application/x-www-form-urlencoded"}
+
+# 连接异常和以下状态码视为可重试，429为限流
+RETRY_STATUS = (429, 500, 502, 503, 504)
+THROTTLE_STATUS = 429
+
+
+class TransportError(Exception):
+    """单次请求失败，retryable表示可重试，throttled表示被厂商限流，
+    connect_failed表示连接未建立、请求未发出（读超时等情况下厂商可能已受理）"""
+
+    def __init__(self, message: str, status: Optional[int] = None, retryable: bool = False,
+                 connect_failed: bool = False):
+        super().__init__(message)
+        self.status = status
+        self.retryable = retryable
+        self.throttled = status == THROTTLE_STATUS
+        self.connect_failed = connect_failed
+
+
+class NeteaseTransport:
+    """易盾接口共享传输：连接池、keep-alive、分类超时与指数退避重试"""
+
+    def __init__(
+        self,
+        pool_size: int = 100,
+        pool_size_per_host: int = 0,
+        keepalive_timeout: float = 30.0,
+        connect_timeout: float = 1.0,
+        submit_timeout: float = 3.0,
+        query_timeout: float = 10.0,
+        max_retries: int = 2,
+        retry_backoff: float = 0.2,
+        retry_max_backoff: float = 2.0,
+        rate_limiter=None
+    ):
+        self.pool_size = pool_size
+        self.pool_size_per_host = pool_size_per_host
+        self.keepalive_timeout = keepalive_timeout
+        self.connect_timeout = connect_timeout
+        self.timeouts = {"submit": submit_timeout, "query": query_timeout}
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+        self.retry_max_backoff = retry_max_backoff
+        self.rate_limiter = rate_limiter
+        self.logger = get_logger("wangyiyun.transport")
+
+        self._session = None
+        self._session_loop = None
+        self._pool = urllib3.PoolManager(
+            num_pools=10,
+            maxsize=pool_size_per_host or pool_size,
+            block=False,
+            retries=False
+        )
+        self.requests = 0
+        self.retries = 0
+        self.failures = 0
+
+    def _read_timeout(self, kind: str, timeout: Optional[float]) -> float:
+        return timeout or self.timeouts.get(kind, self.timeouts["query"])
+
+    def backoff(self, attempt: int) -> float:
+        """第attempt次重试前的等待：指数退避加随机抖动，避免重试同时到达"""
+        delay = min(self.retry_backoff * (2 ** attempt), self.retry_max_backoff)
+        return delay * (0.5 + random.random() / 2)
+
+    async def _get_session(self):
+        """获取当前事件循环的共享会话，事件循环变化时重建"""
+        if aiohttp is None:
+            raise TransportError("aiohttp未安装，无法使用异步传输")
+        loop = asyncio.get_running_loop()
+        if self._session is None or self._session.closed or self._session_loop is not loop:
+            connector = aiohttp.TCPConnector(
+                limit=self.pool_size,
+                limit_per_host=self.pool_size_per_host,
+                keepalive_timeout=self.keepalive_timeout
+            )
+            self._session = aiohttp.ClientSession(connector=connector, headers=FORM_HEADERS)
+            self._session_loop = loop
+        return self._session
+
+    async def apost(self, url: str, params: Dict[str, Any], kind: str = "query",
+                    timeout: Optional[float] = None) -> Dict[str, Any]:
+        """异步POST表单并解析JSON，失败时抛出TransportError"""
+        body = urlencode(params).encode("utf8")
+        session = await self._get_session()
+        client_timeout = aiohttp.ClientTimeout(
+            sock_connect=self.connect_timeout, sock_read=self._read_timeout(kind, timeout)
+        )
+        self.requests += 1
+        try:
+            async with session.post(url, data=body, timeout=client_timeout) as response:
+                self._check_status(url, response.status)
+                return json.loads(await response.read())
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            self.failures += 1
+            connect_failed = isinstance(e, (aiohttp.ClientConnectorError,
+                                            getattr(aiohttp, "ConnectionTimeoutError", ())))
+            raise TransportError(f"请求{url}失败: {e!r}", retryable=True, connect_failed=connect_failed)
+        except ValueError as e:
+            self.failures += 1
+            raise TransportError(f"{url}返回内容无法解析: {e}")
+
+    def post(self, url: str, params: Dict[str, Any], kind: str = "query",
+             timeout: Optional[float] = None) -> Dict[str, Any]:
+        """同步POST表单并解析JSON，失败时抛出TransportError"""
+        body = urlencode(params).encode("utf8")
+        urllib3_timeout = urllib3.Timeout(connect=self.connect_timeout, read=self._read_timeout(kind, timeout))
+        self.requests += 1
+        try:
+            response = self._pool.request("POST", url, body=body, headers=FORM_HEADERS, timeout=urllib3_timeout)
+            self._check_status(url, response.status)
+            return json.loads(response.data)
+        except urllib3.exceptions.HTTPError as e:
+            self.failures += 1
+            # NewConnectionError 继承自 ConnectTimeoutError
+            connect_failed = isinstance(e, urllib3.exceptions.ConnectTimeoutError)
+            raise TransportError(f"请求{url}失败: {e!r}", retryable=True, connect_failed=connect_failed)
+        except ValueError as e:
+            self.failures += 1
+            raise TransportError(f"{url}返回内容无法解析: {e}")
+
+    def _check_status(self, url: str, status: int):
+        if status in RETRY_STATUS:
+            self.failures += 1
+            raise TransportError(f"请求{url}返回HTTP {status}", status=status, retryable=True)
+
+    async def aclose(self):
+        """关闭连接池"""
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+        self._pool.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取请求、重试与失败次数"""
+        return {
+            "requests": self.requests,
+            "retries": self.retries,
+            "failures": self.failures,
+            "pool_size": self.pool_size,
+            "rate_limits": self.rate_limiter.get_stats() if self.rate_limiter else {"enabled": False}
+        }
+
+
+def create_transport(config: Optional[Dict[str, Any]] = None, rate_limiter=None) -> NeteaseTransport:
+    """根据 platform.wangyiyun.transport 配置创建传输"""
+    config = config or {}
+    return NeteaseTransport(
+        pool_size=config.get("pool_size", 100),
+        pool_size_per_host=config.get("pool_size_per_host", 0),
+        keepalive_timeout=config.get("keepalive_timeout", 30.0),
+        connect_timeout=config.get("connect_timeout", 1.0),
+        submit_timeout=config.get("submit_timeout", 3.0),
+        query_timeout=config.get("query_timeout", 10.0),
+        max_retries=config.get("max_retries", 2),
+        retry_backoff=config.get("retry_backoff", 0.2),
+        retry_max_backoff=config.get("retry_max_backoff", 2.0),
+        rate_limiter=rate_limiter
+    )
+
+
+# 全局共享传输
+_transport = None
+
+
+def get_transport() -> NeteaseTransport:
+    """获取全局共享传输，首次调用时按配置创建"""
+    global _transport
+    if _transport is None:
+        try:
+            from config import settings
+        except ImportError:
+            settings = None
+        config = (settings.get_config("platform.wangyiyun.transport", {}) or {}) if settings else {}
+        rate_config = (settings.get_config("platform.wangyiyun.rate_limit", {}) or {}) if settings else {}
+        if rate_config:
+            # 配置按媒体类型给出QPS，限流器按业务ID分桶
+            qps = rate_config.get("qps") or {}
+            business_ids = {
+                "text": settings.TEXT_BUSINESS_ID,
+                "image": settings.IMAGE_BUSINESS_ID,
+                "audio": settings.AUDIO_BUSINESS_ID,
+                "video": settings.VIDEO_BUSINESS_ID
+            }
+            rate_config = {**rate_config, "qps": {
+                business_ids[media]: value for media, value in qps.items() if business_ids.get(media)
+            }}
+        _transport = create_transport(config, create_vendor_rate_limiter(rate_config))
+    return _transport
@@ -0,0 +1,204 @@
+"""
+阿里云内容安全本地模拟服务
+实现共享客户端调用的文本/图片同步检测、音频/视频异步检测与结果查询接口（/green/*），
+接口延迟、出结论时间、错误率、按AccessKey限流（返回Throttling.User）和违规标签比例均可配置
+
+运行:
+    $ python -m simulator.aliyun --port 8901 --submit-latency lognormal:0.08,0.5 --labels porn:0.02
+    $ export ALIYUN_ACCESS_KEY_ID=test ALIYUN_ACCESS_KEY_SECRET=test
+    $ export ALIYUN_GREEN_ENDPOINT=127.0.0.1:8901 ALIYUN_GREEN_PROTOCOL=http
+"""
+
+import json
+import time
+import uuid
+import random
+import argparse
+from dataclasses import dataclass, field
+from typing import Dict, Any, List, Optional
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+from utils.logger import get_logger
+from simulator.common import SimulatorBehavior, Throttle, add_behavior_arguments, behavior_from_args, describe
+
+
+@dataclass
+class AliyunSimulatorConfig:
+    """模拟服务配置"""
+    behavior: SimulatorBehavior = field(default_factory=SimulatorBehavior)
+
+
+# 各场景可能给出的违规标签，命中拒绝关键词时按porn处理
+SCENE_LABELS = {
+    "porn": ("porn", "sexy"),
+    "terrorism": ("bloody", "explosion", "terrorism", "politics"),
+    "antispam": ("spam", "ad", "politics", "terrorism", "abuse", "porn", "flood", "contraband"),
+    "ad": ("ad", "npx", "qrcode")
+}
+DEFAULT_LABEL_RATES: Dict[str, float] = {}
+KEYWORD_LABEL = "porn"
+
+# 异步检测结果查询返回码：280为检测中
+PROCESSING_CODE = 280
+
+
+def scene_results(scenes: List[str], label: Optional[str]) -> List[Dict[str, Any]]:
+    """违规标签落在第一个可能给出该标签的场景上，其余场景为pass"""
+    target = next((scene for scene in scenes if label in SCENE_LABELS.get(scene, ())), scenes[0] if scenes else None)
+    results = []
+    for scene in scenes:
+        if label is not None and scene == target:
+            suggestion = "review" if label == "sexy" else "block"
+            results.append({"scene": scene, "suggestion": suggestion, "label": label,
+                            "rate": round(random.uniform(80, 100), 2)})
+        else:
+            results.append({"scene": scene, "suggestion": "pass", "label": "normal", "rate": 99.9})
+    return results
+
+
+class AliyunSimulator:
+    """阿里云内容安全接口模拟：同步检测直接给出结论，异步检测在内存中保存任务，按延迟完成"""
+
+    def __init__(self, config: AliyunSimulatorConfig):
+        self.config = config
+        self.behavior = config.behavior
+        self.throttle = Throttle(self.behavior.throttle_qps)
+        self.logger = get_logger("simulator.aliyun")
+        self.tasks: Dict[str, Dict[str, Any]] = {}
+        self.requests = 0
+        self.errors = 0
+
+    def fault(self, access_key: str) -> Optional[JSONResponse]:
+        """按配置注入服务端错误和限流，错误体与阿里云网关一致"""
+        self.requests += 1
+        request_id = str(uuid.uuid4())
+        if self.behavior.should_fail():
+            self.errors += 1
+            return JSONResponse({"Code": "ServiceUnavailable", "Message": "simulated server error",
+                                 "RequestId": request_id}, status_code=503)
+        if not self.throttle.allow(access_key):
+            return JSONResponse({"Code": "Throttling.User", "Message": "Request was denied due to user flow control.",
+                                 "RequestId": request_id}, status_code=400)
+        return None
+
+    @staticmethod
+    def _response(data: List[Dict[str, Any]]) -> Dict[str, Any]:
+        return {"code": 200, "msg": "OK", "requestId": str(uuid.uuid4()), "data": data}
+
+    def scan(self, body: Dict[str, Any], key: str) -> Dict[str, Any]:
+        """同步检测：每个任务直接返回各场景结论"""
+        scenes = body.get("scenes") or []
+        data = []
+        for task in body.get("tasks") or []:
+            label = self.behavior.pick_label(task.get(key), KEYWORD_LABEL)
+            data.append({
+                "code": 200, "msg": "OK", "dataId": task.get("dataId"), "taskId": uuid.uuid4().hex,
+                key: task.get(key), "results": scene_results(scenes, label)
+            })
+        return self._response(data)
+
+    def async_scan(self, body: Dict[str, Any]) -> Dict[str, Any]:
+        """异步检测：登记任务，结论在配置的延迟后可查询"""
+        scenes = body.get("scenes") or []
+        now = time.monotonic()
+        data = []
+        for task in body.get("tasks") or []:
+            task_id = uuid.uuid4().hex
+            self.tasks[task_id] = {
+                "dataId": task.get("dataId"),
+                "url": task.get("url"),
+                "results": scene_results(scenes, self.behavior.pick_label(task.get("url"), KEYWORD_LABEL)),
+                "ready_at": now + self.behavior.result_delay.sample()
+            }
+            data.append({"code": 200, "msg": "OK", "dataId": task.get("dataId"), "taskId": task_id,
+                         "url": task.get("url")})
+        return self._response(data)
+
+    def results(self, task_ids: List[str]) -> Dict[str, Any]:
+        """按taskId返回结论，未到完成时间的任务code为280"""
+        now = time.monotonic()
+        data = []
+        for task_id in task_ids:
+            task = self.tasks.get(task_id)
+            if task is None:
+                data.append({"code": 404, "msg": "task not found", "taskId": task_id})
+            elif now < task["ready_at"]:
+                data.append({"code": PROCESSING_CODE, "msg": "PROCESSING", "taskId": task_id})
+            else:
+                data.append({"code": 200, "msg": "OK", "taskId": task_id, "dataId": task["dataId"],
+                             "url": task["url"], "results": task["results"]})
+        return self._response(data)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "tasks": len(self.tasks),
+            "requests": self.requests,
+            "errors": self.errors,
+            "throttled": self.throttle.throttled,
+            "behavior": describe(self.behavior)
+        }
+
+
+def _access_key(request: Request) -> str:
+    """从 Authorization: acs <AccessKeyId>:<签名> 中取AccessKeyId"""
+    authorization = request.headers.get("authorization", "")
+    return authorization.split(" ", 1)[-1].split(":", 1)[0]
+
+
+def create_app(config: Optional[AliyunSimulatorConfig] = None) -> FastAPI:
+    """创建模拟服务应用，路径与SDK各请求的uri_pattern一致"""
+    simulator = AliyunSimulator(config or AliyunSimulatorConfig())
+    app = FastAPI(title="Aliyun Green Simulator")
+    app.state.simulator = simulator
+
+    async def guarded(request: Request, latency):
+        body = json.loads(await request.body() or b"null")
+        await latency.sleep()
+        return body, simulator.fault(_access_key(request))
+
+    @app.post("/green/text/scan")
+    async def text_scan(request: Request):
+        body, fault = await guarded(request, simulator.behavior.submit_latency)
+        return fault or simulator.scan(body, "content")
+
+    @app.post("/green/image/scan")
+    async def image_scan(request: Request):
+        body, fault = await guarded(request, simulator.behavior.submit_latency)
+        return fault or simulator.scan(body, "url")
+
+    @app.post("/green/voice/asyncscan")
+    @app.post("/green/video/asyncscan")
+    async def async_scan(request: Request):
+        body, fault = await guarded(request, simulator.behavior.submit_latency)
+        return fault or simulator.async_scan(body)
+
+    @app.post("/green/voice/results")
+    @app.post("/green/video/results")
+    async def results(request: Request):
+        body, fault = await guarded(request, simulator.behavior.query_latency)
+        return fault or simulator.results(body or [])
+
+    @app.get("/stats")
+    async def stats():
+        return simulator.get_stats()
+
+    return app
+
+
+def main():
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="阿里云内容安全本地模拟服务")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8901)
+    add_behavior_arguments(parser)
+    args = parser.parse_args()
+
+    config = AliyunSimulatorConfig(behavior=behavior_from_args(args, DEFAULT_LABEL_RATES))
+    uvicorn.run(create_app(config), host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
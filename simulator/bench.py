@@ -0,0 +1,110 @@
+"""
+厂商审核离线压测
+生成合成内容（文本 + 若干图片/音频/视频URL），经多模态审核服务并发提交到模拟服务，
+统计每分钟审核条目数、单条内容耗时分位数和各维度结果分布；
+任务、媒体结论和图片指纹写入独立的压测库（默认项目根目录下 bench.db），不污染 security_check.db
+
+运行:
+    $ python -m simulator.netease --port 8900 --submit-latency lognormal:0.05,0.6 --result-delay uniform:0.5,2 &
+    $ export WANGYIYUN_SECRET_ID=test WANGYIYUN_SECRET_KEY=test TEXT_BUSINESS_ID=t IMAGE_BUSINESS_ID=i \\
+             AUDIO_BUSINESS_ID=a VIDEO_BUSINESS_ID=v WANGYIYUN_API_BASE=http://127.0.0.1:8900
+    $ python -m simulator.bench --contents 500 --images 4 --concurrency 100
+"""
+
+import os
+import time
+import random
+import asyncio
+import argparse
+from typing import Dict, Any, List
+
+from utils.config import load_config
+from utils.deadline import Deadline
+from models.database import project_root, use_database
+from services.media_moderation_service import get_media_moderation_service
+
+
+def synthetic_content(index: int, args: argparse.Namespace) -> Dict[str, Any]:
+    """生成一条合成内容，repeat比例的媒体URL从固定小集合中抽取以模拟重复媒体"""
+    def url(modality: str, n: int) -> str:
+        if random.random() < args.repeat:
+            return f"http://bench.local/{modality}/shared-{random.randint(0, 19)}"
+        return f"http://bench.local/{modality}/{args.run_id}-{index}-{n}"
+
+    return {
+        "text": f"压测内容 {args.run_id}-{index}" if args.text else None,
+        "media": {
+            "images": [url("images", n) for n in range(args.images)],
+            "audios": [url("audios", n) for n in range(args.audios)],
+            "videos": [url("videos", n) for n in range(args.videos)]
+        }
+    }
+
+
+def percentile(values: List[float], q: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(int(q * len(ordered)), len(ordered) - 1)]
+
+
+async def run(args: argparse.Namespace) -> Dict[str, Any]:
+    service = get_media_moderation_service(load_config())
+    slots = asyncio.Semaphore(args.concurrency)
+    latencies: List[float] = []
+    statuses: Dict[str, int] = {}
+    dimensions = 0
+
+    async def one(index: int):
+        nonlocal dimensions
+        content = synthetic_content(index, args)
+        async with slots:
+            started = time.monotonic()
+            deadline = Deadline(args.timeout) if args.timeout else None
+            _, fanout = await service.moderate_with_vendor(content["text"], content["media"], deadline)
+            latencies.append(time.monotonic() - started)
+        for _, _, result in fanout.results:
+            status = result.get("status", "error")
+            statuses[status] = statuses.get(status, 0) + 1
+        statuses["cancelled"] = statuses.get("cancelled", 0) + len(fanout.cancelled)
+        dimensions += len(fanout.results) + len(fanout.cancelled)
+
+    started = time.monotonic()
+    await asyncio.gather(*[one(index) for index in range(args.contents)])
+    elapsed = time.monotonic() - started
+
+    return {
+        "contents": args.contents,
+        "dimensions": dimensions,
+        "elapsed": round(elapsed, 2),
+        "dimensions_per_minute": round(dimensions / elapsed * 60, 1) if elapsed > 0 else 0.0,
+        "latency": {q: round(percentile(latencies, value), 3)
+                    for q, value in (("p50", 0.5), ("p90", 0.9), ("p99", 0.99))},
+        "statuses": statuses,
+        "modalities": service.get_stats(),
+        "vendors": service.vendors.get_stats()
+    }
+
+
+def main():
+    import json
+
+    parser = argparse.ArgumentParser(description="厂商审核离线压测")
+    parser.add_argument("--contents", type=int, default=200, help="内容条数")
+    parser.add_argument("--images", type=int, default=4, help="每条内容的图片数")
+    parser.add_argument("--audios", type=int, default=0)
+    parser.add_argument("--videos", type=int, default=0)
+    parser.add_argument("--no-text", dest="text", action="store_false", help="内容不带文本")
+    parser.add_argument("--concurrency", type=int, default=50, help="同时审核的内容数")
+    parser.add_argument("--repeat", type=float, default=0.0, help="媒体URL取自共享集合的比例，用于观察缓存命中")
+    parser.add_argument("--timeout", type=float, default=0.0, help="单条内容的超时预算（秒），0为不限")
+    parser.add_argument("--db", default=os.path.join(project_root, "bench.db"), help="压测使用的数据库文件")
+    args = parser.parse_args()
+    use_database(args.db)
+    args.run_id = f"{int(time.time())}"
+
+    print(json.dumps(asyncio.run(run(args)), ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,216 @@
+"""
+作业代理本地替身
+在内存中实现与 task.broker 相同的代理协议，租约、重试退避、可见性超时和心跳语义与SQLite队列一致，
+可注入接口延迟和错误，用于在不部署API服务的情况下验证broker后端的工作进程
+
+运行:
+    $ python -m simulator.broker --port 8902 --latency uniform:0.005,0.02
+    $ python -m task.worker --backend broker --broker-url http://127.0.0.1:8902
+"""
+
+import uuid
+import random
+import argparse
+import threading
+from datetime import datetime, timedelta
+from typing import Dict, Any, List, Optional
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+from models.enums import ProcessingStatus
+from simulator.common import LatencyModel
+from task.broker import create_broker_router
+from task.job_queue import JobQueue, ACTIVE_STATUSES
+from utils.exceptions import RateLimitError
+
+
+class MemoryJobQueue(JobQueue):
+    """内存作业队列，进程退出即丢失，仅用于测试和压测"""
+
+    def __init__(
+        self,
+        max_pending: int = 500,
+        lease_seconds: float = 120.0,
+        max_attempts: int = 3,
+        retry_base: float = 5.0,
+        retry_max: float = 300.0,
+        heartbeat_ttl: float = 45.0
+    ):
+        self.max_pending = max_pending
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.retry_base = retry_base
+        self.retry_max = retry_max
+        self.heartbeat_ttl = heartbeat_ttl
+        self._jobs: Dict[str, Dict[str, Any]] = {}
+        self._heartbeats: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _public(job: Dict[str, Any]) -> Dict[str, Any]:
+        return {key: value.isoformat() if isinstance(value, datetime) else value for key, value in job.items()}
+
+    def enqueue_many(self, jobs: List[Dict[str, Any]]) -> List[str]:
+        now = datetime.now()
+        with self._lock:
+            active = sum(1 for job in self._jobs.values() if job["status"] in ACTIVE_STATUSES)
+            if active + len(jobs) > self.max_pending:
+                raise RateLimitError(f"审核队列已满（{active}/{self.max_pending}），请稍后重试", retry_after=5)
+            ids = []
+            for job in jobs:
+                job_id = job.get("id") or str(uuid.uuid4())
+                self._jobs[job_id] = {
+                    "id": job_id, "kind": job["kind"], "content_id": job.get("content_id"),
+                    "payload": job.get("payload") or {}, "priority": job.get("priority", 0),
+                    "status": ProcessingStatus.PENDING.value, "attempts": 0,
+                    "max_attempts": job.get("max_attempts", self.max_attempts), "available_at": now,
+                    "lease_owner": None, "lease_expires_at": None, "result": None, "error": None,
+                    "created_at": now, "updated_at": now, "finished_at": None
+                }
+                ids.append(job_id)
+        return ids
+
+    def _visible(self, job: Dict[str, Any], now: datetime) -> bool:
+        if job["status"] == ProcessingStatus.PENDING.value:
+            return job["available_at"] <= now
+        return job["status"] == ProcessingStatus.PROCESSING.value and job["lease_expires_at"] <= now
+
+    def claim(self, worker_id: str, limit: int = 1) -> List[Dict[str, Any]]:
+        now = datetime.now()
+        claimed = []
+        with self._lock:
+            visible = sorted((job for job in self._jobs.values() if self._visible(job, now)),
+                             key=lambda job: (-job["priority"], job["available_at"]))
+            for job in visible:
+                if len(claimed) >= limit:
+                    break
+                if job["attempts"] >= job["max_attempts"]:
+                    job.update(status=ProcessingStatus.FAILED.value, error="租约过期且已达最大重试次数",
+                               lease_owner=None, lease_expires_at=None, finished_at=now, updated_at=now)
+                    continue
+                job.update(status=ProcessingStatus.PROCESSING.value, lease_owner=worker_id,
+                           lease_expires_at=now + timedelta(seconds=self.lease_seconds),
+                           attempts=job["attempts"] + 1, updated_at=now)
+                claimed.append(self._public(job))
+        return claimed
+
+    def _held(self, job_id: str, worker_id: str) -> Optional[Dict[str, Any]]:
+        job = self._jobs.get(job_id)
+        if job and job["lease_owner"] == worker_id and job["status"] == ProcessingStatus.PROCESSING.value:
+            return job
+        return None
+
+    def extend(self, job_ids: List[str], worker_id: str) -> int:
+        now = datetime.now()
+        with self._lock:
+            held = [job for job in (self._held(job_id, worker_id) for job_id in job_ids) if job]
+            for job in held:
+                job.update(lease_expires_at=now + timedelta(seconds=self.lease_seconds), updated_at=now)
+        return len(held)
+
+    def complete(self, job_id: str, worker_id: str, result: Any) -> bool:
+        now = datetime.now()
+        with self._lock:
+            job = self._held(job_id, worker_id)
+            if job is None:
+                return False
+            job.update(status=ProcessingStatus.COMPLETED.value, result=result, error=None, lease_owner=None,
+                       lease_expires_at=None, finished_at=now, updated_at=now)
+        return True
+
+    def fail(self, job_id: str, worker_id: str, error: str, retry: bool = True) -> Optional[str]:
+        now = datetime.now()
+        with self._lock:
+            job = self._held(job_id, worker_id)
+            if job is None:
+                return None
+            if retry and job["attempts"] < job["max_attempts"]:
+                delay = min(self.retry_base * (2 ** max(job["attempts"] - 1, 0)), self.retry_max)
+                job.update(status=ProcessingStatus.PENDING.value, available_at=now + timedelta(seconds=delay))
+            else:
+                job.update(status=ProcessingStatus.FAILED.value, finished_at=now)
+            job.update(error=error, lease_owner=None, lease_expires_at=None, updated_at=now)
+            return job["status"]
+
+    def release(self, job_ids: List[str], worker_id: str) -> int:
+        now = datetime.now()
+        with self._lock:
+            held = [job for job in (self._held(job_id, worker_id) for job_id in job_ids) if job]
+            for job in held:
+                job.update(status=ProcessingStatus.PENDING.value, available_at=now, attempts=job["attempts"] - 1,
+                           lease_owner=None, lease_expires_at=None, updated_at=now)
+        return len(held)
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return self._public(job) if job else None
+
+    def cleanup(self) -> int:
+        return 0
+
+    def heartbeat(self, worker_id: str, info: Dict[str, Any]):
+        now = datetime.now()
+        with self._lock:
+            started_at = self._heartbeats.get(worker_id, {}).get("started_at", now)
+            self._heartbeats[worker_id] = {"info": info, "started_at": started_at, "last_seen": now}
+
+    def workers(self) -> List[Dict[str, Any]]:
+        stale = datetime.now() - timedelta(seconds=self.heartbeat_ttl)
+        with self._lock:
+            return [{
+                "worker_id": worker_id,
+                "alive": beat["last_seen"] >= stale,
+                "started_at": beat["started_at"].isoformat(),
+                "last_seen": beat["last_seen"].isoformat(),
+                **beat["info"]
+            } for worker_id, beat in sorted(self._heartbeats.items())]
+
+    def get_stats(self) -> Dict[str, Any]:
+        counts = {status.value: 0 for status in ProcessingStatus if status != ProcessingStatus.TIMEOUT}
+        with self._lock:
+            for job in self._jobs.values():
+                counts[job["status"]] = counts.get(job["status"], 0) + 1
+        return {"jobs": counts, "max_pending": self.max_pending, "lease_seconds": self.lease_seconds}
+
+
+def create_app(queue: Optional[MemoryJobQueue] = None, token: str = "", latency: Optional[LatencyModel] = None,
+               error_rate: float = 0.0) -> FastAPI:
+    """创建代理替身应用，可注入接口延迟和HTTP 503错误"""
+    queue = queue or MemoryJobQueue()
+    latency = latency or LatencyModel()
+    app = FastAPI(title="Job Broker Simulator")
+    app.state.queue = queue
+
+    @app.middleware("http")
+    async def inject_faults(request: Request, call_next):
+        await latency.sleep()
+        if error_rate > 0 and random.random() < error_rate:
+            return JSONResponse({"detail": "simulated broker error"}, status_code=503)
+        return await call_next(request)
+
+    app.include_router(create_broker_router(queue, token))
+    return app
+
+
+def main():
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="作业代理本地替身")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8902)
+    parser.add_argument("--token", default="", help="代理令牌，为空时不校验")
+    parser.add_argument("--latency", default="0", help="接口延迟分布，如 uniform:0.005,0.02")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="随机返回HTTP 503的比例")
+    parser.add_argument("--max-pending", type=int, default=500)
+    parser.add_argument("--lease-seconds", type=float, default=120.0)
+    args = parser.parse_args()
+
+    queue = MemoryJobQueue(max_pending=args.max_pending, lease_seconds=args.lease_seconds)
+    uvicorn.run(create_app(queue, args.token, LatencyModel.parse(args.latency), args.error_rate),
+                host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+"""
+模拟服务公共组件：延迟分布、错误与限流注入、标签输出
+延迟分布写作 "名称:参数"，如 fixed:0.05、uniform:0.01,0.2、exp:0.05（均值）、lognormal:0.05,0.6（中位数,sigma）
+"""
+
+import math
+import time
+import random
+import asyncio
+import argparse
+from dataclasses import dataclass, field
+from typing import Dict, Any, List, Optional, Tuple
+
+
+class LatencyModel:
+    """延迟分布，sample() 返回秒数"""
+
+    KINDS = ("fixed", "uniform", "exp", "lognormal")
+
+    def __init__(self, kind: str = "fixed", params: Tuple[float, ...] = (0.0,)):
+        if kind not in self.KINDS:
+            raise ValueError(f"不支持的延迟分布: {kind}")
+        self.kind = kind
+        self.params = params
+
+    @classmethod
+    def parse(cls, spec: str) -> "LatencyModel":
+        """解析 "名称:参数1,参数2"，只写数字时视为固定延迟"""
+        spec = (spec or "0").strip()
+        if ":" not in spec:
+            return cls("fixed", (float(spec),))
+        kind, _, args = spec.partition(":")
+        return cls(kind.strip(), tuple(float(arg) for arg in args.split(",") if arg.strip()))
+
+    def sample(self) -> float:
+        if self.kind == "fixed":
+            return self.params[0]
+        if self.kind == "uniform":
+            return random.uniform(self.params[0], self.params[1])
+        if self.kind == "exp":
+            return random.expovariate(1.0 / self.params[0]) if self.params[0] > 0 else 0.0
+        median, sigma = self.params[0], (self.params[1] if len(self.params) > 1 else 0.5)
+        return random.lognormvariate(math.log(median), sigma) if median > 0 else 0.0
+
+    async def sleep(self):
+        delay = self.sample()
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    def __repr__(self) -> str:
+        return f"{self.kind}:{','.join(str(p) for p in self.params)}"
+
+
+class Throttle:
+    """按键（业务ID/AccessKey）的令牌桶，超出QPS的请求被判定为限流，qps为0时不限流"""
+
+    def __init__(self, qps: float = 0.0, burst: Optional[float] = None):
+        self.qps = qps
+        self.burst = burst or qps
+        self._buckets: Dict[str, Tuple[float, float]] = {}
+        self.throttled = 0
+
+    def allow(self, key: str) -> bool:
+        if self.qps <= 0:
+            return True
+        now = time.monotonic()
+        tokens, updated = self._buckets.get(key, (self.burst, now))
+        tokens = min(self.burst, tokens + (now - updated) * self.qps)
+        if tokens < 1:
+            self._buckets[key] = (tokens, now)
+            self.throttled += 1
+            return False
+        self._buckets[key] = (tokens - 1, now)
+        return True
+
+
+def parse_rates(spec: str) -> Dict[str, float]:
+    """解析 "标签:比例,标签:比例"，如 100:0.02,200:0.01"""
+    rates = {}
+    for part in (spec or "").split(","):
+        if ":" in part:
+            label, _, rate = part.partition(":")
+            rates[label.strip()] = float(rate)
+    return rates
+
+
+@dataclass
+class SimulatorBehavior:
+    """两个模拟服务共用的行为配置"""
+    submit_latency: LatencyModel = field(default_factory=LatencyModel)   # 提交接口响应延迟
+    query_latency: LatencyModel = field(default_factory=LatencyModel)    # 查询接口响应延迟
+    result_delay: LatencyModel = field(default_factory=lambda: LatencyModel("fixed", (1.0,)))  # 提交后多久出结论
+    error_rate: float = 0.0          # 随机返回HTTP 503的比例
+    throttle_qps: float = 0.0        # 每个业务ID/AccessKey的QPS上限，超出返回限流
+    label_rates: Dict[str, float] = field(default_factory=dict)   # 各违规标签被随机命中的比例
+    reject_keywords: List[str] = field(default_factory=lambda: ["porn", "reject", "违规"])
+
+    def pick_label(self, data: Optional[str], keyword_label: str) -> Optional[str]:
+        """按关键词和标签比例决定条目的违规标签，合规返回None；命中关键词时返回keyword_label"""
+        if any(keyword in (data or "") for keyword in self.reject_keywords):
+            return keyword_label
+        roll = random.random()
+        for label, rate in self.label_rates.items():
+            if roll < rate:
+                return label
+            roll -= rate
+        return None
+
+    def should_fail(self) -> bool:
+        return self.error_rate > 0 and random.random() < self.error_rate
+
+
+def add_behavior_arguments(parser: argparse.ArgumentParser):
+    """命令行参数：延迟分布、错误率、限流与标签比例"""
+    parser.add_argument("--submit-latency", default="0", help="提交接口延迟分布，如 lognormal:0.05,0.6")
+    parser.add_argument("--query-latency", default="0", help="查询接口延迟分布")
+    parser.add_argument("--result-delay", default="1.0", help="提交后出结论的延迟分布")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="随机返回HTTP 503的比例")
+    parser.add_argument("--throttle-qps", type=float, default=0.0, help="每个业务ID的QPS上限，0为不限流")
+    parser.add_argument("--labels", default="", help="违规标签比例，如 100:0.02,200:0.01")
+
+
+def behavior_from_args(args: argparse.Namespace, default_labels: Dict[str, float]) -> SimulatorBehavior:
+    return SimulatorBehavior(
+        submit_latency=LatencyModel.parse(args.submit_latency),
+        query_latency=LatencyModel.parse(args.query_latency),
+        result_delay=LatencyModel.parse(args.result_delay),
+        error_rate=args.error_rate,
+        throttle_qps=args.throttle_qps,
+        label_rates=parse_rates(args.labels) or default_labels
+    )
+
+
+def describe(behavior: SimulatorBehavior) -> Dict[str, Any]:
+    return {
+        "submit_latency": repr(behavior.submit_latency),
+        "query_latency": repr(behavior.query_latency),
+        "result_delay": repr(behavior.result_delay),
+        "error_rate": behavior.error_rate,
+        "throttle_qps": behavior.throttle_qps,
+        "label_rates": behavior.label_rates
+    }
@@ -0,0 +1,275 @@
+"""
+网易易盾本地模拟服务
+实现SDK调用的文本/图片/音频/视频提交与结果查询接口，提交时携带callbackUrl的任务在配置的延迟后
+按易盾签名规则主动回调，用于在没有真实密钥的环境下联调回调与轮询链路；
+接口延迟、出结论时间、错误率、按业务ID限流（返回411）和违规标签比例均可配置，用于离线压测
+
+运行:
+    $ python -m simulator.netease --port 8900 --callback-delay 2 \
+          --submit-latency lognormal:0.05,0.6 --result-delay uniform:0.5,3 --throttle-qps 50 --labels 100:0.02
+    $ export WANGYIYUN_API_BASE=http://127.0.0.1:8900
+    $ export WANGYIYUN_CALLBACK_URL=http://127.0.0.1:8000/api/v1/check/callback/wangyiyun
+"""
+
+import json
+import time
+import uuid
+import random
+import asyncio
+import hashlib
+import argparse
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from typing import Dict, Any, List, Optional
+from urllib.parse import parse_qsl
+
+import aiohttp
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+from utils.logger import get_logger
+from simulator.common import SimulatorBehavior, Throttle, add_behavior_arguments, behavior_from_args, describe
+
+
+@dataclass
+class NeteaseSimulatorConfig:
+    """模拟服务配置"""
+    secret_id: str = ""
+    secret_key: str = ""
+    callback_delay: float = 2.0      # 提交后多久发起回调
+    verify_signature: bool = True
+    behavior: SimulatorBehavior = field(default_factory=SimulatorBehavior)
+
+
+# 违规标签：100色情 110性感低俗 200广告 300暴恐 400违禁 800恶心，命中拒绝关键词时按色情处理
+DEFAULT_LABEL_RATES: Dict[str, float] = {}
+KEYWORD_LABEL = "100"
+
+# 易盾业务返回码：411为请求频率超限
+THROTTLE_CODE = 411
+
+
+def sign(params: Dict[str, Any], secret_key: str) -> str:
+    """与SDK gen_signature 相同的MD5签名"""
+    buff = "".join(str(k) + str(params[k]) for k in sorted(params.keys()))
+    return hashlib.md5((buff + secret_key).encode("utf8")).hexdigest()
+
+
+def _parse_task_ids(value: str) -> List[str]:
+    try:
+        return list(json.loads(value))
+    except ValueError:
+        # SDK单任务查询直接传list，被urlencode为Python列表字面量
+        return [item.strip(" '\"") for item in value.strip("[]").split(",") if item.strip(" '\"")]
+
+
+class NeteaseSimulator:
+    """易盾接口模拟：内存中保存任务，按延迟完成并回调"""
+
+    def __init__(self, config: NeteaseSimulatorConfig):
+        self.config = config
+        self.logger = get_logger("simulator.netease")
+        self.behavior = config.behavior
+        self.throttle = Throttle(self.behavior.throttle_qps)
+        self.tasks: Dict[str, Dict[str, Any]] = {}
+        self.callbacks_sent = 0
+        self.requests = 0
+        self.errors = 0
+        self._session: Optional[aiohttp.ClientSession] = None
+
+    def _labels(self, data: str) -> List[Dict[str, Any]]:
+        label = self.behavior.pick_label(data, KEYWORD_LABEL)
+        if label is None:
+            return []
+        return [{"label": int(label), "rate": round(random.uniform(0.8, 1.0), 4), "level": 2}]
+
+    def fault(self, params: Dict[str, str]) -> Optional[Any]:
+        """按配置注入服务端错误和限流，返回应直接响应的内容"""
+        self.requests += 1
+        if self.behavior.should_fail():
+            self.errors += 1
+            return JSONResponse({"code": 503, "msg": "simulated server error"}, status_code=503)
+        if not self.throttle.allow(params.get("businessId", "")):
+            return {"code": THROTTLE_CODE, "msg": "freq limit"}
+        return None
+
+    def _check_signature(self, params: Dict[str, str]) -> bool:
+        if not self.config.verify_signature or not self.config.secret_key:
+            return True
+        expected = sign({k: v for k, v in params.items() if k != "signature"}, self.config.secret_key)
+        return params.get("signature") == expected
+
+    def submit(self, params: Dict[str, str], items: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """登记提交的条目，items为 {dataId, data, callbackUrl}"""
+        if not self._check_signature(params):
+            return {"code": 401, "msg": "signature error"}
+        now = time.monotonic()
+        result = []
+        for item in items:
+            task_id = uuid.uuid4().hex
+            self.tasks[task_id] = {
+                "taskId": task_id,
+                "dataId": item.get("dataId"),
+                "labels": self._labels(item.get("data")),
+                "ready_at": now + self.behavior.result_delay.sample()
+            }
+            result.append({"taskId": task_id, "dataId": item.get("dataId"), "name": item.get("dataId")})
+            if item.get("callbackUrl"):
+                asyncio.get_running_loop().create_task(
+                    self._callback(item["callbackUrl"], params.get("businessId", ""), task_id)
+                )
+        return {"code": 200, "msg": "ok", "result": result}
+
+    def query(self, params: Dict[str, str]) -> Dict[str, Any]:
+        """按taskIds返回结果，未到完成时间的任务status为1"""
+        if not self._check_signature(params):
+            return {"code": 401, "msg": "signature error"}
+        now = time.monotonic()
+        result = []
+        for task_id in _parse_task_ids(params.get("taskIds", "[]")):
+            task = self.tasks.get(task_id)
+            if task is None:
+                continue
+            finished = now >= task["ready_at"]
+            result.append({
+                "taskId": task_id,
+                "dataId": task["dataId"],
+                "status": 0 if finished else 1,
+                "labels": task["labels"] if finished else []
+            })
+        return {"code": 200, "msg": "ok", "result": result}
+
+    async def _callback(self, url: str, business_id: str, task_id: str):
+        await asyncio.sleep(self.config.callback_delay)
+        task = self.tasks[task_id]
+        params = {
+            "secretId": self.config.secret_id,
+            "businessId": business_id,
+            "callbackData": json.dumps([{"antispam": {
+                "taskId": task_id, "dataId": task["dataId"], "labels": task["labels"]
+            }}]),
+            "timestamp": int(time.time() * 1000),
+            "nonce": random.randint(0, 100000000)
+        }
+        params["signature"] = sign(params, self.config.secret_key)
+        try:
+            if self._session is None or self._session.closed:
+                self._session = aiohttp.ClientSession()
+            async with self._session.post(url, data=params) as response:
+                self.callbacks_sent += 1
+                if response.status != 200:
+                    self.logger.warning(f"回调返回{response.status}: {task_id}")
+        except Exception as e:
+            self.logger.error(f"回调失败 {url}: {e}")
+
+    async def aclose(self):
+        if self._session is not None:
+            await self._session.close()
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "tasks": len(self.tasks),
+            "requests": self.requests,
+            "errors": self.errors,
+            "throttled": self.throttle.throttled,
+            "callbacks_sent": self.callbacks_sent,
+            "behavior": describe(self.behavior)
+        }
+
+
+def create_app(config: Optional[NeteaseSimulatorConfig] = None) -> FastAPI:
+    """创建模拟服务应用，路径与SDK各接口一致"""
+    simulator = NeteaseSimulator(config or NeteaseSimulatorConfig())
+
+    @asynccontextmanager
+    async def lifespan(app: FastAPI):
+        yield
+        await simulator.aclose()
+
+    app = FastAPI(title="NetEase Dun Simulator", lifespan=lifespan)
+    app.state.simulator = simulator
+
+    async def form(request: Request) -> Dict[str, str]:
+        return dict(parse_qsl((await request.body()).decode("utf-8"), keep_blank_values=True))
+
+    async def guarded(request: Request, latency):
+        """模拟接口延迟，并在需要时返回注入的错误或限流响应"""
+        params = await form(request)
+        await latency.sleep()
+        return params, simulator.fault(params)
+
+    @app.post("/v5/text/submit")
+    async def text_submit(request: Request):
+        params, fault = await guarded(request, simulator.behavior.submit_latency)
+        if fault is not None:
+            return fault
+        texts = json.loads(params.get("texts", "[]"))
+        return simulator.submit(params, [
+            {"dataId": t.get("dataId"), "data": t.get("content"), "callbackUrl": t.get("callbackUrl")} for t in texts
+        ])
+
+    @app.post("/v5/image/submit")
+    async def image_submit(request: Request):
+        params, fault = await guarded(request, simulator.behavior.submit_latency)
+        if fault is not None:
+            return fault
+        images = json.loads(params.get("images", "[]"))
+        return simulator.submit(params, [
+            {"dataId": i.get("name"), "data": i.get("data"), "callbackUrl": i.get("callbackUrl")} for i in images
+        ])
+
+    @app.post("/v4/audio/submit")
+    @app.post("/v4/video/submit")
+    async def media_submit(request: Request):
+        params, fault = await guarded(request, simulator.behavior.submit_latency)
+        if fault is not None:
+            return fault
+        return simulator.submit(params, [
+            {"dataId": params.get("dataId"), "data": params.get("url"), "callbackUrl": params.get("callbackUrl")}
+        ])
+
+    @app.post("/v1/text/query/task")
+    @app.post("/v1/image/query/task")
+    @app.post("/v1/audio/query/task")
+    @app.post("/v4/video/query/task")
+    async def query(request: Request):
+        params, fault = await guarded(request, simulator.behavior.query_latency)
+        if fault is not None:
+            return fault
+        return simulator.query(params)
+
+    @app.get("/stats")
+    async def stats():
+        return simulator.get_stats()
+
+    return app
+
+
+def main():
+    import uvicorn
+
+    try:
+        from config import settings
+    except ImportError:
+        settings = None
+
+    parser = argparse.ArgumentParser(description="网易易盾本地模拟服务")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8900)
+    parser.add_argument("--callback-delay", type=float, default=2.0)
+    parser.add_argument("--reject-rate", type=float, default=0.0, help="随机判定为色情的比例，等同 --labels 100:比例")
+    add_behavior_arguments(parser)
+    args = parser.parse_args()
+
+    default_labels = {KEYWORD_LABEL: args.reject_rate} if args.reject_rate else DEFAULT_LABEL_RATES
+    config = NeteaseSimulatorConfig(
+        secret_id=(settings.WANGYIYUN_SECRET_ID or "") if settings else "",
+        secret_key=(settings.WANGYIYUN_SECRET_KEY or "") if settings else "",
+        callback_delay=args.callback_delay,
+        behavior=behavior_from_args(args, default_labels)
+    )
+    uvicorn.run(create_app(config), host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
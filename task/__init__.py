@@ -1,18 +1,14 @@
 import asyncio
-from services.wangyiyunsdk import query_task
-from models.database import Task
-import asyncio
+from task.poller import start_task_pollers, stop_task_pollers
+
 
-async def check_tasks():
-    while True:
-        tasks = Task.select().where(Task.status == 0)  # 查询所有状态为 CREATED 的任务
-        for task in tasks:
-            try:
-                await asyncio.sleep(1)  # 模拟异步操作
-                task = query_task(task.task_id, task.type)
-            except Exception as e:
-                print(f"Error checking task {task.id}: {e}")
-        await asyncio.sleep(60)  # 每分钟检查一次
+async def check_tasks(config=None):
+    """持续消化Task表中未完成的任务，由各任务类型的集中轮询器批量查询"""
+    start_task_pollers(config)
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await stop_task_pollers()
 
-def start_task_loop():
-    asyncio.run(check_tasks())
\ No newline at end of file
+def start_task_loop(config=None):
+    asyncio.run(check_tasks(config))
@@ -0,0 +1,211 @@
+"""
+作业队列网络代理
+跨主机部署的工作进程无法共享SQLite文件，经HTTP代理协议访问队列：BrokerJobQueue为客户端，
+create_broker_router 把任意 JobQueue 暴露为同一协议（API服务挂载在 /api/v1/jobs，
+本地替身见 simulator.broker）；配置了令牌时请求需携带 Authorization: Bearer <令牌>。
+跨主机的工作进程不访问API的数据库：作业携带待审核内容的快照，审核结论放在结果的content_update中，
+由代理端的on_result写回Contents表，不保存在队列中；作业经 /fail 判定最终失败时由被代理队列的on_failed钩子恢复内容状态
+"""
+
+import hmac
+import json
+from typing import Dict, Any, List, Optional, Callable
+
+import urllib3
+from fastapi import APIRouter, Body, Depends, HTTPException, Request
+
+from task.job_queue import JobQueue
+from utils.exceptions import RateLimitError
+from utils.logger import get_logger
+
+
+class BrokerError(Exception):
+    """代理请求失败"""
+
+    def __init__(self, message: str, status: Optional[int] = None):
+        super().__init__(message)
+        self.status = status
+
+
+class BrokerJobQueue(JobQueue):
+    """经HTTP代理访问远端作业队列，请求使用urllib3连接池，连接错误按配置重试"""
+
+    def __init__(
+        self,
+        base_url: str,
+        token: str = "",
+        timeout: float = 10.0,
+        pool_size: int = 4,
+        retries: int = 2,
+        lease_seconds: float = 120.0
+    ):
+        self.base_url = base_url.rstrip("/")
+        self.token = token
+        self.lease_seconds = lease_seconds
+        self.logger = get_logger("job_broker")
+        self._http = urllib3.PoolManager(
+            maxsize=pool_size,
+            timeout=urllib3.Timeout(total=timeout),
+            retries=urllib3.Retry(total=retries, connect=retries, read=0, status=0, backoff_factor=0.2)
+        )
+
+    def _request(self, method: str, path: str, body: Optional[Dict[str, Any]] = None) -> Optional[Dict[str, Any]]:
+        """发送一次请求，404返回None，429转换为RateLimitError"""
+        headers = {"Content-Type": "application/json"}
+        if self.token:
+            headers["Authorization"] = f"Bearer {self.token}"
+        try:
+            response = self._http.request(
+                method, f"{self.base_url}{path}", headers=headers,
+                body=json.dumps(body, ensure_ascii=False, default=str).encode("utf-8") if body is not None else None
+            )
+        except urllib3.exceptions.HTTPError as e:
+            raise BrokerError(f"作业代理请求失败: {e}")
+        data = json.loads(response.data or b"null")
+        if response.status == 404:
+            return None
+        if response.status == 429:
+            detail = (data or {}).get("detail") or {}
+            raise RateLimitError(detail.get("message", "审核队列已满"), retry_after=detail.get("retry_after"))
+        if response.status >= 400:
+            raise BrokerError(f"作业代理返回 {response.status}: {data}", status=response.status)
+        return data
+
+    def enqueue_many(self, jobs: List[Dict[str, Any]]) -> List[str]:
+        if not jobs:
+            return []
+        return self._request("POST", "/enqueue", {"jobs": jobs})["ids"]
+
+    def claim(self, worker_id: str, limit: int = 1) -> List[Dict[str, Any]]:
+        if limit <= 0:
+            return []
+        data = self._request("POST", "/claim", {"worker_id": worker_id, "limit": limit})
+        # 续约间隔以代理端的租约时长为准
+        self.lease_seconds = data.get("lease_seconds", self.lease_seconds)
+        return data["jobs"]
+
+    def extend(self, job_ids: List[str], worker_id: str) -> int:
+        if not job_ids:
+            return 0
+        return self._request("POST", "/extend", {"worker_id": worker_id, "job_ids": list(job_ids)})["count"]
+
+    def complete(self, job_id: str, worker_id: str, result: Any) -> bool:
+        return self._request("POST", "/complete", {"worker_id": worker_id, "job_id": job_id, "result": result})["ok"]
+
+    def fail(self, job_id: str, worker_id: str, error: str, retry: bool = True) -> Optional[str]:
+        return self._request("POST", "/fail", {
+            "worker_id": worker_id, "job_id": job_id, "error": error, "retry": retry
+        })["status"]
+
+    def release(self, job_ids: List[str], worker_id: str) -> int:
+        if not job_ids:
+            return 0
+        return self._request("POST", "/release", {"worker_id": worker_id, "job_ids": list(job_ids)})["count"]
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        return self._request("GET", f"/jobs/{job_id}")
+
+    def cleanup(self) -> int:
+        # 过期清理由代理端的工作循环负责
+        return 0
+
+    def heartbeat(self, worker_id: str, info: Dict[str, Any]):
+        self._request("POST", "/heartbeat", {"worker_id": worker_id, "info": info})
+
+    def workers(self) -> List[Dict[str, Any]]:
+        return self._request("GET", "/workers")["workers"]
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {**self._request("GET", "/stats"), "broker": self.base_url}
+
+
+def create_broker_job_queue(queue_config: Dict[str, Any]) -> BrokerJobQueue:
+    """根据 performance.job_queue.broker 配置创建代理客户端"""
+    broker_config = queue_config.get("broker", {}) or {}
+    if not broker_config.get("url"):
+        raise ValueError("作业队列后端为broker时需要配置 performance.job_queue.broker.url")
+    return BrokerJobQueue(
+        broker_config["url"],
+        token=broker_config.get("token") or "",
+        timeout=broker_config.get("timeout", 10.0),
+        pool_size=broker_config.get("pool_size", 4),
+        retries=broker_config.get("retries", 2),
+        lease_seconds=queue_config.get("lease_seconds", 120.0)
+    )
+
+
+ResultHandler = Callable[[Optional[Dict[str, Any]], Dict[str, Any]], None]
+
+
+def create_broker_router(queue: JobQueue, token: str = "", on_result: Optional[ResultHandler] = None) -> APIRouter:
+    """把作业队列暴露为代理协议，队列方法为同步调用，由FastAPI在线程池中执行；
+    on_result(作业, 结果) 在作业完成后调用；作业最终失败由队列的on_failed钩子处理，/fail 与本地工作循环走同一路径"""
+
+    def authorize(request: Request):
+        if token and not hmac.compare_digest(request.headers.get("authorization", ""), f"Bearer {token}"):
+            raise HTTPException(status_code=401, detail="作业代理令牌无效")
+
+    router = APIRouter(tags=["作业队列代理"], dependencies=[Depends(authorize)])
+    logger = get_logger("job_broker")
+
+    def report(job_id: str, result: Dict[str, Any]):
+        try:
+            on_result(queue.get(job_id), result)
+        except Exception as e:
+            logger.error(f"回写作业 {job_id} 的结果失败: {e}")
+
+    @router.post("/enqueue")
+    def enqueue(body: Dict[str, Any] = Body(...)):
+        try:
+            return {"ids": queue.enqueue_many(body.get("jobs") or [])}
+        except RateLimitError as e:
+            raise HTTPException(status_code=429, detail={"message": e.message, "retry_after": e.retry_after})
+
+    @router.post("/claim")
+    def claim(body: Dict[str, Any] = Body(...)):
+        return {"jobs": queue.claim(body["worker_id"], int(body.get("limit", 1))), "lease_seconds": queue.lease_seconds}
+
+    @router.post("/extend")
+    def extend(body: Dict[str, Any] = Body(...)):
+        return {"count": queue.extend(body.get("job_ids") or [], body["worker_id"])}
+
+    @router.post("/complete")
+    def complete(body: Dict[str, Any] = Body(...)):
+        result = body.get("result")
+        stored = {key: value for key, value in result.items() if key != "content_update"} \
+            if isinstance(result, dict) else result
+        ok = queue.complete(body["job_id"], body["worker_id"], stored)
+        if ok and on_result is not None and isinstance(result, dict):
+            report(body["job_id"], result)
+        return {"ok": ok}
+
+    @router.post("/fail")
+    def fail(body: Dict[str, Any] = Body(...)):
+        # 判定最终失败时 queue.fail 调用队列的on_failed钩子
+        return {"status": queue.fail(body["job_id"], body["worker_id"], body.get("error", ""), body.get("retry", True))}
+
+    @router.post("/release")
+    def release(body: Dict[str, Any] = Body(...)):
+        return {"count": queue.release(body.get("job_ids") or [], body["worker_id"])}
+
+    @router.get("/jobs/{job_id}")
+    def get_job(job_id: str):
+        job = queue.get(job_id)
+        if job is None:
+            raise HTTPException(status_code=404, detail="作业不存在")
+        return job
+
+    @router.post("/heartbeat")
+    def heartbeat(body: Dict[str, Any] = Body(...)):
+        queue.heartbeat(body["worker_id"], body.get("info") or {})
+        return {"ok": True}
+
+    @router.get("/workers")
+    def workers():
+        return {"workers": queue.workers()}
+
+    @router.get("/stats")
+    def stats():
+        return queue.get_stats()
+
+    return router
@@ -0,0 +1,363 @@
+"""
+持久化审核作业队列
+JobQueue定义工作循环使用的队列接口，默认后端SqliteJobQueue把作业保存在SQLite的AuditJob表中，
+任一API进程都能入队和查询状态，进程重启不丢作业；跨主机部署的工作进程经 task.broker 的网络代理访问队列。
+工作循环按租约领取作业，租约到期未续约的作业重新可见（可见性超时），失败后按指数退避重试，
+完成或最终失败的作业超过保留时长后清理；工作循环定期上报心跳和吞吐。
+作业最终失败（重试耗尽或租约过期时已用完重试次数）时调用队列的on_failed钩子，由业务层恢复内容状态
+"""
+
+import json
+import uuid
+from abc import ABC, abstractmethod
+from datetime import datetime, timedelta
+from typing import Dict, Any, List, Optional, Callable
+
+from peewee import fn
+
+from models.database import AuditJob, WorkerHeartbeat, db
+from models.enums import ProcessingStatus
+from utils.exceptions import RateLimitError
+from utils.rate_limiter import estimate_retry_after
+from utils.logger import get_logger
+
+
+ACTIVE_STATUSES = (ProcessingStatus.PENDING.value, ProcessingStatus.PROCESSING.value)
+FINISHED_STATUSES = (ProcessingStatus.COMPLETED.value, ProcessingStatus.FAILED.value)
+
+
+def _loads(value: Optional[str]) -> Any:
+    return json.loads(value) if value else None
+
+
+def job_to_dict(job: AuditJob) -> Dict[str, Any]:
+    """作业行转换为字典，payload和result解码为对象"""
+    def iso(value):
+        return value.isoformat() if isinstance(value, datetime) else value
+
+    return {
+        "id": job.id,
+        "kind": job.kind,
+        "content_id": job.content_id,
+        "payload": _loads(job.payload) or {},
+        "priority": job.priority,
+        "status": job.status,
+        "attempts": job.attempts,
+        "max_attempts": job.max_attempts,
+        "available_at": iso(job.available_at),
+        "lease_owner": job.lease_owner,
+        "lease_expires_at": iso(job.lease_expires_at),
+        "result": _loads(job.result),
+        "error": job.error,
+        "created_at": iso(job.created_at),
+        "updated_at": iso(job.updated_at),
+        "finished_at": iso(job.finished_at)
+    }
+
+
+FailedHandler = Callable[[List[Dict[str, Any]]], None]
+
+
+class JobQueue(ABC):
+    """作业队列接口，所有方法为同步调用，异步代码中经线程执行"""
+
+    lease_seconds: float = 120.0
+    on_failed: Optional[FailedHandler] = None  # 作业最终失败的钩子，参数为失败作业列表
+
+    def _report_failed(self, jobs: List[Dict[str, Any]]):
+        """在事务提交后调用作业最终失败的钩子，钩子出错不影响队列状态"""
+        if not jobs or self.on_failed is None:
+            return
+        try:
+            self.on_failed(jobs)
+        except Exception as e:
+            self.logger.error(f"处理最终失败的作业出错: {e}")
+
+    @abstractmethod
+    def enqueue_many(self, jobs: List[Dict[str, Any]]) -> List[str]:
+        """批量入队 [{kind, payload, content_id, priority}]，队列已满时抛出RateLimitError"""
+
+    def enqueue(self, kind: str, payload: Optional[Dict[str, Any]] = None, content_id: Optional[int] = None,
+                priority: int = 0) -> str:
+        """入队单个作业，返回作业ID"""
+        return self.enqueue_many([{"kind": kind, "payload": payload, "content_id": content_id, "priority": priority}])[0]
+
+    @abstractmethod
+    def claim(self, worker_id: str, limit: int = 1) -> List[Dict[str, Any]]:
+        """领取最多limit个可见作业"""
+
+    @abstractmethod
+    def extend(self, job_ids: List[str], worker_id: str) -> int:
+        """续约仍在处理的作业"""
+
+    @abstractmethod
+    def complete(self, job_id: str, worker_id: str, result: Any) -> bool:
+        """记录作业结果，租约已被接管时返回False"""
+
+    @abstractmethod
+    def fail(self, job_id: str, worker_id: str, error: str, retry: bool = True) -> Optional[str]:
+        """记录作业失败，返回作业的新状态"""
+
+    @abstractmethod
+    def release(self, job_ids: List[str], worker_id: str) -> int:
+        """归还未完成的作业"""
+
+    @abstractmethod
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """查询作业，不存在时返回None"""
+
+    @abstractmethod
+    def cleanup(self) -> int:
+        """删除过期作业和心跳"""
+
+    @abstractmethod
+    def heartbeat(self, worker_id: str, info: Dict[str, Any]):
+        """记录工作循环心跳及其统计"""
+
+    @abstractmethod
+    def workers(self) -> List[Dict[str, Any]]:
+        """各工作循环最近一次心跳"""
+
+    @abstractmethod
+    def get_stats(self) -> Dict[str, Any]:
+        """各状态的作业数"""
+
+
+class SqliteJobQueue(JobQueue):
+    """基于AuditJob表的作业队列"""
+
+    def __init__(
+        self,
+        max_pending: int = 500,
+        lease_seconds: float = 120.0,
+        max_attempts: int = 3,
+        retry_base: float = 5.0,
+        retry_max: float = 300.0,
+        ttl: float = 86400.0,
+        heartbeat_ttl: float = 60.0,
+        drain_window: float = 60.0
+    ):
+        self.max_pending = max_pending
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.retry_base = retry_base
+        self.retry_max = retry_max
+        self.ttl = ttl
+        self.heartbeat_ttl = heartbeat_ttl
+        self.drain_window = drain_window
+        self.logger = get_logger("job_queue")
+
+    def enqueue_many(self, jobs: List[Dict[str, Any]]) -> List[str]:
+        """批量入队 [{kind, payload, content_id, priority}]，在途作业超过容量时抛出RateLimitError"""
+        if not jobs:
+            return []
+        now = datetime.now()
+        rows = [{
+            "id": job.get("id") or str(uuid.uuid4()),
+            "kind": job["kind"],
+            "content_id": job.get("content_id"),
+            "payload": json.dumps(job.get("payload") or {}, ensure_ascii=False),
+            "priority": job.get("priority", 0),
+            "status": ProcessingStatus.PENDING.value,
+            "max_attempts": job.get("max_attempts", self.max_attempts),
+            "available_at": now,
+            "created_at": now,
+            "updated_at": now
+        } for job in jobs]
+        with db.atomic("IMMEDIATE"):
+            active = AuditJob.select().where(AuditJob.status.in_(ACTIVE_STATUSES)).count()
+            overflow = active + len(rows) - self.max_pending
+            if overflow > 0:
+                retry_after = estimate_retry_after(overflow, self.drain_rate())
+                self.logger.warning(f"审核作业队列已满: {active}/{self.max_pending}, 建议 {retry_after}s 后重试")
+                raise RateLimitError(f"审核队列已满（{active}/{self.max_pending}），请 {retry_after} 秒后重试",
+                                     retry_after=retry_after)
+            AuditJob.insert_many(rows).execute()
+        return [row["id"] for row in rows]
+
+    def drain_rate(self) -> float:
+        """所有工作循环最近drain_window内每秒完成（含最终失败）的作业数"""
+        since = datetime.now() - timedelta(seconds=self.drain_window)
+        finished = AuditJob.select().where(
+            AuditJob.status.in_(FINISHED_STATUSES) & (AuditJob.finished_at >= since)
+        ).count()
+        return finished / self.drain_window
+
+    def claim(self, worker_id: str, limit: int = 1) -> List[Dict[str, Any]]:
+        """领取最多limit个可见作业：待处理且已到可领取时间，或处理中但租约已过期；
+        租约过期时已用完重试次数的作业直接判定失败"""
+        if limit <= 0:
+            return []
+        now = datetime.now()
+        visible = (
+            ((AuditJob.status == ProcessingStatus.PENDING.value) & (AuditJob.available_at <= now))
+            | ((AuditJob.status == ProcessingStatus.PROCESSING.value) & (AuditJob.lease_expires_at <= now))
+        )
+        with db.atomic("IMMEDIATE"):
+            jobs = list(AuditJob.select().where(visible)
+                        .order_by(AuditJob.priority.desc(), AuditJob.available_at)
+                        .limit(limit))
+            expired = [job.id for job in jobs if job.attempts >= job.max_attempts]
+            failed = []
+            if expired:
+                AuditJob.update(
+                    status=ProcessingStatus.FAILED.value, error="租约过期且已达最大重试次数",
+                    lease_owner=None, lease_expires_at=None, finished_at=now, updated_at=now
+                ).where(AuditJob.id.in_(expired)).execute()
+                for job in jobs:
+                    if job.id in expired:
+                        job.status = ProcessingStatus.FAILED.value
+                        failed.append(job_to_dict(job))
+            claimed = [job for job in jobs if job.id not in expired]
+            if claimed:
+                AuditJob.update(
+                    status=ProcessingStatus.PROCESSING.value,
+                    lease_owner=worker_id,
+                    lease_expires_at=now + timedelta(seconds=self.lease_seconds),
+                    attempts=AuditJob.attempts + 1,
+                    updated_at=now
+                ).where(AuditJob.id.in_([job.id for job in claimed])).execute()
+        if expired:
+            self.logger.warning(f"{len(expired)}个作业租约过期且已达最大重试次数，判定失败")
+            self._report_failed(failed)
+        results = []
+        for job in claimed:
+            job.status = ProcessingStatus.PROCESSING.value
+            job.lease_owner = worker_id
+            job.attempts += 1
+            results.append(job_to_dict(job))
+        return results
+
+    def _held(self, job_ids: List[str], worker_id: str):
+        return (AuditJob.id.in_(list(job_ids))
+                & (AuditJob.lease_owner == worker_id)
+                & (AuditJob.status == ProcessingStatus.PROCESSING.value))
+
+    def extend(self, job_ids: List[str], worker_id: str) -> int:
+        """续约工作循环仍在处理的作业，返回续约成功数"""
+        if not job_ids:
+            return 0
+        now = datetime.now()
+        return AuditJob.update(
+            lease_expires_at=now + timedelta(seconds=self.lease_seconds), updated_at=now
+        ).where(self._held(job_ids, worker_id)).execute()
+
+    def complete(self, job_id: str, worker_id: str, result: Any) -> bool:
+        """记录作业结果，租约已被其他工作循环接管时返回False"""
+        now = datetime.now()
+        return AuditJob.update(
+            status=ProcessingStatus.COMPLETED.value,
+            result=json.dumps(result, ensure_ascii=False, default=str),
+            error=None, lease_owner=None, lease_expires_at=None, finished_at=now, updated_at=now
+        ).where(self._held([job_id], worker_id)).execute() > 0
+
+    def retry_delay(self, attempts: int) -> float:
+        """第attempts次失败后的退避时间"""
+        return min(self.retry_base * (2 ** max(attempts - 1, 0)), self.retry_max)
+
+    def fail(self, job_id: str, worker_id: str, error: str, retry: bool = True) -> Optional[str]:
+        """记录作业失败：未达最大次数时退避后重新入队，否则判定失败并调用on_failed；返回作业的新状态"""
+        now = datetime.now()
+        with db.atomic("IMMEDIATE"):
+            job = AuditJob.get_or_none(self._held([job_id], worker_id))
+            if job is None:
+                return None
+            if retry and job.attempts < job.max_attempts:
+                status = ProcessingStatus.PENDING.value
+                available_at, finished_at = now + timedelta(seconds=self.retry_delay(job.attempts)), None
+            else:
+                status = ProcessingStatus.FAILED.value
+                available_at, finished_at = job.available_at, now
+            AuditJob.update(
+                status=status, error=error, available_at=available_at, finished_at=finished_at,
+                lease_owner=None, lease_expires_at=None, updated_at=now
+            ).where(AuditJob.id == job_id).execute()
+        if status == ProcessingStatus.FAILED.value:
+            job.status, job.error = status, error
+            self._report_failed([job_to_dict(job)])
+        return status
+
+    def release(self, job_ids: List[str], worker_id: str) -> int:
+        """工作循环停止时归还未完成的作业，立即可被重新领取且不计入重试次数"""
+        if not job_ids:
+            return 0
+        now = datetime.now()
+        return AuditJob.update(
+            status=ProcessingStatus.PENDING.value, available_at=now, attempts=AuditJob.attempts - 1,
+            lease_owner=None, lease_expires_at=None, updated_at=now
+        ).where(self._held(job_ids, worker_id)).execute()
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """查询作业，不存在时返回None"""
+        job = AuditJob.get_or_none(AuditJob.id == job_id)
+        return job_to_dict(job) if job is not None else None
+
+    def cleanup(self) -> int:
+        """删除完成或最终失败超过保留时长的作业，以及超过保留时长未上报的心跳"""
+        now = datetime.now()
+        WorkerHeartbeat.delete().where(WorkerHeartbeat.last_seen < now - timedelta(seconds=self.ttl)).execute()
+        return AuditJob.delete().where(
+            AuditJob.status.in_(FINISHED_STATUSES) & (AuditJob.finished_at < now - timedelta(seconds=self.ttl))
+        ).execute()
+
+    def heartbeat(self, worker_id: str, info: Dict[str, Any]):
+        now = datetime.now()
+        info = json.dumps(info, ensure_ascii=False, default=str)
+        WorkerHeartbeat.insert(worker_id=worker_id, info=info, started_at=now, last_seen=now).on_conflict(
+            conflict_target=[WorkerHeartbeat.worker_id],
+            update={WorkerHeartbeat.info: info, WorkerHeartbeat.last_seen: now}
+        ).execute()
+
+    def workers(self) -> List[Dict[str, Any]]:
+        """各工作循环最近一次心跳，超过heartbeat_ttl未上报的标记为离线"""
+        stale = datetime.now() - timedelta(seconds=self.heartbeat_ttl)
+        return [{
+            "worker_id": row.worker_id,
+            "alive": row.last_seen >= stale,
+            "started_at": row.started_at.isoformat(),
+            "last_seen": row.last_seen.isoformat(),
+            **(_loads(row.info) or {})
+        } for row in WorkerHeartbeat.select().order_by(WorkerHeartbeat.worker_id)]
+
+    def get_stats(self) -> Dict[str, Any]:
+        """各状态的作业数"""
+        counts = {status.value: 0 for status in ProcessingStatus if status != ProcessingStatus.TIMEOUT}
+        query = AuditJob.select(AuditJob.status, fn.COUNT(AuditJob.id).alias("count")).group_by(AuditJob.status)
+        for row in query:
+            counts[row.status] = row.count
+        return {"jobs": counts, "max_pending": self.max_pending, "lease_seconds": self.lease_seconds,
+                "drain_rate_per_second": round(self.drain_rate(), 3)}
+
+
+def create_job_queue(config: Dict[str, Any]) -> JobQueue:
+    """根据 performance.job_queue 创建作业队列：backend为sqlite时使用本地数据库（容量沿用 performance.queue_size），
+    为broker时经网络代理访问远端队列"""
+    performance = config.get("performance", {})
+    queue_config = performance.get("job_queue", {}) or {}
+    if queue_config.get("backend", "sqlite") == "broker":
+        from task.broker import create_broker_job_queue
+
+        return create_broker_job_queue(queue_config)
+    return SqliteJobQueue(
+        max_pending=performance.get("queue_size", 500),
+        lease_seconds=queue_config.get("lease_seconds", 120.0),
+        max_attempts=queue_config.get("max_attempts", 3),
+        retry_base=queue_config.get("retry_base", 5.0),
+        retry_max=queue_config.get("retry_max", 300.0),
+        ttl=queue_config.get("ttl", 86400.0),
+        heartbeat_ttl=queue_config.get("heartbeat_interval", 15.0) * 3
+    )
+
+
+# 全局作业队列
+_job_queue = None
+
+
+def get_job_queue() -> JobQueue:
+    """获取全局作业队列"""
+    global _job_queue
+    if _job_queue is None:
+        from utils.config import load_config
+
+        _job_queue = create_job_queue(load_config())
+    return _job_queue
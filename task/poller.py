@@ -0,0 +1,329 @@
+"""
+厂商审核结果集中轮询器
+每个厂商的每种任务类型一个轮询器，汇总结果注册表中的等待任务和Task表中该厂商未完成的任务，
+按查询接口上限分批查询，间隔随结果到达情况自适应调整，批量回写Task表并通过注册表唤醒等待者。
+查询厂商前先按Task表唤醒已由回调或其他进程写入结论的等待者；配置了回调地址时，
+提交后callback_grace秒内的任务只等待回调，超过宽限期仍无结论才查询厂商。
+多进程部署时Task表积压只由持有租约的一个进程查询，其余进程只查询本进程注册表中等待的任务
+"""
+
+import os
+import uuid
+import time
+import socket
+import asyncio
+from datetime import datetime, timedelta
+from typing import Dict, Any, List, Optional, Tuple, Callable, Awaitable
+
+from models.database import Task, ServiceLease, db
+from models.enums import TaskType, TaskStatus
+from task.registry import TaskResultRegistry, get_task_result_registry
+from task.writer import get_task_result_writer
+from utils.metrics import get_metrics_collector
+from utils.logger import get_logger
+
+
+DEFAULT_VENDOR = "wangyiyun"
+
+# 本进程在租约表中的标识
+PROCESS_ID = f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:8]}"
+
+
+def acquire_lease(name: str, owner: str, lease_seconds: float) -> bool:
+    """获取或续约跨进程租约，租约由其他进程持有且未到期时返回False"""
+    now = datetime.now()
+    expires_at = now + timedelta(seconds=lease_seconds)
+    with db.atomic("IMMEDIATE"):
+        lease = ServiceLease.get_or_none(ServiceLease.name == name)
+        if lease is None:
+            ServiceLease.create(name=name, owner=owner, expires_at=expires_at)
+            return True
+        if lease.owner != owner and lease.expires_at > now:
+            return False
+        ServiceLease.update(owner=owner, expires_at=expires_at).where(ServiceLease.name == name).execute()
+        return True
+
+
+def release_lease(name: str, owner: str):
+    """释放本进程持有的租约，其他进程无需等待到期即可接管"""
+    ServiceLease.delete().where((ServiceLease.name == name) & (ServiceLease.owner == owner)).execute()
+
+
+def poller_channel(task_type: str, vendor: str = DEFAULT_VENDOR) -> str:
+    """结果注册表中的等待分组：易盾沿用任务类型，其他厂商加厂商前缀，避免任务被错误的厂商查询"""
+    return task_type if vendor == DEFAULT_VENDOR else f"{vendor}.{task_type}"
+
+
+class TaskResultPoller:
+    """单一任务类型的批量结果轮询器"""
+
+    def __init__(
+        self,
+        task_type: str,
+        batch_size: int = 100,
+        min_interval: float = 1.0,
+        max_interval: float = 15.0,
+        backoff: float = 1.5,
+        db_scan_interval: float = 60.0,
+        max_task_age: float = 86400.0,
+        max_batches: int = 10,
+        backlog_lease: float = 180.0,
+        callback_grace: float = 0.0,
+        registry: Optional[TaskResultRegistry] = None,
+        vendor: str = DEFAULT_VENDOR,
+        query: Optional[Callable[[List[str], str], Awaitable[Dict[str, Tuple[bool, str]]]]] = None
+    ):
+        self.task_type = task_type
+        self.vendor = vendor
+        self.channel = poller_channel(task_type, vendor)
+        self._query = query
+        self.batch_size = batch_size
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.backoff = backoff
+        self.db_scan_interval = db_scan_interval
+        self.max_task_age = max_task_age
+        self.max_batches = max_batches
+        self.backlog_lease = backlog_lease
+        self.callback_grace = callback_grace
+        self.lease_name = f"poller.{self.channel}"
+        self.registry = registry or get_task_result_registry()
+        self.logger = get_logger(f"poller.{self.channel}")
+        self.metrics = get_metrics_collector()
+
+        self.interval = min_interval
+        self._backlog: List[str] = []      # Task表中无人等待的未完成任务
+        self._last_scan = 0.0
+        self.leader = False                # 是否持有积压扫描租约
+        self._loop = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._runner: Optional[asyncio.Task] = None
+        self.queries = 0
+        self.resolved = 0
+        self.resolved_from_db = 0
+
+    def _ensure_started(self):
+        loop = asyncio.get_running_loop()
+        if self._loop is loop and self._runner is not None and not self._runner.done():
+            return
+        self._loop = loop
+        self._wakeup = asyncio.Event()
+        self._runner = loop.create_task(self._run())
+
+    def notify(self):
+        """有新的等待任务：启动轮询器并提前结束退避等待"""
+        self._ensure_started()
+        self._wakeup.set()
+
+    async def _run(self):
+        while True:
+            try:
+                if time.monotonic() - self._last_scan >= self.db_scan_interval:
+                    await self._scan_backlog()
+                idle = not self.registry.pending(self.channel) and not self._backlog
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), self.db_scan_interval if idle else self.interval)
+                    # 新的等待者到达：重置为最小间隔，留出厂商处理时间后查询
+                    self.interval = self.min_interval
+                    await asyncio.sleep(self.min_interval)
+                except asyncio.TimeoutError:
+                    if idle:
+                        continue
+
+                finished = await self._poll_once()
+                if finished:
+                    self.interval = self.min_interval
+                else:
+                    self.interval = min(self.interval * self.backoff, self.max_interval)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.logger.error(f"结果轮询失败: {e}")
+                self.interval = self.max_interval
+
+    async def _scan_backlog(self):
+        self._last_scan = time.monotonic()
+        self._backlog = await asyncio.to_thread(self._load_backlog_if_leader)
+
+    def _load_backlog_if_leader(self) -> List[str]:
+        """持有租约时加载积压任务，否则只轮询本进程的等待者"""
+        leader = acquire_lease(self.lease_name, PROCESS_ID, self.backlog_lease)
+        if leader != self.leader:
+            self.logger.info("获得积压扫描租约" if leader else "积压扫描租约由其他进程持有")
+            self.leader = leader
+        return self._load_backlog() if leader else []
+
+    def _load_backlog(self) -> List[str]:
+        """加载Task表中该厂商未完成且未过期的任务"""
+        now = datetime.now()
+        since = now - timedelta(seconds=self.max_task_age)
+        # 回调宽限期内的任务等待回调，不查询厂商
+        until = now - timedelta(seconds=self.callback_grace)
+        query = (Task
+                 .select(Task.task_id)
+                 .where((Task.type == self.task_type)
+                        & (Task.vendor == self.vendor)
+                        & (Task.status == TaskStatus.CREATED.value)
+                        & (Task.task_id.is_null(False))
+                        & (Task.created_at >= since)
+                        & (Task.created_at <= until))
+                 .order_by(Task.created_at)
+                 .limit(self.batch_size * self.max_batches))
+        return [row.task_id for row in query]
+
+    def _load_finished(self, task_ids: List[str]) -> Dict[str, Tuple[bool, str]]:
+        """Task表中已有结论的任务（回调或其他进程的轮询已写入）"""
+        rows = (Task
+                .select(Task.task_id, Task.is_compliant, Task.result_text)
+                .where((Task.task_id.in_(task_ids)) & (Task.status == TaskStatus.SUCCESS.value)))
+        return {row.task_id: (bool(row.is_compliant), row.result_text or "") for row in rows}
+
+    async def _resolve_from_db(self) -> int:
+        """按Task表唤醒已有结论的等待者，不查询厂商"""
+        task_ids = self.registry.pending(self.channel)
+        if not task_ids:
+            return 0
+        finished = {}
+        for i in range(0, len(task_ids), 500):
+            finished.update(await asyncio.to_thread(self._load_finished, task_ids[i:i + 500]))
+        for task_id, verdict in finished.items():
+            self.registry.resolve(task_id, verdict)
+        self.resolved_from_db += len(finished)
+        return len(finished)
+
+    async def _poll_once(self) -> int:
+        """查询一轮：先按Task表唤醒，再查询厂商，等待者优先，其次Task表积压，按批次上限并发查询"""
+        from services.wangyiyunsdk import aquery_tasks
+
+        resolved = await self._resolve_from_db()
+        query = self._query or aquery_tasks
+        task_ids = self.registry.pending(self.channel, older_than=self.callback_grace)
+        waiting = set(task_ids)
+        task_ids.extend(task_id for task_id in self._backlog if task_id not in waiting)
+        task_ids = task_ids[:self.batch_size * self.max_batches]
+        if not task_ids:
+            return resolved
+
+        batches = [task_ids[i:i + self.batch_size] for i in range(0, len(task_ids), self.batch_size)]
+        responses = await asyncio.gather(
+            *[query(batch, self.task_type) for batch in batches], return_exceptions=True
+        )
+        self.queries += len(batches)
+
+        finished: Dict[str, Tuple[bool, str]] = {}
+        for batch, response in zip(batches, responses):
+            if isinstance(response, Exception):
+                self.logger.error(f"批量查询{len(batch)}个任务失败: {response}")
+                self.metrics.record_vendor_query(self.task_type, len(batch), status="error")
+                continue
+            self.metrics.record_vendor_query(self.task_type, len(batch))
+            finished.update(response)
+
+        if not finished:
+            return resolved
+
+        # 与其他轮询器、回调的结论合并为一次事务回写
+        await get_task_result_writer().save(finished)
+        if self._backlog:
+            self._backlog = [task_id for task_id in self._backlog if task_id not in finished]
+        for task_id, verdict in finished.items():
+            self.registry.resolve(task_id, verdict)
+        self.resolved += len(finished)
+        return resolved + len(finished)
+
+    async def stop(self):
+        """停止轮询"""
+        if self._runner is not None:
+            self._runner.cancel()
+            await asyncio.gather(self._runner, return_exceptions=True)
+            self._runner = None
+        if self.leader:
+            self.leader = False
+            try:
+                await asyncio.to_thread(release_lease, self.lease_name, PROCESS_ID)
+            except Exception as e:
+                self.logger.error(f"释放积压扫描租约失败: {e}")
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取等待数、积压数和查询统计"""
+        return {
+            "waiting": len(self.registry.pending(self.channel)),
+            "backlog": len(self._backlog),
+            "leader": self.leader,
+            "interval": round(self.interval, 2),
+            "queries": self.queries,
+            "resolved": self.resolved,
+            "resolved_from_db": self.resolved_from_db
+        }
+
+
+def create_task_poller(task_type: str, config: Dict[str, Any], vendor: str = DEFAULT_VENDOR) -> TaskResultPoller:
+    """根据 performance.vendor_poller 创建轮询器，批量上限不超过该厂商查询接口的上限"""
+    poller_config = config.get("performance", {}).get("vendor_poller", {})
+    callback_grace = 0.0
+    if vendor == "aliyun":
+        from services.aliyunsdk import QUERY_BATCH_SIZE, aquery_tasks as query
+    else:
+        from services.wangyiyunsdk import QUERY_BATCH_SIZE, DEFAULT_CALLBACK_URL
+        query = None
+        if DEFAULT_CALLBACK_URL:
+            callback_grace = poller_config.get("callback_grace", 30.0)
+
+    return TaskResultPoller(
+        task_type,
+        vendor=vendor,
+        query=query,
+        batch_size=min(poller_config.get("batch_size", QUERY_BATCH_SIZE), QUERY_BATCH_SIZE),
+        min_interval=poller_config.get("min_interval", 1.0),
+        max_interval=poller_config.get("max_interval", 15.0),
+        backoff=poller_config.get("backoff", 1.5),
+        db_scan_interval=poller_config.get("db_scan_interval", 60.0),
+        max_task_age=poller_config.get("max_task_age", 86400.0),
+        max_batches=poller_config.get("max_batches", 10),
+        backlog_lease=poller_config.get("backlog_lease", 180.0),
+        callback_grace=callback_grace
+    )
+
+
+# 全局轮询器，每个厂商的每种任务类型一个
+_task_pollers: Dict[str, TaskResultPoller] = {}
+
+
+def get_task_poller(task_type: str, config: Optional[Dict[str, Any]] = None,
+                    vendor: str = DEFAULT_VENDOR) -> TaskResultPoller:
+    """获取指定厂商、任务类型的全局轮询器，首次调用时按配置创建"""
+    channel = poller_channel(task_type, vendor)
+    poller = _task_pollers.get(channel)
+    if poller is None:
+        poller = create_task_poller(task_type, config or {}, vendor)
+        poller.registry.add_listener(channel, poller.notify)
+        _task_pollers[channel] = poller
+    return poller
+
+
+def start_task_pollers(config: Optional[Dict[str, Any]] = None):
+    """在当前事件循环中启动所有任务类型的轮询器，用于消化Task表中的积压任务；
+    配置了阿里云时同时启动其异步检测（音频、视频）的轮询器"""
+    from services.aliyunsdk import ASYNC_TASK_TYPES, get_aliyun_client
+
+    for task_type in TaskType:
+        get_task_poller(task_type.value, config)._ensure_started()
+    if get_aliyun_client() is not None:
+        for task_type in ASYNC_TASK_TYPES.values():
+            get_task_poller(task_type, config, vendor="aliyun")._ensure_started()
+
+
+async def stop_task_pollers():
+    """停止所有轮询器"""
+    for poller in _task_pollers.values():
+        await poller.stop()
+    await get_task_result_writer().close()
+
+
+def get_task_poller_stats() -> Dict[str, Any]:
+    """获取所有轮询器及结果注册表的统计信息"""
+    stats = {task_type: poller.get_stats() for task_type, poller in _task_pollers.items()}
+    stats["registry"] = get_task_result_registry().get_stats()
+    stats["writer"] = get_task_result_writer().get_stats()
+    return stats
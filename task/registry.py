@@ -0,0 +1,112 @@
+"""
+厂商任务结果注册表
+审核请求按厂商 task_id 登记并等待 Future，结果由后台组件（集中轮询器或厂商回调）统一写入，
+结果到达即唤醒等待者；先于等待者到达的结果短暂保留，避免回调与登记之间的竞争
+"""
+
+import time
+import asyncio
+from collections import OrderedDict
+from typing import Dict, Any, List, Optional, Tuple, Callable
+
+from utils.logger import get_logger
+
+
+Verdict = Tuple[bool, str]   # (是否合规, 结果描述)
+
+
+class _Entry:
+    __slots__ = ("task_type", "future", "waiters", "since")
+
+    def __init__(self, task_type: str, future: asyncio.Future):
+        self.task_type = task_type
+        self.future = future
+        self.waiters = 0
+        self.since = time.monotonic()
+
+
+class TaskResultRegistry:
+    """task_id → Future 的结果注册表，仅在事件循环线程中使用"""
+
+    def __init__(self, recent_size: int = 10000):
+        self.recent_size = recent_size
+        self.logger = get_logger("task_registry")
+        self._entries: Dict[str, _Entry] = {}
+        self._recent: "OrderedDict[str, Verdict]" = OrderedDict()
+        self._listeners: Dict[str, List[Callable[[], None]]] = {}
+        self.resolved = 0
+        self.timeouts = 0
+
+    def add_listener(self, task_type: str, listener: Callable[[], None]):
+        """登记新等待者时通知的回调，用于唤醒对应类型的轮询器"""
+        self._listeners.setdefault(task_type, []).append(listener)
+
+    async def wait(self, task_id: str, task_type: str, timeout: Optional[float] = None) -> Optional[Verdict]:
+        """等待任务结果，超时返回None；同一任务的多个等待者共享一个Future"""
+        verdict = self._recent.get(task_id)
+        if verdict is not None:
+            return verdict
+
+        loop = asyncio.get_running_loop()
+        entry = self._entries.get(task_id)
+        if entry is None or entry.future.get_loop() is not loop:
+            entry = _Entry(task_type, loop.create_future())
+            self._entries[task_id] = entry
+        entry.waiters += 1
+        for listener in self._listeners.get(task_type, []):
+            listener()
+
+        try:
+            # shield：单个等待者超时不影响其他等待者
+            return await asyncio.wait_for(asyncio.shield(entry.future), timeout)
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+            return None
+        finally:
+            entry.waiters -= 1
+            if entry.waiters <= 0 and self._entries.get(task_id) is entry:
+                del self._entries[task_id]
+
+    def resolve(self, task_id: str, verdict: Verdict) -> bool:
+        """写入任务结果并唤醒等待者，返回是否有等待者"""
+        self._recent[task_id] = verdict
+        self._recent.move_to_end(task_id)
+        while len(self._recent) > self.recent_size:
+            self._recent.popitem(last=False)
+
+        entry = self._entries.get(task_id)
+        if entry is None or entry.future.done():
+            return False
+        entry.future.set_result(verdict)
+        self.resolved += 1
+        return True
+
+    def pending(self, task_type: str, older_than: float = 0.0) -> List[str]:
+        """指定类型中正在被等待的任务，older_than大于0时只返回等待超过该时长（秒）的任务"""
+        cutoff = time.monotonic() - older_than
+        return [task_id for task_id, entry in self._entries.items()
+                if entry.task_type == task_type and (older_than <= 0 or entry.since <= cutoff)]
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取等待数和唤醒统计"""
+        waiting: Dict[str, int] = {}
+        for entry in self._entries.values():
+            waiting[entry.task_type] = waiting.get(entry.task_type, 0) + 1
+        return {
+            "waiting": waiting,
+            "recent": len(self._recent),
+            "resolved": self.resolved,
+            "timeouts": self.timeouts
+        }
+
+
+# 全局结果注册表
+_task_result_registry = None
+
+
+def get_task_result_registry() -> TaskResultRegistry:
+    """获取全局任务结果注册表"""
+    global _task_result_registry
+    if _task_result_registry is None:
+        _task_result_registry = TaskResultRegistry()
+    return _task_result_registry
@@ -0,0 +1,280 @@
+"""
+审核作业工作循环
+按空闲并发数从作业队列领取作业，调用按作业类型注册的处理函数，处理期间定期续约并上报心跳与吞吐；
+处理函数抛出异常时由队列按退避策略重试，停止时归还未完成的作业。
+API进程内运行一个工作循环，也可以独立部署，按需增加进程或主机:
+    $ python -m task.worker --concurrency 16
+    $ python -m task.worker --backend broker --broker-url http://api-host:6188/api/v1/jobs
+"""
+
+import os
+import time
+import uuid
+import socket
+import asyncio
+from collections import deque
+from datetime import datetime
+from typing import Dict, Any, Optional, Callable, Awaitable
+
+from models.enums import ProcessingStatus
+from task.job_queue import JobQueue, get_job_queue
+from utils.events import publish_event
+from utils.logger import get_logger
+
+
+JobHandler = Callable[[Dict[str, Any]], Awaitable[Any]]
+
+
+class JobWorker:
+    """作业工作循环，同时处理不超过concurrency个作业"""
+
+    def __init__(
+        self,
+        queue: JobQueue,
+        handlers: Dict[str, JobHandler],
+        concurrency: int = 8,
+        poll_interval: float = 1.0,
+        cleanup_interval: float = 600.0,
+        heartbeat_interval: float = 15.0,
+        throughput_window: float = 60.0,
+        worker_id: Optional[str] = None
+    ):
+        self.queue = queue
+        self.handlers = handlers
+        self.concurrency = concurrency
+        self.poll_interval = poll_interval
+        self.cleanup_interval = cleanup_interval
+        self.heartbeat_interval = heartbeat_interval
+        self.throughput_window = throughput_window
+        self.worker_id = worker_id or f"{socket.gethostname()}-{uuid.uuid4().hex[:8]}"
+        self.started_at = datetime.now()
+        self.logger = get_logger("job_worker")
+
+        self._running: Dict[str, asyncio.Task] = {}
+        self._runner: Optional[asyncio.Task] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._finished = deque(maxlen=10000)   # 最近完成作业的时间，用于计算吞吐
+        self.completed = 0
+        self.failed = 0
+        self.retried = 0
+
+    @property
+    def renew_interval(self) -> float:
+        """续约间隔取租约时长的三分之一，单次续约失败不会导致作业被重新领取"""
+        return max(self.queue.lease_seconds / 3, 1.0)
+
+    def start(self):
+        """在当前事件循环中启动工作循环"""
+        if self._runner is None or self._runner.done():
+            self._wakeup = asyncio.Event()
+            self._runner = asyncio.ensure_future(self._run())
+
+    def notify(self):
+        """本进程入队新作业后立即领取，不必等到下一轮"""
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    async def _run(self):
+        last_renew = last_cleanup = time.monotonic()
+        last_heartbeat = 0.0
+        while True:
+            try:
+                free = self.concurrency - len(self._running)
+                if free > 0:
+                    for job in await asyncio.to_thread(self.queue.claim, self.worker_id, free):
+                        self._running[job["id"]] = asyncio.ensure_future(self._execute(job))
+
+                now = time.monotonic()
+                if self._running and now - last_renew >= self.renew_interval:
+                    await asyncio.to_thread(self.queue.extend, list(self._running), self.worker_id)
+                    last_renew = now
+                if now - last_cleanup >= self.cleanup_interval:
+                    removed = await asyncio.to_thread(self.queue.cleanup)
+                    if removed:
+                        self.logger.info(f"清理过期作业 {removed} 个")
+                    last_cleanup = now
+                if now - last_heartbeat >= self.heartbeat_interval:
+                    await asyncio.to_thread(self.queue.heartbeat, self.worker_id, self.get_stats())
+                    last_heartbeat = now
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.logger.error(f"作业队列访问失败: {e}")
+
+            # 等待新作业通知、作业完成腾出并发或下一轮领取
+            self._wakeup.clear()
+            waiters = [asyncio.ensure_future(self._wakeup.wait())]
+            if len(self._running) >= self.concurrency:
+                waiters.extend(self._running.values())
+            await asyncio.wait(
+                waiters, timeout=min(self.poll_interval, self.renew_interval), return_when=asyncio.FIRST_COMPLETED
+            )
+            waiters[0].cancel()
+
+    async def _execute(self, job: Dict[str, Any]):
+        """执行单个作业并记录结果"""
+        try:
+            handler = self.handlers.get(job["kind"])
+            if handler is None:
+                await asyncio.to_thread(self.queue.fail, job["id"], self.worker_id,
+                                        f"未注册的作业类型: {job['kind']}", False)
+                self.failed += 1
+                return
+            self._publish("job_started", job)
+            try:
+                result = await handler(job)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                status = await asyncio.to_thread(self.queue.fail, job["id"], self.worker_id, str(e))
+                if status == ProcessingStatus.PENDING.value:
+                    self.retried += 1
+                    self.logger.warning(f"作业 {job['id']} 第{job['attempts']}次执行失败，稍后重试: {e}")
+                    self._publish("job_retry", job, error=str(e))
+                else:
+                    self.failed += 1
+                    self.logger.error(f"作业 {job['id']} 执行失败: {e}")
+                    self._publish("job_failed", job, error=str(e))
+                return
+            if await asyncio.to_thread(self.queue.complete, job["id"], self.worker_id, result):
+                self.completed += 1
+                self._finished.append(time.monotonic())
+                self._publish("job_completed", job)
+            else:
+                self.logger.warning(f"作业 {job['id']} 的租约已被接管，结果未记录")
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            self.logger.error(f"记录作业 {job['id']} 状态失败: {e}")
+        finally:
+            self._running.pop(job["id"], None)
+            self.notify()
+
+    def _publish(self, event_type: str, job: Dict[str, Any], **data):
+        if job.get("content_id") is not None:
+            publish_event(event_type, content_id=job["content_id"], job_id=job["id"], kind=job["kind"],
+                          attempts=job["attempts"], worker_id=self.worker_id, **data)
+
+    async def stop(self):
+        """停止领取，取消处理中的作业并归还给队列"""
+        if self._runner is not None:
+            self._runner.cancel()
+            await asyncio.gather(self._runner, return_exceptions=True)
+            self._runner = None
+        running = dict(self._running)
+        for task in running.values():
+            task.cancel()
+        await asyncio.gather(*running.values(), return_exceptions=True)
+        if running:
+            try:
+                released = await asyncio.to_thread(self.queue.release, list(running), self.worker_id)
+                self.logger.info(f"工作循环停止，归还作业 {released} 个")
+            except Exception as e:
+                self.logger.error(f"归还作业失败，将在租约到期后重新领取: {e}")
+
+    def throughput(self) -> float:
+        """最近窗口内每分钟完成的作业数"""
+        cutoff = time.monotonic() - self.throughput_window
+        while self._finished and self._finished[0] < cutoff:
+            self._finished.popleft()
+        return len(self._finished) * 60.0 / self.throughput_window
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取处理中作业数、完成/失败/重试次数与吞吐，同时作为心跳内容上报"""
+        return {
+            "worker_id": self.worker_id,
+            "hostname": socket.gethostname(),
+            "pid": os.getpid(),
+            "started_at": self.started_at.isoformat(),
+            "running": len(self._running),
+            "concurrency": self.concurrency,
+            "completed": self.completed,
+            "failed": self.failed,
+            "retried": self.retried,
+            "jobs_per_minute": round(self.throughput(), 2)
+        }
+
+
+def create_job_worker(config: Dict[str, Any], handlers: Dict[str, JobHandler],
+                      queue: Optional[JobQueue] = None, worker_id: Optional[str] = None) -> JobWorker:
+    """根据 performance.job_queue 创建工作循环"""
+    queue_config = config.get("performance", {}).get("job_queue", {}) or {}
+    return JobWorker(
+        queue or get_job_queue(),
+        handlers,
+        concurrency=queue_config.get("concurrency", 8),
+        poll_interval=queue_config.get("poll_interval", 1.0),
+        cleanup_interval=queue_config.get("cleanup_interval", 600.0),
+        heartbeat_interval=queue_config.get("heartbeat_interval", 15.0),
+        worker_id=worker_id
+    )
+
+
+async def run_worker(config: Dict[str, Any], worker_id: Optional[str] = None):
+    """独立工作进程：运行与API进程相同的审核流水线和厂商结果轮询器，收到SIGINT/SIGTERM后归还作业退出"""
+    import signal
+    from apps.moderation import build_job_handlers, restore_failed_jobs
+    from services.moderation_service import ModerationService
+    from services.wangyiyunsdk import aclose_transport
+    from services.aliyunsdk import close_aliyun_client
+    from task.job_queue import create_job_queue
+    from task.poller import start_task_pollers, stop_task_pollers
+
+    logger = get_logger("job_worker")
+    stopping = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stopping.set)
+
+    service = ModerationService(config)
+    # 经作业代理接入时本机没有API的数据库，按作业携带的内容快照审核，结论随结果交回API写入
+    remote = config.get("performance", {}).get("job_queue", {}).get("backend") == "broker"
+    queue = create_job_queue(config)
+    if not remote:
+        # 共享本地数据库时由本进程恢复最终失败作业的内容状态，经代理接入时由API进程负责
+        queue.on_failed = restore_failed_jobs
+    worker = create_job_worker(config, build_job_handlers(service, remote=remote), queue=queue, worker_id=worker_id)
+    # 审核等待的厂商结果由本进程的轮询器查询
+    start_task_pollers(config)
+    worker.start()
+    logger.info(f"审核工作进程已启动: {worker.worker_id}, 并发 {worker.concurrency}")
+    try:
+        await stopping.wait()
+    finally:
+        await worker.stop()
+        await stop_task_pollers()
+        await aclose_transport()
+        close_aliyun_client()
+        await service.__aexit__(None, None, None)
+        logger.info(f"审核工作进程已退出: {worker.worker_id}, {worker.get_stats()}")
+
+
+def main():
+    import argparse
+    from utils.config import load_config
+
+    parser = argparse.ArgumentParser(description="审核作业工作进程")
+    parser.add_argument("--concurrency", type=int, help="同时处理的作业数，默认取 performance.job_queue.concurrency")
+    parser.add_argument("--backend", choices=("sqlite", "broker"), help="作业队列后端")
+    parser.add_argument("--broker-url", help="作业代理地址，如 http://api-host:6188/api/v1/jobs")
+    parser.add_argument("--broker-token", help="作业代理令牌")
+    parser.add_argument("--worker-id", help="工作循环标识，默认为主机名加随机后缀")
+    args = parser.parse_args()
+
+    config = load_config()
+    queue_config = config.setdefault("performance", {}).setdefault("job_queue", {})
+    if args.concurrency:
+        queue_config["concurrency"] = args.concurrency
+    if args.backend:
+        queue_config["backend"] = args.backend
+    broker_config = queue_config.setdefault("broker", {})
+    if args.broker_url:
+        broker_config["url"] = args.broker_url
+    if args.broker_token:
+        broker_config["token"] = args.broker_token
+
+    asyncio.run(run_worker(config, args.worker_id))
+
+
+if __name__ == "__main__":
+    main()
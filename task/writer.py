@@ -0,0 +1,115 @@
+"""
+任务结果合并回写
+各轮询器、厂商回调和单任务查询得到的结论先进入缓冲区，短时间窗口内到达的结论合并为一次
+save_task_results 事务写入；同一时刻只有一个回写事务，SQLite写锁不再被大量小事务争抢
+"""
+
+import asyncio
+from typing import Dict, Any, List, Optional, Tuple
+
+from utils.logger import get_logger
+
+
+Verdict = Tuple[bool, str]   # (是否合规, 结果描述)
+
+
+class TaskResultWriter:
+    """结论缓冲 + 单写者批量回写，仅在事件循环线程中使用"""
+
+    def __init__(self, flush_interval: float = 0.05, max_batch: int = 500):
+        self.flush_interval = flush_interval
+        self.max_batch = max_batch
+        self.logger = get_logger("task_writer")
+        self._pending: Dict[str, Verdict] = {}
+        self._waiters: List[Tuple[List[str], asyncio.Future]] = []
+        self._flusher: Optional[asyncio.Task] = None
+        self._full: Optional[asyncio.Event] = None
+        self.saves = 0
+        self.flushes = 0
+        self.rows = 0
+
+    async def save(self, finished: Dict[str, Verdict]) -> List[Any]:
+        """登记一批结论并等待其所在批次提交，返回本批对应的Task行"""
+        if not finished:
+            return []
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.update(finished)
+        self._waiters.append((list(finished), future))
+        self.saves += 1
+        if self._full is None:
+            self._full = asyncio.Event()
+        if len(self._pending) >= self.max_batch:
+            self._full.set()
+        if self._flusher is None or self._flusher.done():
+            self._flusher = asyncio.ensure_future(self._flush_loop())
+        return await future
+
+    async def _flush_loop(self):
+        """窗口期内合并结论后回写，回写期间到达的结论进入下一批"""
+        while self._pending:
+            try:
+                await asyncio.wait_for(self._full.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._full.clear()
+            await self._flush()
+
+    async def _flush(self):
+        from services.wangyiyunsdk import save_task_results
+
+        batch, waiters = self._pending, self._waiters
+        self._pending, self._waiters = {}, []
+        try:
+            rows = await asyncio.to_thread(save_task_results, batch)
+        except Exception as e:
+            self.logger.error(f"回写{len(batch)}个任务结论失败: {e}")
+            for _, future in waiters:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        self.flushes += 1
+        self.rows += len(rows)
+        by_task_id = {row.task_id: row for row in rows}
+        for task_ids, future in waiters:
+            if not future.done():
+                future.set_result([by_task_id[task_id] for task_id in task_ids if task_id in by_task_id])
+
+    async def close(self):
+        """写完缓冲区中的结论"""
+        if self._flusher is not None and not self._flusher.done():
+            self._full.set()
+            await asyncio.gather(self._flusher, return_exceptions=True)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取合并回写统计"""
+        return {
+            "pending": len(self._pending),
+            "saves": self.saves,
+            "flushes": self.flushes,
+            "rows": self.rows,
+            "saves_per_flush": round(self.saves / self.flushes, 2) if self.flushes else 0.0
+        }
+
+
+def create_task_result_writer(config: Dict[str, Any]) -> TaskResultWriter:
+    """根据 performance.task_writer 配置创建回写器"""
+    writer_config = config.get("performance", {}).get("task_writer", {}) or {}
+    return TaskResultWriter(
+        flush_interval=writer_config.get("flush_interval", 0.05),
+        max_batch=writer_config.get("max_batch", 500)
+    )
+
+
+# 全局回写器
+_task_result_writer = None
+
+
+def get_task_result_writer() -> TaskResultWriter:
+    """获取全局任务结论回写器"""
+    global _task_result_writer
+    if _task_result_writer is None:
+        from utils.config import load_config
+
+        _task_result_writer = create_task_result_writer(load_config())
+    return _task_result_writer
@@ -0,0 +1,138 @@
+"""
+预筛分类器离线训练脚本
+从 Contents 表和 Task 表中的历史审核结论训练字符n-gram逻辑回归模型，
+并输出跳过阈值下的精确率报告
+
+用法:
+    python train_prescreen.py --output data/prescreen.npz --target-precision 0.995
+"""
+
+import argparse
+import json
+
+import numpy as np
+
+from models.database import Contents, Task, db
+from models.enums import AuditStatus, TaskType, TaskStatus
+from engines.prescreen_engine import PrescreenClassifier, DEFAULT_MODEL_PATH
+
+
+def content_label(content_obj):
+    """从Contents记录推断文本标签：1违规，0安全，None无法判断"""
+    if content_obj.processing_content:
+        try:
+            processing_data = json.loads(content_obj.processing_content)
+        except (json.JSONDecodeError, TypeError):
+            processing_data = None
+        # 多维度审核结果中优先使用文本维度的结论，避免图片违规污染文本标签
+        if isinstance(processing_data, dict):
+            text_result = processing_data.get("content")
+            if isinstance(text_result, dict) and text_result.get("status") == "completed":
+                return 0 if text_result.get("is_compliant") else 1
+
+    if content_obj.audit_status == AuditStatus.APPROVED.value:
+        return 0
+    if content_obj.audit_status == AuditStatus.REJECTED.value:
+        return 1
+    return None
+
+
+def load_samples():
+    """加载历史审核结论，按文本去重"""
+    samples = {}
+
+    contents = Contents.select().where(
+        (Contents.audit_status == AuditStatus.APPROVED.value) |
+        (Contents.audit_status == AuditStatus.REJECTED.value)
+    )
+    for content_obj in contents:
+        if not content_obj.content or not content_obj.content.strip():
+            continue
+        label = content_label(content_obj)
+        if label is not None:
+            samples[content_obj.content.strip()] = label
+
+    tasks = Task.select().where(
+        (Task.type == TaskType.TEXT.value) &
+        (Task.status == TaskStatus.SUCCESS.value) &
+        (Task.is_compliant.is_null(False))
+    )
+    for task in tasks:
+        if task.content and task.content.strip():
+            samples[task.content.strip()] = 0 if task.is_compliant else 1
+
+    texts = list(samples.keys())
+    labels = np.array([samples[text] for text in texts], dtype=np.int8)
+    return texts, labels
+
+
+def main():
+    parser = argparse.ArgumentParser(description="训练预筛分类器")
+    parser.add_argument("--output", default=DEFAULT_MODEL_PATH, help="权重文件输出路径")
+    parser.add_argument("--n-features", type=int, default=2 ** 18, help="哈希特征维度")
+    parser.add_argument("--min-n", type=int, default=1, help="最小n-gram长度")
+    parser.add_argument("--max-n", type=int, default=3, help="最大n-gram长度")
+    parser.add_argument("--epochs", type=int, default=5, help="训练轮数")
+    parser.add_argument("--learning-rate", type=float, default=0.5, help="学习率")
+    parser.add_argument("--holdout", type=float, default=0.2, help="验证集比例")
+    parser.add_argument("--target-precision", type=float, default=0.995, help="跳过集合的目标精确率")
+    parser.add_argument("--skip-threshold", type=float, default=None, help="直接指定跳过阈值（优先于目标精确率）")
+    parser.add_argument("--seed", type=int, default=42, help="随机种子")
+    args = parser.parse_args()
+
+    db.connect(reuse_if_open=True)
+    try:
+        texts, labels = load_samples()
+    finally:
+        if not db.is_closed():
+            db.close()
+
+    print(f"加载样本 {len(texts)} 条，其中违规 {int(labels.sum())} 条")
+    if len(texts) < 10 or labels.min() == labels.max():
+        print("样本不足或只有单一类别，无法训练")
+        return
+
+    rng = np.random.default_rng(args.seed)
+    order = rng.permutation(len(texts))
+    holdout_size = max(int(len(texts) * args.holdout), 1)
+    valid_idx, train_idx = order[:holdout_size], order[holdout_size:]
+
+    classifier = PrescreenClassifier(
+        n_features=args.n_features,
+        ngram_range=(args.min_n, args.max_n)
+    )
+    classifier.fit(
+        [texts[i] for i in train_idx],
+        labels[train_idx],
+        epochs=args.epochs,
+        learning_rate=args.learning_rate,
+        seed=args.seed
+    )
+
+    valid_probs = classifier.predict_proba_batch([texts[i] for i in valid_idx])
+    valid_labels = labels[valid_idx]
+    if args.skip_threshold is not None:
+        threshold = args.skip_threshold
+    else:
+        threshold = PrescreenClassifier.choose_threshold(valid_probs, valid_labels, args.target_precision)
+
+    report = PrescreenClassifier.evaluate(valid_probs, valid_labels, threshold)
+    report["train_samples"] = int(len(train_idx))
+    report["target_precision"] = args.target_precision if args.skip_threshold is None else None
+
+    classifier.skip_threshold = threshold
+    classifier.report = report
+    classifier.save(args.output)
+
+    print("\n验证集报告:")
+    print(f"  跳过阈值: {report['threshold']:.6f}")
+    print(f"  验证样本: {report['samples']}")
+    print(f"  跳过比例: {report['skip_rate']:.2%} ({report['skipped']} 条)")
+    print(f"  阈值下精确率: {report['precision_at_threshold']:.4f}")
+    print(f"  被跳过的违规样本: {report['unsafe_skipped']}")
+    print(f"  违规召回率: {report['unsafe_recall']:.4f}")
+    print(f"\n模型已保存: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,270 @@
+"""
+AI响应解析工具
+一次线性扫描定位首个完整JSON对象，优先使用orjson解码，直接构建AIResult；
+解析失败时按关键词单次扫描降级，并统计各调用方的解析失败率
+"""
+
+import re
+import json
+import threading
+from collections import defaultdict
+from typing import Dict, Any, List, Optional, Tuple
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+from models.models import AIResult
+from models.enums import RiskLevel, ContentCategory
+from utils.logger import get_logger
+from utils.metrics import get_metrics_collector
+
+
+# 只关心结构字符，普通字符由正则引擎在C层跳过
+_STRUCT_RE = re.compile(r'[{}"\\]')
+
+# 后备解析关键词，按严重程度映射
+_FALLBACK_RE = re.compile(r"blocked|严重|违规|risky|风险|危险|suspicious|可疑|注意", re.IGNORECASE)
+_FALLBACK_LEVELS = {
+    "blocked": RiskLevel.BLOCKED, "严重": RiskLevel.BLOCKED, "违规": RiskLevel.BLOCKED,
+    "risky": RiskLevel.RISKY, "风险": RiskLevel.RISKY, "危险": RiskLevel.RISKY,
+    "suspicious": RiskLevel.SUSPICIOUS, "可疑": RiskLevel.SUSPICIOUS, "注意": RiskLevel.SUSPICIOUS
+}
+_FALLBACK_SCORES = {
+    RiskLevel.BLOCKED: 0.8,
+    RiskLevel.RISKY: 0.6,
+    RiskLevel.SUSPICIOUS: 0.4,
+    RiskLevel.SAFE: 0.1
+}
+_SEVERITY = {
+    RiskLevel.SAFE: 0,
+    RiskLevel.SUSPICIOUS: 1,
+    RiskLevel.RISKY: 2,
+    RiskLevel.BLOCKED: 3
+}
+
+_RISK_LEVEL_MAP = {
+    "safe": RiskLevel.SAFE,
+    "suspicious": RiskLevel.SUSPICIOUS,
+    "risky": RiskLevel.RISKY,
+    "blocked": RiskLevel.BLOCKED
+}
+
+_CATEGORY_MAP = {
+    "political": ContentCategory.POLITICAL,
+    "violence": ContentCategory.VIOLENCE,
+    "adult": ContentCategory.ADULT,
+    "illegal": ContentCategory.ILLEGAL,
+    "fraud": ContentCategory.FRAUD,
+    "privacy": ContentCategory.PRIVACY,
+    "hate_speech": ContentCategory.HATE_SPEECH,
+    "harassment": ContentCategory.HARASSMENT,
+    "spam": ContentCategory.SPAM,
+    "misinformation": ContentCategory.MISINFORMATION
+}
+
+_BASE_SCORES = {
+    RiskLevel.SAFE: 0.1,
+    RiskLevel.SUSPICIOUS: 0.4,
+    RiskLevel.RISKY: 0.7,
+    RiskLevel.BLOCKED: 0.9
+}
+
+
+def _loads(text: str):
+    if orjson is not None:
+        return orjson.loads(text)
+    return json.loads(text)
+
+
+def find_json_object(text: str, start: int = 0) -> Optional[Tuple[int, int]]:
+    """从start开始查找首个括号平衡的JSON对象，返回(起始, 结束)下标，忽略字符串内的括号和转义"""
+    begin = text.find("{", start)
+    if begin < 0:
+        return None
+
+    depth = 0
+    in_string = False
+    skip_until = -1
+    for match in _STRUCT_RE.finditer(text, begin):
+        pos = match.start()
+        if pos < skip_until:
+            continue
+        char = match.group()
+        if in_string:
+            if char == "\\":
+                skip_until = pos + 2
+            elif char == '"':
+                in_string = False
+        elif char == '"':
+            in_string = True
+        elif char == "{":
+            depth += 1
+        elif char == "}":
+            depth -= 1
+            if depth == 0:
+                return begin, pos + 1
+    return None
+
+
+def calculate_risk_score(risk_level: RiskLevel, confidence: float) -> float:
+    """根据风险等级和置信度计算风险分数"""
+    base_score = _BASE_SCORES.get(risk_level, 0.5)
+    return min(base_score * confidence + 0.1, 1.0)
+
+
+def _str_list(value: Any) -> List[str]:
+    if isinstance(value, list):
+        return [item if isinstance(item, str) else str(item) for item in value]
+    if isinstance(value, str) and value:
+        return [value]
+    return []
+
+
+def _confidence(value: Any) -> float:
+    try:
+        return min(max(float(value), 0.0), 1.0)
+    except (TypeError, ValueError):
+        return 0.5
+
+
+class AIResponseParser:
+    """AI响应解析器，线程安全，按调用方统计解析结果"""
+
+    # 单个响应最多尝试解码的候选对象数，避免病态输入退化为二次复杂度
+    MAX_CANDIDATES = 3
+
+    def __init__(self):
+        self.logger = get_logger("ai_parser")
+        self._lock = threading.Lock()
+        self._stats: Dict[str, Dict[str, int]] = defaultdict(lambda: defaultdict(int))
+
+    def extract(self, response_text: str) -> Tuple[Optional[Dict[str, Any]], str]:
+        """提取响应中的审核结论字典，返回(数据, 结果标记)"""
+        position = 0
+        outcome = "no_json"
+        for _ in range(self.MAX_CANDIDATES):
+            span = find_json_object(response_text, position)
+            if span is None:
+                break
+            begin, end = span
+            try:
+                data = _loads(response_text[begin:end])
+            except ValueError:
+                outcome = "decode_error"
+                position = begin + 1
+                continue
+            if isinstance(data, dict) and "risk_level" in data:
+                return data, "ok"
+            outcome = "missing_fields"
+            position = begin + 1
+        return None, outcome
+
+    def build_result(self, data: Dict[str, Any]) -> AIResult:
+        """将解码后的字典直接构建为AIResult"""
+        risk_level = _RISK_LEVEL_MAP.get(str(data.get("risk_level", "safe")).lower(), RiskLevel.SAFE)
+        categories = [
+            _CATEGORY_MAP[cat] for cat in data.get("categories") or []
+            if isinstance(cat, str) and cat in _CATEGORY_MAP
+        ]
+        confidence = _confidence(data.get("confidence_score", 0.5))
+        reasoning = data.get("reasoning") or ""
+        if not isinstance(reasoning, str):
+            reasoning = str(reasoning)
+        recommendations = _str_list(data.get("recommendations"))
+
+        return AIResult(
+            risk_level=risk_level,
+            violated_categories=categories,
+            risk_score=calculate_risk_score(risk_level, confidence),
+            risk_reasons=recommendations,
+            detailed_analysis=reasoning,
+            confidence_score=confidence,
+            suspicious_segments=_str_list(data.get("suspicious_segments")),
+            keywords_found=_str_list(data.get("keywords_found")),
+            evasion_techniques=_str_list(data.get("evasion_techniques")),
+            reasoning=reasoning,
+            recommendations=recommendations
+        )
+
+    def fallback(self, response_text: str) -> AIResult:
+        """后备解析：单次扫描取最严重的关键词"""
+        risk_level = RiskLevel.SAFE
+        for match in _FALLBACK_RE.finditer(response_text):
+            level = _FALLBACK_LEVELS.get(match.group().lower(), RiskLevel.SAFE)
+            if _SEVERITY[level] > _SEVERITY[risk_level]:
+                risk_level = level
+                if risk_level == RiskLevel.BLOCKED:
+                    break
+
+        return AIResult(
+            risk_level=risk_level,
+            violated_categories=[],
+            risk_score=_FALLBACK_SCORES[risk_level],
+            risk_reasons=["AI响应解析失败，使用简单分析"],
+            detailed_analysis=response_text[:200] + "...",
+            confidence_score=0.3,
+            suspicious_segments=[],
+            keywords_found=[],
+            evasion_techniques=[],
+            reasoning="后备解析方法",
+            recommendations=["建议人工复核"]
+        )
+
+    def parse_with_status(self, response_text: str, source: str = "default") -> Tuple[AIResult, bool]:
+        """解析AI响应，返回(AI结果, 是否为结构化解析)"""
+        data, outcome = self.extract(response_text or "")
+        result = None
+        if data is not None:
+            try:
+                result = self.build_result(data)
+            except Exception as e:
+                self.logger.warning(f"AI响应字段校验失败: {e}")
+                outcome = "invalid_fields"
+
+        self._record(source, outcome)
+        if result is not None:
+            return result, True
+
+        self.logger.warning(f"AI响应解析失败({outcome})，使用后备解析")
+        return self.fallback(response_text or ""), False
+
+    def parse(self, response_text: str, source: str = "default") -> AIResult:
+        """解析AI响应"""
+        return self.parse_with_status(response_text, source)[0]
+
+    def _record(self, source: str, outcome: str):
+        with self._lock:
+            source_stats = self._stats[source]
+            source_stats["total"] += 1
+            source_stats[outcome] += 1
+        try:
+            get_metrics_collector().record_ai_parse(source, outcome)
+        except Exception as e:
+            self.logger.debug(f"AI解析指标记录失败: {e}")
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取各调用方的解析统计和失败率"""
+        with self._lock:
+            stats = {}
+            for source, counts in self._stats.items():
+                total = counts.get("total", 0)
+                failed = total - counts.get("ok", 0)
+                stats[source] = {
+                    **counts,
+                    "failure_rate": failed / total if total > 0 else 0.0
+                }
+            return stats
+
+
+# 全局解析器实例
+_ai_response_parser = None
+
+
+def get_ai_response_parser() -> AIResponseParser:
+    """获取全局AI响应解析器"""
+    global _ai_response_parser
+    if _ai_response_parser is None:
+        _ai_response_parser = AIResponseParser()
+    return _ai_response_parser
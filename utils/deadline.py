@@ -0,0 +1,52 @@
+"""
+请求截止时间工具
+由 ModerationRequest.timeout 等请求超时创建，沿调用链传递，
+各阶段按剩余预算确定自身超时，预算耗尽时跳过可选阶段并记录被截断的阶段
+"""
+
+import time
+from typing import Optional, List
+
+
+class Deadline:
+    """请求截止时间，timeout为空表示不限时"""
+
+    def __init__(self, timeout: Optional[float] = None, expires_at: Optional[float] = None):
+        if expires_at is None and timeout:
+            expires_at = time.monotonic() + timeout
+        self.timeout = timeout
+        self.expires_at = expires_at
+        self.cut_stages: List[str] = []
+
+    def child(self) -> "Deadline":
+        """共享同一截止时间但单独记录截断阶段，用于批量中的单条内容"""
+        return Deadline(self.timeout, self.expires_at)
+
+    def remaining(self) -> Optional[float]:
+        """剩余秒数，不限时返回None"""
+        if self.expires_at is None:
+            return None
+        return max(self.expires_at - time.monotonic(), 0.0)
+
+    def expired(self) -> bool:
+        remaining = self.remaining()
+        return remaining is not None and remaining <= 0
+
+    def has_budget(self, minimum: float = 0.0) -> bool:
+        """剩余预算是否足以执行一个至少需要minimum秒的阶段"""
+        remaining = self.remaining()
+        return remaining is None or remaining > minimum
+
+    def timeout_for(self, default: Optional[float]) -> Optional[float]:
+        """阶段超时：取阶段默认超时与剩余预算中较小者"""
+        remaining = self.remaining()
+        if remaining is None:
+            return default
+        if default is None:
+            return remaining
+        return min(default, remaining)
+
+    def cut(self, stage: str):
+        """记录因预算耗尽被跳过或中断的阶段"""
+        if stage not in self.cut_stages:
+            self.cut_stages.append(stage)
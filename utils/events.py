@@ -0,0 +1,180 @@
+"""
+审核进度事件总线
+进程内发布/订阅：审核流水线在各维度提交、等待厂商结果、给出结论以及最终决策时发布事件，
+SSE接口按内容ID订阅后实时推送，不再需要客户端轮询状态接口。
+内容ID和维度通过上下文变量随asyncio任务传递，厂商层发布事件时无需逐层传参；
+每个内容保留最近的事件，订阅晚于发布或断线重连（Last-Event-ID）时先补发
+"""
+
+import asyncio
+import itertools
+from collections import OrderedDict, deque
+from contextvars import ContextVar
+from datetime import datetime
+from typing import Dict, Any, List, Optional, Iterable, Set
+
+from utils.logger import get_logger
+
+
+# 一次审核的最终决策事件，以及开始新一轮审核的事件
+FINAL_EVENT = "final_decision"
+START_EVENTS = ("job_queued", "audit_started")
+# 订阅方据此判断一个内容的审核已结束：给出最终决策，或作业重试耗尽
+TERMINAL_EVENTS = (FINAL_EVENT, "job_failed")
+
+# 当前审核上下文：content_id、dimension（模态）、item（维度内标识，如文件URL）
+_audit_context: ContextVar[Optional[Dict[str, Any]]] = ContextVar("audit_context", default=None)
+
+
+def bind_audit_context(**fields):
+    """在当前任务的上下文中登记审核字段，之后创建的子任务继承该上下文"""
+    _audit_context.set({**(_audit_context.get() or {}), **fields})
+
+
+class Subscription:
+    """一个订阅者的事件缓冲，消费过慢时丢弃最旧的事件"""
+
+    def __init__(self, bus: "EventBus", content_ids: Set[int], queue_size: int):
+        self.bus = bus
+        self.content_ids = content_ids
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self.dropped = 0
+
+    def deliver(self, event: Dict[str, Any]):
+        if self.queue.full():
+            self.queue.get_nowait()
+            self.dropped += 1
+        self.queue.put_nowait(event)
+
+    async def get(self, timeout: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        """取下一个事件，超时返回None"""
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    def close(self):
+        self.bus.unsubscribe(self)
+
+
+class EventBus:
+    """按内容ID分发的进程内事件总线，只在事件循环线程中分发，其他线程发布时转交事件循环"""
+
+    def __init__(self, queue_size: int = 256, history_size: int = 64, max_contents: int = 2000):
+        self.queue_size = queue_size
+        self.history_size = history_size
+        self.max_contents = max_contents
+        self.logger = get_logger("event_bus")
+        self._subscribers: Dict[int, Set[Subscription]] = {}
+        self._history: "OrderedDict[int, deque]" = OrderedDict()
+        self._sequence = itertools.count(1)
+        self.last_id = 0                   # 最近发布的事件编号
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self.published = 0
+
+    def publish(self, event_type: str, content_id: int, **data) -> Dict[str, Any]:
+        """发布一条事件，返回事件本身"""
+        self.last_id = next(self._sequence)
+        event = {
+            "id": self.last_id,
+            "type": event_type,
+            "content_id": content_id,
+            "timestamp": datetime.now().isoformat(),
+            **data
+        }
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if self._loop is not None and running is not self._loop:
+            self._loop.call_soon_threadsafe(self._dispatch, event)
+        else:
+            self._dispatch(event)
+        return event
+
+    def _dispatch(self, event: Dict[str, Any]):
+        content_id = event["content_id"]
+        history = self._history.get(content_id)
+        if history is None or (event["type"] in START_EVENTS and any(e["type"] in TERMINAL_EVENTS for e in history)):
+            # 上一轮审核已给出最终决策后重新审核，开始新一轮历史，补发时不会混入旧结论
+            history = self._history[content_id] = deque(maxlen=self.history_size)
+            while len(self._history) > self.max_contents:
+                self._history.popitem(last=False)
+        else:
+            self._history.move_to_end(content_id)
+        history.append(event)
+        self.published += 1
+        for subscription in self._subscribers.get(content_id, ()):
+            subscription.deliver(event)
+
+    def subscribe(self, content_ids: Iterable[int], after: Optional[int] = None) -> Subscription:
+        """订阅一组内容的事件；after不为空时先补发编号大于after的历史事件"""
+        self._loop = asyncio.get_running_loop()
+        subscription = Subscription(self, set(content_ids), self.queue_size)
+        if after is not None:
+            replay = sorted(
+                (event for content_id in subscription.content_ids for event in self._history.get(content_id, ())
+                 if event["id"] > after),
+                key=lambda event: event["id"]
+            )
+            for event in replay:
+                subscription.deliver(event)
+        for content_id in subscription.content_ids:
+            self._subscribers.setdefault(content_id, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        for content_id in subscription.content_ids:
+            subscribers = self._subscribers.get(content_id)
+            if subscribers is not None:
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self._subscribers[content_id]
+
+    def history(self, content_id: int) -> List[Dict[str, Any]]:
+        return list(self._history.get(content_id, ()))
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取订阅数与发布数"""
+        subscriptions = {subscription for subscribers in self._subscribers.values() for subscription in subscribers}
+        return {
+            "subscriptions": len(subscriptions),
+            "contents_watched": len(self._subscribers),
+            "published": self.published,
+            "dropped": sum(subscription.dropped for subscription in subscriptions)
+        }
+
+
+def publish_event(event_type: str, **data) -> Optional[Dict[str, Any]]:
+    """按当前审核上下文补全内容ID和维度后发布事件，不在内容审核中（无content_id）时忽略"""
+    context = _audit_context.get() or {}
+    content_id = data.pop("content_id", None) or context.get("content_id")
+    if content_id is None:
+        return None
+    fields = {key: value for key, value in context.items() if key != "content_id"}
+    fields.update(data)
+    return get_event_bus().publish(event_type, content_id, **fields)
+
+
+def create_event_bus(config: Dict[str, Any]) -> EventBus:
+    """根据 performance.events 配置创建事件总线"""
+    events_config = config.get("performance", {}).get("events", {}) or {}
+    return EventBus(
+        queue_size=events_config.get("queue_size", 256),
+        history_size=events_config.get("history_size", 64),
+        max_contents=events_config.get("max_contents", 2000)
+    )
+
+
+# 全局事件总线
+_event_bus = None
+
+
+def get_event_bus() -> EventBus:
+    """获取全局事件总线"""
+    global _event_bus
+    if _event_bus is None:
+        from utils.config import load_config
+
+        _event_bus = create_event_bus(load_config())
+    return _event_bus
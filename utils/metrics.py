@@ -54,7 +54,57 @@ class MetricsCollector:
             registry=self.registry
         )
         
+        self.ai_parse_total = Counter(
+            'moderation_ai_parse_total',
+            'AI响应解析结果总数',
+            ['source', 'outcome'],
+            registry=self.registry
+        )
+        
+        self.vendor_queries_total = Counter(
+            'moderation_vendor_queries_total',
+            '厂商结果查询请求数',
+            ['task_type', 'status'],
+            registry=self.registry
+        )
+        
+        self.vendor_query_tasks_total = Counter(
+            'moderation_vendor_query_tasks_total',
+            '厂商结果查询携带的任务数',
+            ['task_type'],
+            registry=self.registry
+        )
+        
+        self.vendor_throttled_total = Counter(
+            'moderation_vendor_throttled_total',
+            '厂商接口返回限流的次数',
+            ['api'],
+            registry=self.registry
+        )
+        
+        self.vendor_retries_total = Counter(
+            'moderation_vendor_retries_total',
+            '厂商接口请求重试次数',
+            ['api', 'reason'],
+            registry=self.registry
+        )
+        
+        self.vendor_hedges_total = Counter(
+            'moderation_vendor_routed_total',
+            '按厂商路由审核的结果分布',
+            ['modality', 'outcome'],
+            registry=self.registry
+        )
+        
         # 直方图
+        self.vendor_rate_wait = Histogram(
+            'moderation_vendor_rate_wait_seconds',
+            '厂商接口请求在限流器中排队等待的时间',
+            ['api'],
+            buckets=(0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0),
+            registry=self.registry
+        )
+        
         self.request_duration = Histogram(
             'moderation_request_duration_seconds',
             '审核请求处理时间',
@@ -79,6 +129,7 @@ class MetricsCollector:
         self.queue_size = Gauge(
             'moderation_queue_size',
             '队列大小',
+            ['stage'],
             registry=self.registry
         )
         
@@ -164,13 +215,38 @@ class MetricsCollector:
             model_name=model_name
         ).observe(processing_time)
     
+    def record_ai_parse(self, source: str, outcome: str):
+        """记录AI响应解析结果，outcome为ok时表示结构化解析成功"""
+        self.ai_parse_total.labels(source=source, outcome=outcome).inc()
+    
+    def record_vendor_query(self, task_type: str, task_count: int, status: str = "success"):
+        """记录一次厂商批量结果查询及其携带的任务数"""
+        self.vendor_queries_total.labels(task_type=task_type, status=status).inc()
+        self.vendor_query_tasks_total.labels(task_type=task_type).inc(task_count)
+    
+    def record_vendor_throttle(self, api: str):
+        """记录一次厂商限流响应"""
+        self.vendor_throttled_total.labels(api=api).inc()
+    
+    def record_vendor_retry(self, api: str, reason: str):
+        """记录一次厂商请求重试，reason为throttled/server_error/connection"""
+        self.vendor_retries_total.labels(api=api, reason=reason).inc()
+    
+    def record_vendor_rate_wait(self, api: str, seconds: float):
+        """记录请求在限流器中的等待时间"""
+        self.vendor_rate_wait.labels(api=api).observe(seconds)
+    
+    def record_vendor_hedge(self, modality: str, outcome: str):
+        """记录一次主备厂商审核的结果，outcome为primary/failover/hedge_primary/hedge_secondary/failed"""
+        self.vendor_hedges_total.labels(modality=modality, outcome=outcome).inc()
+    
     def update_active_requests(self, count: int):
         """更新活跃请求数"""
         self.active_requests.set(count)
     
-    def update_queue_size(self, size: int):
-        """更新队列大小"""
-        self.queue_size.set(size)
+    def update_queue_size(self, size: int, stage: str = "default"):
+        """更新队列大小，按流水线阶段区分"""
+        self.queue_size.labels(stage=stage).set(size)
     
     def get_stats_summary(self) -> Dict[str, Any]:
         """获取统计摘要"""
@@ -0,0 +1,334 @@
+"""
+准入控制与限流工具
+按客户端令牌桶限流，并按 performance.queue_size 限制在途+排队的审核任务数，
+超限时抛出 RateLimitError，Retry-After 按实测的任务完成速率估算；
+调用厂商接口前按业务ID的自适应令牌桶排队，使请求速率保持在厂商QPS上限之下
+"""
+
+import math
+import time
+import ipaddress
+import asyncio
+import threading
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager
+from typing import Dict, Any, List, Optional, Tuple
+
+from utils.exceptions import RateLimitError
+from utils.metrics import get_metrics_collector
+from utils.logger import get_logger
+
+
+class TokenBucket:
+    """令牌桶：rate为每秒补充的令牌数，capacity为桶容量（突发量）"""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def try_acquire(self, tokens: float = 1.0) -> Tuple[bool, float]:
+        """尝试取出令牌，返回(是否成功, 令牌不足时需等待的秒数)"""
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+            self.updated_at = now
+            if self.tokens >= tokens:
+                self.tokens -= tokens
+                return True, 0.0
+            wait = (tokens - self.tokens) / self.rate if self.rate > 0 else float("inf")
+            return False, wait
+
+
+class VendorRateLimiter:
+    """按厂商业务ID划分的自适应令牌桶：令牌不足时按先来先到排队等待而不是失败，
+    收到限流响应时按比例降速，持续成功后逐步恢复到配置速率"""
+
+    def __init__(
+        self,
+        default_rate: float = 20.0,
+        rates: Optional[Dict[str, float]] = None,
+        burst_seconds: float = 1.0,
+        max_wait: float = 30.0,
+        decrease_factor: float = 0.7,
+        increase_ratio: float = 0.02,
+        min_rate_ratio: float = 0.1
+    ):
+        self.default_rate = default_rate
+        self.rates = rates or {}
+        self.burst_seconds = burst_seconds
+        self.max_wait = max_wait
+        self.decrease_factor = decrease_factor
+        self.increase_ratio = increase_ratio
+        self.min_rate_ratio = min_rate_ratio
+        self.logger = get_logger("vendor_rate_limiter")
+
+        self._buckets: Dict[str, TokenBucket] = {}
+        self._async_locks: Dict[str, asyncio.Lock] = {}
+        self._sync_locks: Dict[str, threading.Lock] = {}
+        self._lock = threading.Lock()
+        self.throttled: Dict[str, int] = {}
+        self.waiting: Dict[str, int] = {}
+
+    def configured_rate(self, key: str) -> float:
+        return float(self.rates.get(key, self.default_rate))
+
+    def _bucket(self, key: str) -> TokenBucket:
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                rate = self.configured_rate(key)
+                bucket = TokenBucket(rate, max(rate * self.burst_seconds, 1.0))
+                self._buckets[key] = bucket
+                self._sync_locks[key] = threading.Lock()
+            return bucket
+
+    def _check_wait(self, key: str, started: float, wait: float):
+        if time.monotonic() - started + wait > self.max_wait:
+            raise RateLimitError(f"厂商接口限流排队超过 {self.max_wait}s: {key}", retry_after=max(math.ceil(wait), 1))
+
+    async def acquire(self, key: str) -> float:
+        """异步取令牌，不足时排队等待，返回等待秒数；预计等待超过max_wait时抛出RateLimitError"""
+        bucket = self._bucket(key)
+        lock = self._async_locks.get(key)
+        if lock is None:
+            lock = self._async_locks[key] = asyncio.Lock()
+        started = time.monotonic()
+        self.waiting[key] = self.waiting.get(key, 0) + 1
+        try:
+            # asyncio.Lock按等待顺序唤醒，保证排队先后
+            async with lock:
+                while True:
+                    allowed, wait = bucket.try_acquire()
+                    if allowed:
+                        return time.monotonic() - started
+                    self._check_wait(key, started, wait)
+                    await asyncio.sleep(wait)
+        finally:
+            self.waiting[key] -= 1
+
+    def acquire_sync(self, key: str) -> float:
+        """同步取令牌，行为与 acquire 相同"""
+        bucket = self._bucket(key)
+        started = time.monotonic()
+        with self._sync_locks[key]:
+            while True:
+                allowed, wait = bucket.try_acquire()
+                if allowed:
+                    return time.monotonic() - started
+                self._check_wait(key, started, wait)
+                time.sleep(wait)
+
+    def on_throttle(self, key: str):
+        """收到限流响应：按比例降速并清空令牌，让排队请求暂停一个补充周期"""
+        bucket = self._bucket(key)
+        floor = self.configured_rate(key) * self.min_rate_ratio
+        with bucket._lock:
+            bucket.rate = max(bucket.rate * self.decrease_factor, floor)
+            bucket.capacity = max(bucket.rate * self.burst_seconds, 1.0)
+            bucket.tokens = 0.0
+        self.throttled[key] = self.throttled.get(key, 0) + 1
+        self.logger.warning(f"厂商接口限流，{key} 速率降至 {bucket.rate:.2f}/s")
+
+    def on_success(self, key: str):
+        """请求成功：速率按配置值的固定比例逐步恢复"""
+        bucket = self._bucket(key)
+        ceiling = self.configured_rate(key)
+        if bucket.rate >= ceiling:
+            return
+        with bucket._lock:
+            bucket.rate = min(bucket.rate + ceiling * self.increase_ratio, ceiling)
+            bucket.capacity = max(bucket.rate * self.burst_seconds, 1.0)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取各业务ID的当前速率、排队数和限流次数"""
+        return {
+            key: {
+                "rate": round(bucket.rate, 2),
+                "configured_rate": self.configured_rate(key),
+                "waiting": self.waiting.get(key, 0),
+                "throttled": self.throttled.get(key, 0)
+            }
+            for key, bucket in self._buckets.items()
+        }
+
+
+def create_vendor_rate_limiter(config: Dict[str, Any]) -> Optional[VendorRateLimiter]:
+    """根据厂商 rate_limit 配置创建限流器，未启用时返回None"""
+    if not config or not config.get("enabled", True):
+        return None
+    return VendorRateLimiter(
+        default_rate=config.get("default_qps", 20.0),
+        rates=config.get("qps") or {},
+        burst_seconds=config.get("burst_seconds", 1.0),
+        max_wait=config.get("max_wait", 30.0),
+        decrease_factor=config.get("decrease_factor", 0.7),
+        increase_ratio=config.get("increase_ratio", 0.02),
+        min_rate_ratio=config.get("min_rate_ratio", 0.1)
+    )
+
+
+class ClientRateLimiter:
+    """按客户端划分的令牌桶限流器，客户端数量超过上限时淘汰最久未访问的"""
+
+    def __init__(self, requests_per_minute: float, burst: int, max_clients: int = 10000):
+        self.rate = requests_per_minute / 60.0
+        self.burst = burst
+        self.max_clients = max_clients
+        self._buckets: "OrderedDict[str, TokenBucket]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def try_acquire(self, client_id: str) -> Tuple[bool, float]:
+        with self._lock:
+            bucket = self._buckets.get(client_id)
+            if bucket is None:
+                bucket = TokenBucket(self.rate, self.burst)
+                self._buckets[client_id] = bucket
+                if len(self._buckets) > self.max_clients:
+                    self._buckets.popitem(last=False)
+            else:
+                self._buckets.move_to_end(client_id)
+        return bucket.try_acquire()
+
+
+def parse_networks(entries: List[str]) -> List[Any]:
+    """解析受信代理列表，支持单个地址和CIDR网段"""
+    return [ipaddress.ip_network(entry.strip(), strict=False) for entry in entries or [] if entry and entry.strip()]
+
+
+def _is_trusted(address: str, networks: List[Any]) -> bool:
+    try:
+        ip = ipaddress.ip_address(address.strip())
+    except ValueError:
+        return False
+    return any(ip in network for network in networks)
+
+
+def resolve_client_ip(remote: Optional[str], forwarded: Optional[str], trusted: List[Any]) -> str:
+    """确定限流用的客户端地址：直连地址是受信代理时才采信X-Forwarded-For，
+    从右向左跳过受信代理，取第一个非受信地址，客户端伪造的左侧条目不会被使用"""
+    remote = remote or "anonymous"
+    if not forwarded or not _is_trusted(remote, trusted):
+        return remote
+    client = remote
+    for address in reversed([item.strip() for item in forwarded.split(",") if item.strip()]):
+        client = address
+        if not _is_trusted(address, trusted):
+            break
+    return client
+
+
+def estimate_retry_after(overflow: int, drain_rate: float) -> int:
+    """按每秒完成数估算超出的overflow个任务排空所需秒数，作为Retry-After；尚无完成记录时返回5秒"""
+    if drain_rate <= 0:
+        return 5
+    return min(max(math.ceil(overflow / drain_rate), 1), 300)
+
+
+class AdmissionController:
+    """准入控制器：跟踪在途+排队的任务数，超过队列容量时拒绝新任务"""
+
+    def __init__(
+        self,
+        max_pending: int = 500,
+        rate_limiter: Optional[ClientRateLimiter] = None,
+        drain_window: float = 60.0,
+        trusted_proxies: Optional[List[str]] = None
+    ):
+        self.max_pending = max_pending
+        self.rate_limiter = rate_limiter
+        self.trusted_proxies = parse_networks(trusted_proxies)
+        self.drain_window = drain_window
+        self.pending = 0
+        self.rejected = 0
+        self.logger = get_logger("admission")
+        self.metrics = get_metrics_collector()
+        self._completions = deque(maxlen=10000)
+        self._lock = threading.Lock()
+
+    def drain_rate(self) -> float:
+        """最近窗口内每秒完成的任务数"""
+        now = time.monotonic()
+        with self._lock:
+            while self._completions and now - self._completions[0] > self.drain_window:
+                self._completions.popleft()
+            if not self._completions:
+                return 0.0
+            elapsed = max(now - self._completions[0], 1.0)
+            return len(self._completions) / elapsed
+
+    def _retry_after(self, overflow: int) -> int:
+        return estimate_retry_after(overflow, self.drain_rate())
+
+    def admit(self, client_id: str = "anonymous", units: int = 1):
+        """申请准入units个任务，被限流或队列已满时抛出RateLimitError；
+        先检查队列容量，因队列已满被拒绝的请求不消耗客户端的限流令牌"""
+        if units > self.max_pending:
+            self.rejected += 1
+            raise RateLimitError(f"单次提交 {units} 条超过队列容量 {self.max_pending}，请拆分后提交")
+
+        wait = None
+        with self._lock:
+            overflow = self.pending + units - self.max_pending
+            if overflow <= 0:
+                allowed, wait = self.rate_limiter.try_acquire(client_id) if self.rate_limiter else (True, 0.0)
+                if allowed:
+                    wait = None
+                    self.pending += units
+                    pending = self.pending
+        if wait is not None:
+            self.rejected += 1
+            raise RateLimitError("请求过于频繁，请稍后重试", retry_after=max(math.ceil(wait), 1))
+        if overflow > 0:
+            self.rejected += 1
+            retry_after = self._retry_after(overflow)
+            self.logger.warning(f"审核队列已满: {self.pending}/{self.max_pending}, 建议 {retry_after}s 后重试")
+            raise RateLimitError(f"审核队列已满，请 {retry_after} 秒后重试", retry_after=retry_after)
+
+        self.metrics.update_queue_size(pending, stage="admission")
+
+    def release(self, units: int = 1):
+        """任务完成（无论成功失败）后释放名额"""
+        now = time.monotonic()
+        with self._lock:
+            self.pending = max(self.pending - units, 0)
+            pending = self.pending
+            self._completions.extend([now] * units)
+        self.metrics.update_queue_size(pending, stage="admission")
+
+    @asynccontextmanager
+    async def admission(self, client_id: str = "anonymous", units: int = 1):
+        """在请求处理期间占用准入名额"""
+        self.admit(client_id, units)
+        try:
+            yield
+        finally:
+            self.release(units)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取队列占用情况"""
+        return {
+            "pending": self.pending,
+            "max_pending": self.max_pending,
+            "occupancy": self.pending / self.max_pending if self.max_pending else 0.0,
+            "drain_rate_per_second": round(self.drain_rate(), 3),
+            "rejected": self.rejected
+        }
+
+
+def create_admission_controller(config: Dict[str, Any]) -> AdmissionController:
+    """根据 performance.queue_size、api.rate_limiting 和 api.trusted_proxies 创建准入控制器"""
+    rate_config = config.get("api", {}).get("rate_limiting", {})
+    rate_limiter = None
+    if rate_config.get("enabled", False):
+        rate_limiter = ClientRateLimiter(
+            requests_per_minute=rate_config.get("requests_per_minute", 1000),
+            burst=rate_config.get("burst", 100)
+        )
+    return AdmissionController(
+        max_pending=config.get("performance", {}).get("queue_size", 500),
+        rate_limiter=rate_limiter,
+        trusted_proxies=config.get("api", {}).get("trusted_proxies") or []
+    )
@@ -0,0 +1,70 @@
+"""
+文本特征工具 - 基于NumPy的字符n-gram哈希
+"""
+
+import re
+from typing import Tuple
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+_WHITESPACE_RE = re.compile(r"\s+")
+# 数字、标点及符号，近似重复检测时忽略（日期、署名、标点改动）
+_NOISE_RE = re.compile(r"[\d\s\W_]+", re.UNICODE)
+
+# FNV-1a 64位参数
+_FNV_OFFSET = 0xCBF29CE484222325
+_FNV_PRIME = 0x100000001B3
+
+
+def normalize_text(text: str) -> str:
+    """归一化文本：转小写并合并空白"""
+    return _WHITESPACE_RE.sub(" ", text.lower()).strip()
+
+
+def strip_noise(text: str) -> str:
+    """去除数字、标点和空白，只保留文字主体"""
+    return _NOISE_RE.sub("", text.lower())
+
+
+def hashed_char_ngrams(text: str, ngram_range: Tuple[int, int] = (1, 3)) -> "np.ndarray":
+    """计算字符n-gram的64位哈希（向量化FNV-1a），返回uint64数组"""
+    if np is None:
+        raise ImportError("hashed_char_ngrams 需要安装 numpy")
+
+    codes = np.frombuffer(text.encode("utf-32-le"), dtype=np.uint32).astype(np.uint64)
+    length = len(codes)
+    min_n, max_n = ngram_range
+    parts = []
+    with np.errstate(over="ignore"):
+        for n in range(min_n, max_n + 1):
+            count = length - n + 1
+            if count <= 0:
+                break
+            # 以n作为种子，避免不同阶n-gram之间的碰撞
+            h = np.full(count, _FNV_OFFSET ^ n, dtype=np.uint64)
+            for k in range(n):
+                h ^= codes[k:k + count]
+                h *= np.uint64(_FNV_PRIME)
+            parts.append(h)
+    if not parts:
+        return np.empty(0, dtype=np.uint64)
+    return np.concatenate(parts)
+
+
+def hashed_feature_vector(
+    text: str,
+    n_features: int,
+    ngram_range: Tuple[int, int] = (1, 3)
+) -> Tuple["np.ndarray", "np.ndarray"]:
+    """生成稀疏特征向量（索引, L2归一化后的权重）"""
+    hashes = hashed_char_ngrams(normalize_text(text), ngram_range)
+    if len(hashes) == 0:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+    indices, counts = np.unique((hashes % np.uint64(n_features)).astype(np.int64), return_counts=True)
+    values = np.log1p(counts).astype(np.float32)
+    values /= np.sqrt(np.dot(values, values))
+    return indices, values